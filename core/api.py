@@ -9,7 +9,7 @@ from typing import Dict, Any, Optional, List
 import sqlite3
 
 from .pipeline import PipelineRunner
-from .db import get_connection, init_database
+from .db import ConnectionPool, init_database
 from .jobs import JobScheduler
 
 
@@ -34,10 +34,16 @@ class API:
         if reset_db and self.db_path.exists():
             os.remove(self.db_path)
         
+        # Pooled connections: per-thread read-only readers and a single writer
+        self.pool = ConnectionPool(str(self.db_path))
+
         # Initialize database with protocol schema
-        db = get_connection(str(self.db_path))
-        init_database(db, str(self.protocol_dir))
-        db.close()
+        with self.pool.writer() as db:
+            init_database(db, str(self.protocol_dir))
+
+        # Worker threads for queries submitted concurrently with ingestion
+        from core.queries import QueryExecutor
+        self.query_executor = QueryExecutor(self.pool)
         
         # Initialize pipeline runner
         self.runner = PipelineRunner(
@@ -49,6 +55,7 @@ class API:
         self.scheduler = JobScheduler(
             db_path=str(self.db_path),
             protocol_name=self.protocol_dir.name,
+            pool=self.pool,
         )
         
         # Load OpenAPI spec if present (optional)
@@ -159,9 +166,9 @@ class API:
 
                 event_type = event_dir.name
 
-        # Commands removed: only import flows to register @flow_op operations
-        # Also inspect queries for type metadata (registration handled by query_registry)
-        queries_file = event_dir / 'queries.py'
+                # Commands removed: only import flows to register @flow_op operations
+                # Also inspect queries for type metadata (registration handled by query_registry)
+                queries_file = event_dir / 'queries.py'
                 if queries_file.exists():
                     try:
                         q_module_name = f'protocols.{self.protocol_dir.name}.events.{event_type}.queries'
@@ -262,8 +269,7 @@ class API:
                 from core.flows import flows_registry
                 if not flows_registry.has_flow(operation_id):
                     raise ValueError(f"Flow not registered for: {operation_id}")
-                db = get_connection(str(self.db_path))
-                try:
+                with self.pool.writer() as db:
                     import uuid
                     request_id = str(uuid.uuid4())
                     enriched_params: Dict[str, Any] = dict(params or {})
@@ -272,8 +278,6 @@ class API:
                     enriched_params['_protocol_dir'] = str(self.protocol_dir)
                     enriched_params['_request_id'] = request_id
                     return flows_registry.execute(operation_id, enriched_params)
-                finally:
-                    db.close()
             elif kind == 'command':
                 return self._execute_command(operation_id, params)
             elif kind == 'query':
@@ -285,8 +289,7 @@ class API:
         try:
             from core.flows import flows_registry
             if flows_registry.has_flow(operation_id):
-                db = get_connection(str(self.db_path))
-                try:
+                with self.pool.writer() as db:
                     import uuid
                     request_id = str(uuid.uuid4())
                     enriched_params: Dict[str, Any] = dict(params or {})
@@ -295,8 +298,6 @@ class API:
                     enriched_params['_protocol_dir'] = str(self.protocol_dir)
                     enriched_params['_request_id'] = request_id
                     return flows_registry.execute(operation_id, enriched_params)
-                finally:
-                    db.close()
         except Exception:
             pass
         # Check if this starts with 'core.' for core operations
@@ -310,8 +311,7 @@ class API:
             from core.queries import query_registry
             from core.flows import flows_registry
             if flows_registry.has_flow(operation_id):
-                db = get_connection(str(self.db_path))
-                try:
+                with self.pool.writer() as db:
                     import uuid
                     request_id = str(uuid.uuid4())
                     enriched_params: Dict[str, Any] = dict(params or {})
@@ -320,8 +320,6 @@ class API:
                     enriched_params['_protocol_dir'] = str(self.protocol_dir)
                     enriched_params['_request_id'] = request_id
                     return flows_registry.execute(operation_id, enriched_params)
-                finally:
-                    db.close()
             if query_registry.has_query(operation_id):
                 return self._execute_query(operation_id, params)
             raise ValueError(f"Unknown operation: {operation_id}")
@@ -331,8 +329,7 @@ class API:
         if operation['method'] == 'post':
             # Execute as flow (commands removed)
             from core.flows import flows_registry
-            db = get_connection(str(self.db_path))
-            try:
+            with self.pool.writer() as db:
                 import uuid
                 request_id = str(uuid.uuid4())
                 enriched_params: Dict[str, Any] = dict(params or {})
@@ -341,8 +338,6 @@ class API:
                 enriched_params['_protocol_dir'] = str(self.protocol_dir)
                 enriched_params['_request_id'] = request_id
                 return flows_registry.execute(operation_id, enriched_params)
-            finally:
-                db.close()
         elif operation['method'] == 'get':
             # Execute as query
             return self._execute_query(operation_id, params)
@@ -372,17 +367,12 @@ class API:
 
     def _execute_query(self, operation_id: str, params: Optional[Dict[str, Any]] = None) -> Any:
         """Execute a query."""
-        # Get database connection
-        db = get_connection(str(self.db_path))
+        # Reuse this thread's pooled read-only connection
+        db = self.pool.reader()
 
-        try:
-            # Operation IDs for queries already use the event_type.function format
-            # Just execute directly through the registry
-            result = self.query_registry.execute(operation_id, params or {}, db)
-            return result
-
-        finally:
-            db.close()
+        # Operation IDs for queries already use the event_type.function format
+        # Just execute directly through the registry
+        return self.query_registry.execute(operation_id, params or {}, db)
 
     def tick_scheduler(self) -> int:
         """
@@ -394,10 +384,31 @@ class API:
         due_jobs = self.scheduler.tick()
         for job in due_jobs:
             try:
-                self.execute_operation(job['op'], job.get('params', {}))
+                if 'job' in job:
+                    self.run_job(job['job'])
+                else:
+                    self.execute_operation(job['op'], job.get('params', {}))
             except Exception as e:
-                print(f"[Scheduler] Job {job['op']} failed: {e}")
+                print(f"[Scheduler] Job {job.get('op') or job.get('job')} failed: {e}")
         return len(due_jobs)
+
+    def run_job(self, job_name: str) -> None:
+        """Run a handler maintenance job through the pipeline's job handler."""
+        with self.pool.writer() as db:
+            self.runner.run(
+                protocol_dir=str(self.protocol_dir),
+                input_envelopes=[{'event_type': 'run_job', 'job_name': job_name}],
+                db=db,
+            )
+
+    def submit_query(self, operation_id: str, params: Optional[Dict[str, Any]] = None) -> Any:
+        """Run a query on the query thread pool and return a Future for its result."""
+        return self.query_executor.submit(operation_id, params)
+
+    def close(self) -> None:
+        """Stop query workers and close pooled database connections."""
+        self.query_executor.shutdown()
+        self.pool.close()
     
     def __getattr__(self, name: str) -> Any:
         """Dynamic method creation for OpenAPI operations."""
@@ -411,9 +422,6 @@ class API:
         # If not found, raise AttributeError
         raise AttributeError(f"'{self.__class__.__name__}' object has no attribute '{name}'")
 
-# Backward-compatible alias (tests/imports may still use APIClient)
-APIClient = API
-
     # ---------------------------------------------------------------------
     # Debug/Introspection helpers
     # ---------------------------------------------------------------------
@@ -443,10 +451,10 @@ APIClient = API
 
         result: dict[str, list[dict[str, Any]]] = {}
 
-        conn = get_connection(str(self.db_path))
+        conn = self.pool.reader()
+        conn.row_factory = _sqlite3.Row
+        cur = conn.cursor()
         try:
-            conn.row_factory = _sqlite3.Row
-            cur = conn.cursor()
 
             for table in tables_to_dump:
                 # Check table exists
@@ -489,7 +497,7 @@ APIClient = API
                 result[table] = [dict(r) for r in rows]
 
         finally:
-            conn.close()
+            cur.close()
 
         return result
 
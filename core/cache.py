@@ -0,0 +1,104 @@
+"""
+Bounded in-memory caches.
+
+ScopedLRUCache keys entries by a scope (normally a database instance id, see
+core.db.database_instance_id) so that several connections to the same
+database share entries while different databases never see each other's.
+"""
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable, Iterable, Optional
+
+
+class LRUCache:
+    """Thread-safe least-recently-used cache with a fixed capacity."""
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def peek(self, key: Hashable, default: Any = None) -> Any:
+        """Like get() but without touching recency or hit counts."""
+        with self._lock:
+            return self._data.get(key, default)
+
+    def put(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            return self._data.pop(key, default)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def keys(self) -> list:
+        with self._lock:
+            return list(self._data.keys())
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._data
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class ScopedLRUCache:
+    """An LRUCache whose keys are namespaced by scope."""
+
+    def __init__(self, maxsize: int = 1024):
+        self._cache = LRUCache(maxsize)
+
+    @property
+    def hits(self) -> int:
+        return self._cache.hits
+
+    @property
+    def misses(self) -> int:
+        return self._cache.misses
+
+    def get(self, scope: str, key: Hashable, default: Any = None) -> Any:
+        return self._cache.get((scope, key), default)
+
+    def peek(self, scope: str, key: Hashable, default: Any = None) -> Any:
+        return self._cache.peek((scope, key), default)
+
+    def put(self, scope: str, key: Hashable, value: Any) -> None:
+        self._cache.put((scope, key), value)
+
+    def invalidate(self, scope: str, keys: Iterable[Hashable]) -> None:
+        """Drop the given keys from one scope."""
+        for key in keys:
+            self._cache.pop((scope, key))
+
+    def clear(self, scope: Optional[str] = None) -> None:
+        """Drop every entry, or every entry of one scope."""
+        if scope is None:
+            self._cache.clear()
+            return
+        for full_key in self._cache.keys():
+            if full_key[0] == scope:
+                self._cache.pop(full_key)
+
+    def __len__(self) -> int:
+        return len(self._cache)
@@ -0,0 +1,177 @@
+"""
+Compact binary envelope codec.
+
+Envelopes are nested dicts/lists of str, int, float, bool, None and bytes.
+JSON cannot hold bytes and spells out every key; this codec keeps bytes raw
+and writes keys from a protocol's known-key table as a one- or two-byte tag.
+
+Layout: a version byte followed by one encoded value. Each value is a type
+byte and a payload; lengths, counts and ints are LEB128 varints (ints are
+zigzag encoded). Dict keys are a varint tag: 0 means a literal key follows,
+n > 0 is entry n - 1 of the key table.
+
+Key tables are append-only: stored blobs refer to keys by position, so
+existing entries must never be removed or reordered.
+"""
+import json
+import struct
+from typing import Any, Dict, List, Sequence, Tuple
+
+VERSION = 1
+
+_NONE = 0
+_FALSE = 1
+_TRUE = 2
+_INT = 3
+_FLOAT = 4
+_STR = 5
+_BYTES = 6
+_LIST = 7
+_DICT = 8
+
+_DOUBLE = struct.Struct('>d')
+
+
+def _write_varint(out: bytearray, n: int) -> None:
+    while n >= 0x80:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def _read_varint(data: bytes, pos: int) -> Tuple[int, int]:
+    result = 0
+    shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, pos
+        shift += 7
+
+
+class EnvelopeCodec:
+    """Encodes and decodes envelopes using a table of interned keys."""
+
+    def __init__(self, keys: Sequence[str] = ()):
+        self.keys: Tuple[str, ...] = tuple(keys)
+        if len(set(self.keys)) != len(self.keys):
+            raise ValueError("Envelope key table contains duplicates")
+        # key -> pre-encoded tag bytes
+        self._key_tags: Dict[str, bytes] = {}
+        for i, key in enumerate(self.keys):
+            tag = bytearray()
+            _write_varint(tag, i + 1)
+            self._key_tags[key] = bytes(tag)
+
+    def encode(self, value: Any) -> bytes:
+        """Serialize a value (normally an envelope dict) to bytes."""
+        out = bytearray((VERSION,))
+        self._encode(value, out)
+        return bytes(out)
+
+    def decode(self, data: Any) -> Any:
+        """Deserialize bytes produced by encode().
+
+        JSON text (str, or bytes not starting with the version byte) is
+        accepted for rows written before this codec existed.
+        """
+        if isinstance(data, str):
+            return json.loads(data)
+        data = bytes(data)
+        if not data or data[0] != VERSION:
+            return json.loads(data)
+        value, pos = self._decode(data, 1)
+        if pos != len(data):
+            raise ValueError(f"Trailing data after envelope ({len(data) - pos} bytes)")
+        return value
+
+    def _encode(self, value: Any, out: bytearray) -> None:
+        if value is None:
+            out.append(_NONE)
+        elif value is True:
+            out.append(_TRUE)
+        elif value is False:
+            out.append(_FALSE)
+        elif isinstance(value, int):
+            out.append(_INT)
+            _write_varint(out, value << 1 if value >= 0 else ((-value) << 1) - 1)
+        elif isinstance(value, float):
+            out.append(_FLOAT)
+            out += _DOUBLE.pack(value)
+        elif isinstance(value, str):
+            raw = value.encode('utf-8')
+            out.append(_STR)
+            _write_varint(out, len(raw))
+            out += raw
+        elif isinstance(value, (bytes, bytearray, memoryview)):
+            out.append(_BYTES)
+            _write_varint(out, len(value))
+            out += value
+        elif isinstance(value, dict):
+            out.append(_DICT)
+            _write_varint(out, len(value))
+            key_tags = self._key_tags
+            for key, item in value.items():
+                if not isinstance(key, str):
+                    raise TypeError(f"Envelope keys must be str, not {type(key).__name__}")
+                tag = key_tags.get(key)
+                if tag is not None:
+                    out += tag
+                else:
+                    raw = key.encode('utf-8')
+                    out.append(0)
+                    _write_varint(out, len(raw))
+                    out += raw
+                self._encode(item, out)
+        elif isinstance(value, (list, tuple)):
+            out.append(_LIST)
+            _write_varint(out, len(value))
+            for item in value:
+                self._encode(item, out)
+        else:
+            raise TypeError(f"Cannot encode value of type {type(value).__name__}")
+
+    def _decode(self, data: bytes, pos: int) -> Tuple[Any, int]:
+        kind = data[pos]
+        pos += 1
+        if kind == _STR:
+            n, pos = _read_varint(data, pos)
+            return data[pos:pos + n].decode('utf-8'), pos + n
+        if kind == _DICT:
+            count, pos = _read_varint(data, pos)
+            result: Dict[str, Any] = {}
+            keys = self.keys
+            for _ in range(count):
+                tag, pos = _read_varint(data, pos)
+                if tag:
+                    key = keys[tag - 1]
+                else:
+                    n, pos = _read_varint(data, pos)
+                    key = data[pos:pos + n].decode('utf-8')
+                    pos += n
+                result[key], pos = self._decode(data, pos)
+            return result, pos
+        if kind == _BYTES:
+            n, pos = _read_varint(data, pos)
+            return data[pos:pos + n], pos + n
+        if kind == _INT:
+            z, pos = _read_varint(data, pos)
+            return (z >> 1) if not z & 1 else -((z + 1) >> 1), pos
+        if kind == _TRUE:
+            return True, pos
+        if kind == _FALSE:
+            return False, pos
+        if kind == _NONE:
+            return None, pos
+        if kind == _LIST:
+            count, pos = _read_varint(data, pos)
+            items: List[Any] = []
+            for _ in range(count):
+                item, pos = self._decode(data, pos)
+                items.append(item)
+            return items, pos
+        if kind == _FLOAT:
+            return _DOUBLE.unpack_from(data, pos)[0], pos + 8
+        raise ValueError(f"Unknown value type {kind} at offset {pos - 1}")
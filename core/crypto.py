@@ -8,7 +8,12 @@ import nacl.encoding
 import nacl.utils
 from nacl.public import PrivateKey, PublicKey, Box
 import hashlib
-from typing import Tuple, Optional
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Sequence, Tuple, Optional
+
+from .cache import LRUCache
 
 
 def generate_keypair() -> Tuple[bytes, bytes]:
@@ -17,23 +22,105 @@ def generate_keypair() -> Tuple[bytes, bytes]:
     return bytes(signing_key), bytes(signing_key.verify_key)
 
 
+def signing_key(private_key: bytes) -> nacl.signing.SigningKey:
+    """Build a reusable SigningKey from a raw Ed25519 private key."""
+    return nacl.signing.SigningKey(private_key)
+
+
 def sign(message: bytes, private_key: bytes) -> bytes:
     """Sign a message with Ed25519."""
-    signing_key = nacl.signing.SigningKey(private_key)
-    signed = signing_key.sign(message)
+    signed = signing_key(private_key).sign(message)
     return signed.signature
 
 
+# Parsed Ed25519 public keys, by raw key bytes
+_verify_keys = LRUCache(4096)
+
+# Batches smaller than this are verified on the calling thread
+PARALLEL_VERIFY_MIN = 16
+
+# Threads in the shared crypto worker pool
+CRYPTO_WORKERS = os.cpu_count() or 4
+
+_worker_pool: Optional[ThreadPoolExecutor] = None
+_worker_pool_lock = threading.Lock()
+
+
+def verify_key(public_key: bytes) -> nacl.signing.VerifyKey:
+    """Return a (cached) VerifyKey for a raw Ed25519 public key."""
+    key = _verify_keys.get(public_key)
+    if key is None:
+        key = nacl.signing.VerifyKey(public_key)
+        _verify_keys.put(public_key, key)
+    return key
+
+
 def verify(message: bytes, signature: bytes, public_key: bytes) -> bool:
     """Verify an Ed25519 signature."""
     try:
-        verify_key = nacl.signing.VerifyKey(public_key)
-        verify_key.verify(message, signature)
+        verify_key(public_key).verify(message, signature)
         return True
     except nacl.exceptions.BadSignatureError:
         return False
 
 
+def worker_pool() -> ThreadPoolExecutor:
+    """Shared thread pool for batched crypto (libsodium releases the GIL)."""
+    global _worker_pool
+    with _worker_pool_lock:
+        if _worker_pool is None:
+            _worker_pool = ThreadPoolExecutor(max_workers=CRYPTO_WORKERS,
+                                              thread_name_prefix='crypto')
+        return _worker_pool
+
+
+def _verify_group(public_key: bytes, items: List[Tuple[int, bytes, bytes]]) -> List[Tuple[int, bool]]:
+    try:
+        key = verify_key(public_key)
+    except Exception:
+        return [(index, False) for index, _, _ in items]
+    results = []
+    for index, message, signature in items:
+        try:
+            key.verify(message, signature)
+            results.append((index, True))
+        except Exception:
+            results.append((index, False))
+    return results
+
+
+def verify_batch(items: Sequence[Tuple[bytes, bytes, bytes]]) -> List[bool]:
+    """Verify many (message, signature, public_key) triples; results keep input order.
+
+    Items are grouped by signer so each key is parsed once. Large batches are
+    spread over a thread pool (libsodium runs without the GIL). Malformed
+    keys or signatures verify as False instead of raising.
+    """
+    groups: Dict[bytes, List[Tuple[int, bytes, bytes]]] = {}
+    for index, (message, signature, public_key) in enumerate(items):
+        groups.setdefault(bytes(public_key), []).append((index, message, signature))
+
+    results = [False] * len(items)
+    if len(items) < PARALLEL_VERIFY_MIN or len(groups) == 1 and len(items) < 2 * PARALLEL_VERIFY_MIN:
+        for public_key, group in groups.items():
+            for index, ok in _verify_group(public_key, group):
+                results[index] = ok
+        return results
+
+    # Split big groups so one prolific signer does not serialize the batch
+    pool = worker_pool()
+    chunk = max(PARALLEL_VERIFY_MIN, len(items) // (CRYPTO_WORKERS * 2))
+    futures = [
+        pool.submit(_verify_group, public_key, group[i:i + chunk])
+        for public_key, group in groups.items()
+        for i in range(0, len(group), chunk)
+    ]
+    for future in futures:
+        for index, ok in future.result():
+            results[index] = ok
+    return results
+
+
 def hash(data: bytes, size: int = 16) -> bytes:
     """BLAKE2b hash. Default 16 bytes (128 bits) for event IDs."""
     return nacl.hash.blake2b(data, digest_size=size, encoder=nacl.encoding.RawEncoder)
@@ -44,24 +131,52 @@ def generate_secret() -> bytes:
     return nacl.utils.random(32)
 
 
-def encrypt(plaintext: bytes, key: bytes, nonce: Optional[bytes] = None) -> Tuple[bytes, bytes]:
+SECRET_KEY_SIZE = nacl.secret.Aead.KEY_SIZE
+NONCE_SIZE = nacl.secret.Aead.NONCE_SIZE
+
+# XChaCha20-Poly1305 cipher objects, by raw key bytes
+_ciphers = LRUCache(1024)
+
+
+def cipher(key: bytes) -> nacl.secret.Aead:
+    """Return a (cached) XChaCha20-Poly1305 cipher for a 32-byte key."""
+    box = _ciphers.get(key)
+    if box is None:
+        box = nacl.secret.Aead(key)
+        _ciphers.put(key, box)
+    return box
+
+
+def encrypt(plaintext: bytes, key: bytes, nonce: Optional[bytes] = None, aad: bytes = b"") -> Tuple[bytes, bytes]:
     """
-    Encrypt with XChaCha20-Poly1305.
+    Encrypt with XChaCha20-Poly1305, optionally authenticating aad as well.
     Returns (ciphertext, nonce).
     """
-    box = nacl.secret.SecretBox(key)
     if nonce is None:
-        nonce = nacl.utils.random(24)
-    encrypted = box.encrypt(plaintext, nonce)
+        nonce = nacl.utils.random(NONCE_SIZE)
+    encrypted = cipher(key).encrypt(plaintext, aad, nonce=nonce)
     # PyNaCl prepends nonce, we want it separate
-    return encrypted[24:], encrypted[:24]
+    return encrypted.ciphertext, encrypted.nonce
 
 
-def decrypt(ciphertext: bytes, key: bytes, nonce: bytes) -> bytes:
+def decrypt(ciphertext: bytes, key: bytes, nonce: bytes, aad: bytes = b"") -> bytes:
     """Decrypt with XChaCha20-Poly1305."""
-    box = nacl.secret.SecretBox(key)
-    # PyNaCl expects nonce prepended
-    return box.decrypt(nonce + ciphertext)
+    return cipher(key).decrypt(ciphertext, aad, nonce=nonce)
+
+
+def decrypt_batch(items: Sequence[Tuple[bytes, bytes]], key: bytes, aad: bytes = b"") -> List[Optional[bytes]]:
+    """Decrypt many (ciphertext, nonce) pairs under one key.
+
+    Items that fail authentication come back as None instead of raising.
+    """
+    box = cipher(key)
+    results: List[Optional[bytes]] = []
+    for ciphertext, nonce in items:
+        try:
+            results.append(box.decrypt(ciphertext, aad, nonce=nonce))
+        except nacl.exceptions.CryptoError:
+            results.append(None)
+    return results
 
 
 def seal(plaintext: bytes, public_key: bytes) -> bytes:
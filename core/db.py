@@ -2,78 +2,247 @@
 Database setup and utilities with read-only support.
 """
 import sqlite3
-from typing import Any, Optional
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 import os
 import glob
+import hashlib
+import re
+import threading
+import time
+import uuid
+from pathlib import Path
+
+
+# Bookkeeping for applied schema files. The '__schema__' row holds a
+# fingerprint over every file of the last init; other rows are per file.
+SCHEMA_META_SQL = """
+CREATE TABLE IF NOT EXISTS schema_meta (
+    name TEXT PRIMARY KEY,
+    fingerprint TEXT NOT NULL,
+    applied_at INTEGER NOT NULL
+)
+"""
+
+SCHEMA_FINGERPRINT_KEY = '__schema__'
+# Random id identifying one database (not one connection or one file path)
+INSTANCE_ID_KEY = '__instance__'
+
+# path -> (mtime_ns, size, sha256) so unchanged files are not re-read
+_file_hashes: Dict[str, Tuple[int, int, str]] = {}
+
+
+_CREATE_TABLE = re.compile(r'CREATE\s+TABLE\s+IF\s+NOT\s+EXISTS\s+(\w+)\s*\(', re.IGNORECASE)
+_TABLE_CONSTRAINTS = ('PRIMARY', 'FOREIGN', 'UNIQUE', 'CHECK', 'CONSTRAINT')
+_LEADING_NAME = re.compile(r'["`\[]?(\w+)')
+
+
+def _table_columns(script: str) -> Iterator[Tuple[str, List[Tuple[str, str]]]]:
+    """Yield (table, [(column, definition)]) for each CREATE TABLE IF NOT EXISTS."""
+    script = re.sub(r'--[^\n]*', '', script)
+    for match in _CREATE_TABLE.finditer(script):
+        definitions: List[str] = []
+        depth, start = 0, match.end()
+        for i in range(match.end(), len(script)):
+            char = script[i]
+            if char == '(':
+                depth += 1
+            elif char == ')' and depth:
+                depth -= 1
+            elif char in ',)' and depth == 0:
+                definitions.append(script[start:i].strip())
+                start = i + 1
+                if char == ')':
+                    break
+        columns = []
+        for definition in definitions:
+            name = _LEADING_NAME.match(definition)
+            if name and name.group(1).upper() not in _TABLE_CONSTRAINTS:
+                columns.append((name.group(1), definition))
+        yield match.group(1), columns
+
+
+def _add_missing_columns(script: str, conn: sqlite3.Connection) -> None:
+    """Add columns a changed schema file declares to tables that already exist.
+
+    CREATE TABLE IF NOT EXISTS leaves existing tables alone, so without this
+    an index on a new column would fail on databases created before it.
+    SQLite only adds nullable columns or NOT NULL ones with a default.
+    """
+    for table, columns in _table_columns(script):
+        existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+        if not existing:
+            continue
+        for column, definition in columns:
+            if column not in existing:
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN {definition}")
 
 
 def _load_schema_file(schema_file: str, conn: sqlite3.Connection) -> None:
     """Load a schema file into the database."""
     with open(schema_file, 'r') as f:
-        schema_sql = f.read()
-        for statement in schema_sql.split(';'):
-            statement = statement.strip()
-            if statement:
-                conn.execute(statement + ';')
+        script = f.read()
+    _add_missing_columns(script, conn)
+    conn.executescript(script)
 
 
-def get_connection(db_path: str = "quiet.db") -> sqlite3.Connection:
-    """Get a database connection with proper settings."""
-    conn = sqlite3.connect(db_path)
-    conn.row_factory = sqlite3.Row
-    conn.execute("PRAGMA foreign_keys = ON")
-    conn.execute("PRAGMA journal_mode = WAL")
-    return conn
+def _hash_schema_file(schema_file: str) -> str:
+    """Return the sha256 of a schema file, cached by mtime and size."""
+    st = os.stat(schema_file)
+    cached = _file_hashes.get(schema_file)
+    if cached is not None and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+        return cached[2]
+    with open(schema_file, 'rb') as f:
+        digest = hashlib.sha256(f.read()).hexdigest()
+    _file_hashes[schema_file] = (st.st_mtime_ns, st.st_size, digest)
+    return digest
 
 
-def init_database(conn: sqlite3.Connection, protocol_dir: Optional[str] = None) -> None:
-    """Initialize database schema.
+def _schema_files(protocol_dir: Optional[str] = None) -> List[str]:
+    """List schema files in load order.
 
     The framework defines core tables and loads protocol-specific schema from:
-    1. Handler-specific .sql files in handlers/
+    1. Any top-level .sql files in the protocol directory
     2. Event type-specific .sql files in events/
-    3. Any top-level .sql files in the protocol directory
+    3. Handler-specific .sql files in handlers/
     """
+    files: List[str] = []
 
-    # Load core framework schemas
+    # Core framework schemas
     core_dir = os.path.dirname(os.path.abspath(__file__))
-    for schema_file in glob.glob(os.path.join(core_dir, '*.sql')):
-        _load_schema_file(schema_file, conn)
+    files.extend(glob.glob(os.path.join(core_dir, '*.sql')))
 
     if protocol_dir:
-        
-        # Load any top-level schema files in the protocol directory
-        for schema_file in glob.glob(os.path.join(protocol_dir, '*.sql')):
-            _load_schema_file(schema_file, conn)
-        
-        # Load event type schemas
+        protocol_dir = os.path.abspath(protocol_dir)
+
+        # Top-level schema files in the protocol directory
+        files.extend(glob.glob(os.path.join(protocol_dir, '*.sql')))
+
+        # Event type schemas
         events_dir = os.path.join(protocol_dir, 'events')
         if os.path.exists(events_dir):
             # Look in subdirectories for event type schemas
             for event_type_dir in os.listdir(events_dir):
                 event_type_path = os.path.join(events_dir, event_type_dir)
                 if os.path.isdir(event_type_path):
-                    for schema_file in glob.glob(os.path.join(event_type_path, '*.sql')):
-                        _load_schema_file(schema_file, conn)
+                    files.extend(glob.glob(os.path.join(event_type_path, '*.sql')))
 
             # Also check for schemas directly in events/
-            for schema_file in glob.glob(os.path.join(events_dir, '*.sql')):
-                _load_schema_file(schema_file, conn)
-        
-        # Load handler schemas
+            files.extend(glob.glob(os.path.join(events_dir, '*.sql')))
+
+        # Handler schemas
         handlers_dir = os.path.join(protocol_dir, 'handlers')
         if os.path.exists(handlers_dir):
             # Look in subdirectories for handler schemas
             for handler_dir in os.listdir(handlers_dir):
                 handler_path = os.path.join(handlers_dir, handler_dir)
                 if os.path.isdir(handler_path):
-                    for schema_file in glob.glob(os.path.join(handler_path, '*.sql')):
-                        _load_schema_file(schema_file, conn)
+                    files.extend(glob.glob(os.path.join(handler_path, '*.sql')))
 
             # Check for .sql files directly in handlers/
-            for schema_file in glob.glob(os.path.join(handlers_dir, '*.sql')):
-                _load_schema_file(schema_file, conn)
-    
+            files.extend(glob.glob(os.path.join(handlers_dir, '*.sql')))
+
+    return files
+
+
+class PipelineConnection(sqlite3.Connection):
+    """sqlite3.Connection that remembers which database it is connected to."""
+
+    # None: not looked up yet; '': database has no instance id
+    _instance_id: Optional[str] = None
+
+    @property
+    def instance_id(self) -> Optional[str]:
+        """The database's instance id from schema_meta, if it has one."""
+        if self._instance_id is None:
+            try:
+                row = self.execute(
+                    "SELECT fingerprint FROM schema_meta WHERE name = ?", (INSTANCE_ID_KEY,)
+                ).fetchone()
+            except sqlite3.OperationalError:
+                return None
+            self._instance_id = row[0] if row else ''
+        return self._instance_id or None
+
+
+def database_instance_id(db: Any) -> Optional[str]:
+    """Return an id shared by every connection to db's database, if known.
+
+    Used to scope in-memory caches. Connections not opened through
+    get_connection (and read-only wrappers) have no id, and callers should
+    skip caching for them.
+    """
+    return getattr(db, 'instance_id', None)
+
+
+def get_connection(db_path: str = "quiet.db", check_same_thread: bool = True) -> sqlite3.Connection:
+    """Get a database connection with proper settings."""
+    conn = sqlite3.connect(db_path, check_same_thread=check_same_thread, factory=PipelineConnection)
+    conn.row_factory = sqlite3.Row
+    # Only takes effect on a new database (or at its next VACUUM); lets the
+    # purged-event GC hand free pages back with incremental_vacuum
+    conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+    conn.execute("PRAGMA foreign_keys = ON")
+    conn.execute("PRAGMA journal_mode = WAL")
+    return conn
+
+
+def get_readonly_file_connection(db_path: str, check_same_thread: bool = True) -> sqlite3.Connection:
+    """Open a connection that SQLite itself refuses to write through."""
+    uri = Path(db_path).resolve().as_uri() + "?mode=ro"
+    conn = sqlite3.connect(uri, uri=True, check_same_thread=check_same_thread, factory=PipelineConnection)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA query_only = ON")
+    return conn
+
+
+def init_database(conn: sqlite3.Connection, protocol_dir: Optional[str] = None) -> None:
+    """Initialize database schema.
+
+    Schema files are fingerprinted and recorded in schema_meta. When the
+    combined fingerprint matches the last init this is a single lookup;
+    otherwise only new or changed files are applied.
+    """
+    files = _schema_files(protocol_dir)
+    hashes = [(path, _hash_schema_file(path)) for path in files]
+    combined = hashlib.sha256(
+        "\n".join(f"{path}:{digest}" for path, digest in hashes).encode()
+    ).hexdigest()
+
+    try:
+        rows = conn.execute("SELECT name, fingerprint FROM schema_meta").fetchall()
+    except sqlite3.OperationalError:
+        # Fresh database
+        conn.execute(SCHEMA_META_SQL)
+        rows = []
+    applied = {row[0]: row[1] for row in rows}
+
+    now_ms = int(time.time() * 1000)
+    if INSTANCE_ID_KEY not in applied:
+        conn.execute(
+            "INSERT OR IGNORE INTO schema_meta (name, fingerprint, applied_at) VALUES (?, ?, ?)",
+            (INSTANCE_ID_KEY, uuid.uuid4().hex, now_ms)
+        )
+        if isinstance(conn, PipelineConnection):
+            conn._instance_id = None
+        if applied.get(SCHEMA_FINGERPRINT_KEY) == combined:
+            conn.commit()
+
+    if applied.get(SCHEMA_FINGERPRINT_KEY) == combined:
+        return
+
+    for path, digest in hashes:
+        if applied.get(path) == digest:
+            continue
+        _load_schema_file(path, conn)
+        conn.execute(
+            "INSERT OR REPLACE INTO schema_meta (name, fingerprint, applied_at) VALUES (?, ?, ?)",
+            (path, digest, now_ms)
+        )
+    conn.execute(
+        "INSERT OR REPLACE INTO schema_meta (name, fingerprint, applied_at) VALUES (?, ?, ?)",
+        (SCHEMA_FINGERPRINT_KEY, combined, now_ms)
+    )
     conn.commit()
 
 
@@ -134,6 +303,173 @@ class ReadOnlyConnection:
         self._conn.row_factory = factory
 
 
+class BatchConnection:
+    """
+    A wrapper that lets the pipeline runner own the transaction boundary.
+
+    Handlers keep calling commit() and rollback() as usual. Inside an envelope
+    these map onto a savepoint: commit() checkpoints the envelope's work so far
+    and rollback() undoes everything since the last checkpoint. The runner
+    commits the surrounding transaction according to its batch policy.
+    """
+
+    SAVEPOINT = "pipeline_envelope"
+
+    def __init__(self, connection: sqlite3.Connection):
+        self._conn = connection
+        self._in_envelope = False
+
+    def begin(self) -> None:
+        """Open the batch transaction if one is not already open."""
+        if not self._conn.in_transaction:
+            self._conn.execute("BEGIN")
+
+    def commit_batch(self) -> None:
+        """Commit the batch transaction."""
+        self._conn.commit()
+
+    def begin_envelope(self) -> None:
+        """Start a savepoint isolating one envelope's writes."""
+        self.begin()
+        self._conn.execute(f"SAVEPOINT {self.SAVEPOINT}")
+        self._in_envelope = True
+
+    def end_envelope(self) -> None:
+        """Keep the envelope's writes in the batch."""
+        self._conn.execute(f"RELEASE SAVEPOINT {self.SAVEPOINT}")
+        self._in_envelope = False
+
+    def abort_envelope(self) -> None:
+        """Discard the envelope's uncheckpointed writes."""
+        self._conn.execute(f"ROLLBACK TO SAVEPOINT {self.SAVEPOINT}")
+        self.end_envelope()
+
+    def execute(self, sql: str, parameters: Any = ()) -> sqlite3.Cursor:
+        """Execute a SQL statement."""
+        return self._conn.execute(sql, parameters)
+
+    def executemany(self, sql: str, seq_of_parameters: Any) -> sqlite3.Cursor:
+        """Execute a SQL statement against many parameter sets."""
+        return self._conn.executemany(sql, seq_of_parameters)
+
+    def commit(self) -> None:
+        """Checkpoint the current envelope, or commit outside of an envelope."""
+        if self._in_envelope:
+            self._conn.execute(f"RELEASE SAVEPOINT {self.SAVEPOINT}")
+            self._conn.execute(f"SAVEPOINT {self.SAVEPOINT}")
+        else:
+            self._conn.commit()
+
+    def rollback(self) -> None:
+        """Roll back to the last checkpoint, or roll back outside of an envelope."""
+        if self._in_envelope:
+            self._conn.execute(f"ROLLBACK TO SAVEPOINT {self.SAVEPOINT}")
+        else:
+            self._conn.rollback()
+
+    def cursor(self) -> sqlite3.Cursor:
+        """Get a cursor from the underlying connection."""
+        return self._conn.cursor()
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._conn, name)
+
+
+class ConnectionPool:
+    """
+    Reusable connections for one database file.
+
+    Each thread gets its own long-lived read connection; all writes go
+    through a single writer connection guarded by a lock. Readers are opened
+    read-only (mode=ro, query_only), and WAL mode lets them proceed while the
+    writer holds its transaction.
+    """
+
+    # Applied to every pooled connection after get_connection's defaults
+    PRAGMAS = (
+        "PRAGMA synchronous = NORMAL",
+        "PRAGMA cache_size = -16000",
+        "PRAGMA mmap_size = 268435456",
+        "PRAGMA temp_store = MEMORY",
+    )
+
+    def __init__(self, db_path: str, readonly_readers: bool = True):
+        self.db_path = db_path
+        self.readonly_readers = readonly_readers
+        # An in-memory database exists only on its own connection
+        self._shared = db_path == ':memory:'
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._write_lock = threading.RLock()
+        self._writer: Optional[sqlite3.Connection] = None
+        self._readers: List[sqlite3.Connection] = []
+        self._closed = False
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = get_connection(self.db_path, check_same_thread=False)
+        for pragma in self.PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    def _connect_reader(self) -> sqlite3.Connection:
+        if not self.readonly_readers:
+            return self._connect()
+        if not os.path.exists(self.db_path):
+            # mode=ro cannot create the file; let the writer do it
+            self._get_writer()
+        conn = get_readonly_file_connection(self.db_path, check_same_thread=False)
+        for pragma in self.PRAGMAS[1:]:
+            conn.execute(pragma)
+        return conn
+
+    def _get_writer(self) -> sqlite3.Connection:
+        with self._lock:
+            if self._closed:
+                raise sqlite3.ProgrammingError("Connection pool is closed")
+            if self._writer is None:
+                self._writer = self._connect()
+            return self._writer
+
+    def reader(self) -> sqlite3.Connection:
+        """Return this thread's read connection, creating it on first use."""
+        if self._shared:
+            return self._get_writer()
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._connect_reader()
+            with self._lock:
+                if self._closed:
+                    conn.close()
+                    raise sqlite3.ProgrammingError("Connection pool is closed")
+                self._readers.append(conn)
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def writer(self) -> Iterator[sqlite3.Connection]:
+        """Hold the writer connection exclusively for the duration of the block."""
+        with self._write_lock:
+            conn = self._get_writer()
+            try:
+                yield conn
+            except BaseException:
+                if conn.in_transaction:
+                    conn.rollback()
+                raise
+
+    def close(self) -> None:
+        """Close every pooled connection."""
+        with self._lock:
+            self._closed = True
+            for conn in self._readers:
+                conn.close()
+            self._readers.clear()
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+        self._local = threading.local()
+
+
 def get_readonly_connection(connection: sqlite3.Connection) -> ReadOnlyConnection:
     """
     Get a read-only wrapper around a database connection.
@@ -3,14 +3,69 @@ Delta application system for state changes.
 Deltas are SQL operations emitted by projectors.
 """
 import sqlite3
-from typing import List
+from typing import Dict, List, Tuple
 import json
 from typing import Any
 
 
+# (op, table, data columns, where columns) -> statement text
+DeltaShape = Tuple[str, str, Tuple[str, ...], Tuple[str, ...]]
+
+
 class DeltaApplicator:
     """Applies deltas (SQL operations) to the database."""
-    
+
+    # Statement text per delta shape, so it is built once rather than per delta
+    _statements: Dict[DeltaShape, str] = {}
+    max_cached_statements = 512
+
+    @staticmethod
+    def _shape(delta: dict[str, Any]) -> DeltaShape:
+        """Return the shape key that determines a delta's statement text."""
+        op = delta.get('op')
+        if op not in ('insert', 'update', 'delete'):
+            raise ValueError(f"Unknown delta operation: {op}")
+        data_cols = tuple(delta['data'].keys()) if op != 'delete' else ()
+        where_cols = tuple(delta.get('where', {}).keys()) if op != 'insert' else ()
+        return (op, delta['table'], data_cols, where_cols)
+
+    @classmethod
+    def _statement(cls, shape: DeltaShape) -> str:
+        """Return (building and caching if needed) the SQL for a delta shape."""
+        sql = cls._statements.get(shape)
+        if sql is not None:
+            return sql
+
+        op, table, data_cols, where_cols = shape
+        where_clause = ' AND '.join([f"{k} = ?" for k in where_cols])
+
+        if op == 'insert':
+            placeholders = ','.join(['?' for _ in data_cols])
+            column_list = ','.join(data_cols)
+            sql = f"INSERT OR IGNORE INTO {table} ({column_list}) VALUES ({placeholders})"
+        elif op == 'update':
+            set_clause = ','.join([f"{k} = ?" for k in data_cols])
+            sql = f"UPDATE {table} SET {set_clause}"
+            if where_clause:
+                sql += f" WHERE {where_clause}"
+        else:
+            sql = f"DELETE FROM {table}"
+            if where_clause:
+                sql += f" WHERE {where_clause}"
+
+        if len(cls._statements) >= cls.max_cached_statements:
+            cls._statements.clear()
+        cls._statements[shape] = sql
+        return sql
+
+    @staticmethod
+    def _params(delta: dict[str, Any]) -> List[Any]:
+        """Return statement parameters in the order the shape's SQL expects."""
+        params = list(delta['data'].values()) if delta['op'] != 'delete' else []
+        if delta['op'] != 'insert':
+            params.extend(delta.get('where', {}).values())
+        return params
+
     @staticmethod
     def apply(delta: dict[str, Any], db: sqlite3.Connection) -> None:
         """
@@ -26,57 +81,55 @@ class DeltaApplicator:
             "params": []      # params for raw SQL
         }
         """
-        op = delta.get('op')
-        
         if 'sql' in delta:
             # Raw SQL delta
             db.execute(delta['sql'], delta.get('params', []))
             return
-        
-        table = delta['table']
-        
-        if op == 'insert':
-            columns = list(delta['data'].keys())
-            values = list(delta['data'].values())
-            placeholders = ','.join(['?' for _ in columns])
-            column_list = ','.join(columns)
-            
-            sql = f"INSERT OR IGNORE INTO {table} ({column_list}) VALUES ({placeholders})"
-            db.execute(sql, values)
-            
-        elif op == 'update':
-            set_clause = ','.join([f"{k} = ?" for k in delta['data'].keys()])
-            set_values = list(delta['data'].values())
-            
-            where_clause = ' AND '.join([f"{k} = ?" for k in delta.get('where', {}).keys()])
-            where_values = list(delta.get('where', {}).values())
-            
-            sql = f"UPDATE {table} SET {set_clause}"
-            if where_clause:
-                sql += f" WHERE {where_clause}"
-            
-            db.execute(sql, set_values + where_values)
-            
-        elif op == 'delete':
-            where_clause = ' AND '.join([f"{k} = ?" for k in delta.get('where', {}).keys()])
-            where_values = list(delta.get('where', {}).values())
-            
-            sql = f"DELETE FROM {table}"
-            if where_clause:
-                sql += f" WHERE {where_clause}"
-            
-            db.execute(sql, where_values)
-            
-        else:
-            raise ValueError(f"Unknown delta operation: {op}")
-    
+
+        sql = DeltaApplicator._statement(DeltaApplicator._shape(delta))
+        db.execute(sql, DeltaApplicator._params(delta))
+
+    @staticmethod
+    def apply_many(deltas: List[dict[str, Any]], db: sqlite3.Connection) -> None:
+        """
+        Apply deltas in order without committing.
+
+        Consecutive deltas with the same shape (op, table, columns) share one
+        cached statement and are sent through a single executemany().
+        """
+        i = 0
+        while i < len(deltas):
+            delta = deltas[i]
+            if 'sql' in delta:
+                db.execute(delta['sql'], delta.get('params', []))
+                i += 1
+                continue
+
+            shape = DeltaApplicator._shape(delta)
+            j = i + 1
+            while j < len(deltas) and 'sql' not in deltas[j] and DeltaApplicator._shape(deltas[j]) == shape:
+                j += 1
+
+            sql = DeltaApplicator._statement(shape)
+            if j - i == 1:
+                db.execute(sql, DeltaApplicator._params(delta))
+            else:
+                db.executemany(sql, [DeltaApplicator._params(d) for d in deltas[i:j]])
+            i = j
+
     @staticmethod
-    def apply_batch(deltas: List[dict[str, Any]], db: sqlite3.Connection) -> None:
-        """Apply multiple deltas in a transaction."""
+    def apply_batch(deltas: List[dict[str, Any]], db: sqlite3.Connection, commit: bool = True) -> None:
+        """Apply multiple deltas in a transaction.
+
+        With commit=False the caller owns the transaction and is responsible
+        for committing or rolling back.
+        """
+        if not commit:
+            DeltaApplicator.apply_many(deltas, db)
+            return
         try:
-            for delta in deltas:
-                DeltaApplicator.apply(delta, db)
+            DeltaApplicator.apply_many(deltas, db)
             db.commit()
         except Exception:
             db.rollback()
-            raise
\ No newline at end of file
+            raise
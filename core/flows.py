@@ -49,6 +49,7 @@ class FlowCtx:
         local_only: bool = False,
         seal_to: Optional[str] = None,
         encrypt_to: Optional[str] = None,
+        secret: Optional[Dict[str, Any]] = None,
         self_created: bool = True,
         is_outgoing: bool = False,
     ) -> str:
@@ -70,6 +71,9 @@ class FlowCtx:
             env['seal_to'] = seal_to
         if encrypt_to:
             env['encrypt_to'] = encrypt_to
+        if secret:
+            # Local-only material for projection; never part of the event
+            env['secret'] = dict(secret)
         if is_outgoing:
             env['is_outgoing'] = True
 
@@ -2,13 +2,28 @@
 Handler base class and registry for pipeline processing.
 """
 from abc import ABC, abstractmethod
-from typing import List, Dict, Callable, Optional
+from contextlib import nullcontext
+from typing import List, Dict, Callable, ContextManager, Iterator, Optional, FrozenSet, Sequence, Tuple
 import sqlite3
+import time
 from typing import Any
 
+from .metrics import PipelineMetrics
+from .tracing import tracer
+
+
+# Envelope key a handler sets (to a short reason) to stop all further
+# processing of that envelope, in this pass and any later one
+DROPPED = 'dropped'
+
 
 class Handler(ABC):
     """Base class for all handlers in the pipeline."""
+
+    # Envelope keys this handler subscribes to. The registry only calls
+    # filter() when at least one of these keys is present in the envelope.
+    # Empty means the handler is a candidate for every envelope.
+    envelope_keys: Tuple[str, ...] = ()
     
     @abstractmethod
     def filter(self, envelope: dict[str, Any]) -> bool:
@@ -32,18 +47,90 @@ class Handler(ABC):
         """Handler name for logging/debugging."""
         pass
 
+    def prefetch(self, envelopes: List[dict[str, Any]], db: sqlite3.Connection) -> None:
+        """
+        Optional batch hook. Within a queue generation, envelopes headed for
+        this handler wait until all of them have arrived (see
+        HandlerRegistry.process_generation); this is then called once with
+        those envelopes, as earlier stages left them, before process() runs
+        on any of them. Handlers can load or compute what process() will
+        need for the whole batch at once. Must not change envelopes.
+        """
+        pass
+
+
+class _Pass:
+    """Where one envelope is in its pass through the handlers."""
+
+    __slots__ = ('index', 'keys', 'positions', 'i', 'admitted', 'emitted', 'dropped')
+
+    def __init__(self, index: int, keys: FrozenSet[str], positions: Tuple[int, ...]) -> None:
+        self.index = index
+        self.keys = keys
+        self.positions = positions
+        self.i = 0
+        # Position of a batching handler this envelope was let into; its
+        # filter already matched when the envelope stopped there
+        self.admitted = -1
+        self.emitted: List[dict[str, Any]] = []
+        self.dropped = False
+
 
 class HandlerRegistry:
     """Registry for all handlers in the system."""
+
+    # Upper bound on distinct envelope key sets kept in the dispatch table
+    max_dispatch_entries = 1024
     
     def __init__(self) -> None:
         self._handlers: List[Handler] = []
         self._handler_map: Dict[str, Handler] = {}
+        # frozenset(envelope keys) -> positions of candidate handlers
+        self._dispatch: Dict[FrozenSet[str], Tuple[int, ...]] = {}
+        # handler name -> rank in the declared stage order
+        self._stage_rank: Dict[str, int] = {}
+        self.metrics = PipelineMetrics()
     
     def register(self, handler: Handler) -> None:
-        """Register a handler."""
-        self._handlers.append(handler)
+        """Register a handler, replacing any handler with the same name in place."""
+        existing = self._handler_map.get(handler.name)
+        if existing is not None:
+            self._handlers[self._handlers.index(existing)] = handler
+        else:
+            self._handlers.append(handler)
         self._handler_map[handler.name] = handler
+        self._compile()
+
+    def set_stage_order(self, names: Sequence[str]) -> None:
+        """
+        Run handlers in this order. Handlers not named keep registration order
+        after the named ones. An envelope that gains the keys for a later
+        stage moves on to it within the same process_envelope call.
+        """
+        self._stage_rank = {name: rank for rank, name in enumerate(names)}
+        self._compile()
+
+    def _compile(self) -> None:
+        # sorted() is stable, so unranked handlers keep registration order
+        unranked = len(self._stage_rank)
+        self._handlers.sort(key=lambda h: self._stage_rank.get(h.name, unranked))
+        self._dispatch.clear()
+
+    def candidates(self, keys: FrozenSet[str]) -> Tuple[int, ...]:
+        """
+        Return positions (in registration order) of handlers whose declared
+        envelope_keys intersect the given key set.
+        """
+        positions = self._dispatch.get(keys)
+        if positions is None:
+            positions = tuple(
+                i for i, handler in enumerate(self._handlers)
+                if not handler.envelope_keys or not keys.isdisjoint(handler.envelope_keys)
+            )
+            if len(self._dispatch) >= self.max_dispatch_entries:
+                self._dispatch.clear()
+            self._dispatch[keys] = positions
+        return positions
     
     def process_envelope(self, envelope: dict[str, Any], db: sqlite3.Connection) -> List[dict[str, Any]]:
         """
@@ -51,21 +138,143 @@ class HandlerRegistry:
         Returns all new envelopes emitted by handlers.
         """
         if not isinstance(envelope, dict):
-            print(f"[registry] ERROR: process_envelope got {type(envelope)} instead of dict")
+            tracer.error('registry', "process_envelope got %s instead of dict", type(envelope))
+            return []
+
+        if envelope.get(DROPPED):
             return []
 
-        all_emitted: List[dict[str, Any]] = []
+        run = self._start(0, envelope)
+        self._advance(envelope, db, run, batching=False)
+        return self._finish(envelope, run)
+
+    def process_generation(
+        self,
+        envelopes: List[dict[str, Any]],
+        db: sqlite3.Connection,
+        around: Optional[Callable[[], ContextManager[Any]]] = None,
+    ) -> Iterator[Tuple[dict[str, Any], List[dict[str, Any]]]]:
+        """
+        Pass a queue generation through the handlers, stage by stage.
+
+        Each envelope runs on until the next handler it would enter has a
+        prefetch() hook. There it waits until no envelope is left heading for
+        an earlier stage; the handler then gets one prefetch() call for
+        everything that arrived. So a batch sees the plaintexts and resolved
+        deps that earlier stages produced within this same generation.
+
+        Yields (envelope, emitted) as each envelope finishes its pass, as
+        process_envelope() would return them. `around`, if given, is entered
+        around every stretch of one envelope's processing.
+        """
+        waiting: Dict[int, List[Tuple[dict[str, Any], _Pass]]] = {}
+        ready: List[Tuple[dict[str, Any], _Pass]] = []
+        for index, envelope in enumerate(envelopes):
+            if not isinstance(envelope, dict):
+                tracer.error('registry', "process_generation got %s instead of dict", type(envelope))
+                continue
+            if envelope.get(DROPPED):
+                yield envelope, []
+                continue
+            ready.append((envelope, self._start(index, envelope)))
+
+        while ready:
+            for envelope, run in ready:
+                with around() if around is not None else nullcontext():
+                    position = self._advance(envelope, db, run, batching=True)
+                if position is None:
+                    yield envelope, self._finish(envelope, run)
+                else:
+                    waiting.setdefault(position, []).append((envelope, run))
+            if not waiting:
+                break
+            # The earliest stage goes first: envelopes waiting further on
+            # may be joined there by the ones let through now
+            stage = min(waiting)
+            ready = sorted(waiting.pop(stage), key=lambda item: item[1].index)
+            self._prefetch(self._handlers[stage], [envelope for envelope, _ in ready], db)
+            for _, run in ready:
+                run.admitted = stage
 
-        for handler in self._handlers:
-            if handler.filter(envelope):
-                print(f"[{handler.name}] Processing: {envelope}")
+    def _start(self, index: int, envelope: dict[str, Any]) -> _Pass:
+        keys = frozenset(envelope)
+        return _Pass(index, keys, self.candidates(keys))
+
+    def _advance(self, envelope: dict[str, Any], db: sqlite3.Connection, run: _Pass,
+                 batching: bool) -> Optional[int]:
+        """
+        Run handlers until the pass is over (returns None) or, when batching,
+        until the envelope reaches a handler with a prefetch() hook that has
+        not let it in yet (returns that handler's position).
+        """
+        # Handlers mutate the envelope in place, so later handlers may become
+        # candidates. Re-derive the candidate list whenever the key set changes,
+        # keeping registration order.
+        metrics = self.metrics
+        while run.i < len(run.positions):
+            position = run.positions[run.i]
+            handler = self._handlers[position]
+            if position == run.admitted:
+                hit = True
+            else:
+                hit = handler.filter(envelope)
+                metrics.record_filter(handler.name, hit)
+                if hit and batching and type(handler).prefetch is not Handler.prefetch:
+                    return position
+            run.i += 1
+            if hit:
+                tracer.debug(handler.name, "Processing: %s", envelope, envelope=envelope)
+                started = time.perf_counter()
                 emitted = handler.process(envelope, db)
+                metrics.record_process(handler.name, time.perf_counter() - started, len(emitted) if emitted else 0)
                 if emitted:
-                    print(f"[{handler.name}] Emitted {len(emitted)} envelopes")
-                    all_emitted.extend(emitted)
+                    tracer.debug(handler.name, "Emitted %d envelopes", len(emitted), envelope=envelope)
+                    run.emitted.extend(emitted)
+
+                if envelope.get(DROPPED):
+                    tracer.debug(handler.name, "Dropped: %s", envelope[DROPPED], envelope=envelope)
+                    run.dropped = True
+                    return None
+
+                new_keys = frozenset(envelope)
+                if new_keys != run.keys:
+                    run.keys = new_keys
+                    run.positions = tuple(p for p in self.candidates(new_keys) if p > position)
+                    run.i = 0
+        return None
 
-        return all_emitted
+    def _finish(self, envelope: dict[str, Any], run: _Pass) -> List[dict[str, Any]]:
+        if run.dropped:
+            return [e for e in run.emitted if e is not envelope]
+        return self._guard_requeue(envelope, run.emitted)
+
+    def _guard_requeue(self, envelope: dict[str, Any], emitted: List[dict[str, Any]]) -> List[dict[str, Any]]:
+        """
+        Handlers re-emit the envelope they transformed so later stages see it.
+        Having already run the rest of the chain, re-queue it once, and only
+        if some handler would still take it; otherwise the next generation
+        would just sweep every filter again for nothing.
+        """
+        if not any(e is envelope for e in emitted):
+            return emitted
+        result = [e for e in emitted if e is not envelope]
+        for position in self.candidates(frozenset(envelope)):
+            if self._handlers[position].filter(envelope):
+                result.append(envelope)
+                break
+        return result
     
+    def _prefetch(self, handler: Handler, envelopes: List[dict[str, Any]], db: sqlite3.Connection) -> None:
+        """Hand a batch to a handler's prefetch() hook."""
+        started = time.perf_counter()
+        try:
+            handler.prefetch(envelopes, db)
+        except Exception as e:
+            # Prefetching is an optimization; process() still does the work
+            tracer.warning(handler.name, "prefetch failed: %s", e)
+        tracer.debug(handler.name, "Prefetched for %d envelopes in %.2f ms",
+                     len(envelopes), (time.perf_counter() - started) * 1000)
+
     def get_handler(self, name: str) -> Optional[Handler]:
         """Get a handler by name."""
         return self._handler_map.get(name)
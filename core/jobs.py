@@ -4,69 +4,103 @@ import sqlite3
 import time
 from typing import Dict, List, Any, Optional
 
+from .db import ConnectionPool
+
+# Schedule names of handler maintenance jobs (run as run_job envelopes)
+JOB_PREFIX = 'job:'
+
 
 class JobScheduler:
     """Schedules and returns due jobs (operation executions)."""
 
-    def __init__(self, db_path: str, job_configs: Optional[Dict[str, int]] = None, protocol_name: Optional[str] = None):
+    def __init__(self, db_path: str, job_configs: Optional[Dict[str, int]] = None, protocol_name: Optional[str] = None,
+                 pool: Optional[ConnectionPool] = None):
         """
         Initialize the job scheduler.
 
         Args:
             db_path: Path to the database
             job_configs: Optional dict of job_name -> frequency_ms mappings
+            pool: Optional connection pool; ticks use its writer instead of
+                opening a fresh connection
         """
         self.db_path = db_path
+        self.pool = pool
         self.protocol_name = protocol_name or ''
         # Job configurations (name -> frequency_ms)
         self.job_configs = job_configs or self._load_jobs()
 
     def _load_jobs(self) -> Dict[str, int]:
-        """Load job frequencies from project root jobs.py (JOBS list)."""
+        """Load job frequencies from project root jobs.py (JOBS list).
+
+        Entries name either an operation ('op') or a handler maintenance job
+        ('job'), which is scheduled under JOB_PREFIX + its name.
+        """
         try:
             import importlib
             module_name = f'protocols.{self.protocol_name}.jobs' if self.protocol_name else 'jobs'
             jobs_mod = importlib.import_module(module_name)
             jobs_list = getattr(jobs_mod, 'JOBS', [])
             # Return as mapping op->every_ms; duplicates last one wins
-            return {job['op']: int(job.get('every_ms', 0) or 0) for job in jobs_list if 'op' in job}
+            configs: Dict[str, int] = {}
+            for job in jobs_list:
+                if 'op' in job:
+                    configs[job['op']] = int(job.get('every_ms', 0) or 0)
+                elif 'job' in job:
+                    configs[JOB_PREFIX + job['job']] = int(job.get('every_ms', 0) or 0)
+            return configs
         except Exception:
             return {}
 
     def tick(self) -> List[Dict[str, Any]]:
-        """Check for due jobs and return list of due job dicts {op, params}."""
+        """Check for due jobs and return list of due job dicts.
+
+        Operations come back as {op, params}, handler maintenance jobs as
+        {job}.
+        """
         due: List[Dict[str, Any]] = []
         time_now_ms = int(time.time() * 1000)
 
-        # Open a fresh connection for this check
-        db = sqlite3.connect(self.db_path)
+        if self.pool is not None:
+            with self.pool.writer() as db:
+                self._collect_due(db, time_now_ms, due)
+        else:
+            # Open a fresh connection for this check
+            db = sqlite3.connect(self.db_path)
+            try:
+                self._collect_due(db, time_now_ms, due)
+            finally:
+                db.close()
+
+        return due
+
+
+    def _collect_due(self, db: sqlite3.Connection, time_now_ms: int, due: List[Dict[str, Any]]) -> None:
+        """Append due jobs to `due` and mark them as run."""
         cursor = db.cursor()
+        for op_name, frequency_ms in self.job_configs.items():
+            if not frequency_ms or frequency_ms <= 0:
+                continue
+            # Check when job last ran
+            cursor.execute(
+                "SELECT last_run_ms FROM job_runs WHERE job_name = ?",
+                (op_name,),
+            )
+            row = cursor.fetchone()
 
-        try:
-            for op_name, frequency_ms in self.job_configs.items():
-                if not frequency_ms or frequency_ms <= 0:
-                    continue
-                # Check when job last ran
-                cursor.execute(
-                    "SELECT last_run_ms FROM job_runs WHERE job_name = ?",
-                    (op_name,),
-                )
-                row = cursor.fetchone()
-
-                if row:
-                    last_run_ms = row[0]
-                    if time_now_ms - last_run_ms < frequency_ms:
-                        continue  # Not due yet
-                # else: Never run, so it's due
+            if row:
+                last_run_ms = row[0]
+                if time_now_ms - last_run_ms < frequency_ms:
+                    continue  # Not due yet
+            # else: Never run, so it's due
 
+            if op_name.startswith(JOB_PREFIX):
+                due.append({'job': op_name[len(JOB_PREFIX):]})
+            else:
                 due.append({'op': op_name, 'params': {}})
-                # Update last_run_ms optimistically
-                cursor.execute(
-                    "INSERT OR REPLACE INTO job_runs (job_name, last_run_ms) VALUES (?, ?)",
-                    (op_name, time_now_ms),
-                )
-                db.commit()
-        finally:
-            db.close()
-
-        return due
+            # Update last_run_ms optimistically
+            cursor.execute(
+                "INSERT OR REPLACE INTO job_runs (job_name, last_run_ms) VALUES (?, ?)",
+                (op_name, time_now_ms),
+            )
+            db.commit()
@@ -0,0 +1,111 @@
+"""
+Pipeline metrics: per-handler call counts, filter hit rates, latency and
+fan-out, plus per-iteration queue depths and named gauges.
+
+Latency percentiles are computed over a bounded window of the most recent
+samples so memory stays flat on long-running pipelines.
+"""
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List
+
+
+def percentile(samples: List[float], q: float) -> float:
+    """Return the q-th quantile (0..1) of samples using nearest rank."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(q * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+class HandlerStats:
+    """Counters for a single handler."""
+
+    def __init__(self, window: int) -> None:
+        self.filter_calls = 0
+        self.filter_hits = 0
+        self.calls = 0
+        self.emitted = 0
+        self.total_seconds = 0.0
+        self.samples: Deque[float] = deque(maxlen=window)
+
+    def snapshot(self) -> Dict[str, Any]:
+        samples = list(self.samples)
+        return {
+            'calls': self.calls,
+            'filter_calls': self.filter_calls,
+            'filter_hits': self.filter_hits,
+            'filter_hit_rate': self.filter_hits / self.filter_calls if self.filter_calls else 0.0,
+            'total_ms': self.total_seconds * 1000,
+            'mean_ms': self.total_seconds * 1000 / self.calls if self.calls else 0.0,
+            'p50_ms': percentile(samples, 0.50) * 1000,
+            'p99_ms': percentile(samples, 0.99) * 1000,
+            'emitted': self.emitted,
+            'fan_out': self.emitted / self.calls if self.calls else 0.0,
+        }
+
+
+class PipelineMetrics:
+    """Metrics collected by the handler registry and pipeline runner."""
+
+    # Number of latency samples kept per handler
+    latency_window = 1024
+    # Number of per-iteration queue depths kept
+    depth_window = 1024
+
+    def __init__(self) -> None:
+        self.reset()
+
+    def reset(self) -> None:
+        """Drop all collected metrics."""
+        self.handlers: Dict[str, HandlerStats] = {}
+        self.iterations = 0
+        self.max_queue_depth = 0
+        self.queue_depths: Deque[int] = deque(maxlen=self.depth_window)
+        self.gauges: Dict[str, Any] = {}
+        self.started_at = time.time()
+
+    def handler(self, name: str) -> HandlerStats:
+        """Return (creating if needed) the stats for a handler."""
+        stats = self.handlers.get(name)
+        if stats is None:
+            stats = self.handlers[name] = HandlerStats(self.latency_window)
+        return stats
+
+    def record_filter(self, name: str, hit: bool) -> None:
+        stats = self.handler(name)
+        stats.filter_calls += 1
+        if hit:
+            stats.filter_hits += 1
+
+    def record_process(self, name: str, seconds: float, emitted: int) -> None:
+        stats = self.handler(name)
+        stats.calls += 1
+        stats.emitted += emitted
+        stats.total_seconds += seconds
+        stats.samples.append(seconds)
+
+    def record_queue_depth(self, depth: int) -> None:
+        """Record the size of the queue at the start of a runner iteration."""
+        self.iterations += 1
+        self.queue_depths.append(depth)
+        if depth > self.max_queue_depth:
+            self.max_queue_depth = depth
+
+    def set_gauge(self, name: str, value: Any) -> None:
+        """Record the latest value of a point-in-time measurement (JSON-serializable)."""
+        self.gauges[name] = value
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return a JSON-serializable view of the collected metrics."""
+        return {
+            'since': self.started_at,
+            'handlers': {name: stats.snapshot() for name, stats in self.handlers.items()},
+            'queue': {
+                'iterations': self.iterations,
+                'max_depth': self.max_queue_depth,
+                'depths': list(self.queue_depths),
+            },
+            'gauges': dict(self.gauges),
+        }
@@ -7,47 +7,56 @@ import json
 import hashlib
 import sqlite3
 import time
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Dict, List, Any, Optional
+from typing import Dict, Iterator, List, Any, Optional, Set, Tuple
 
-from .db import get_connection, init_database
+from .codec import EnvelopeCodec
+from .db import BatchConnection, get_connection, init_database
 from .handlers import registry
+from .tracing import INFO, EnvelopeRepr, tracer
+
+# Protocol directories whose handlers are already in the global registry
+_loaded_protocols: Set[str] = set()
 
 
 class PipelineRunner:
     """Production pipeline runner with configurable logging."""
     
-    def __init__(self, db_path: str = "quiet.db", verbose: bool = False):
+    def __init__(self, db_path: str = "quiet.db", verbose: bool = False, batch_size: Optional[int] = None):
+        """
+        Args:
+            db_path: Path to the database
+            verbose: Log every queue generation and consumed/emitted
+                envelope of this runner, whatever the tracer's level
+            batch_size: Commit policy. None lets handlers commit as they go.
+                0 runs each queue generation in one transaction; N > 0 commits
+                every N envelopes. In batch mode each envelope's run of
+                handlers between batching stages gets its own savepoint, so
+                a handler rollback only undoes that envelope's work.
+        """
         self.db_path = db_path
         self.verbose = verbose
+        self.batch_size = batch_size
         self.processed_count = 0
         self.emitted_count = 0
         self.start_time = time.time()
+        # Connection whose schema was last initialized, and for which protocols.
+        # Holding the reference keeps identity checks safe from id() reuse.
+        self._schema_db: Optional[sqlite3.Connection] = None
+        self._schema_protocols: Set[str] = set()
+        # Replaced by the protocol's codec (protocols.<name>.envelope_keys) on run()
+        self.codec = EnvelopeCodec()
         
     def log(self, message: str) -> None:
-        """Log message with timestamp."""
-        timestamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime())
-        print(f"[{timestamp}] {message}")
+        """Log a runner message through the tracer."""
+        tracer.info('pipeline', message)
         
     def log_envelope(self, action: str, handler: str, envelope: Dict[str, Any]) -> None:
         """Log envelope details in verbose mode."""
         if self.verbose:
-            # Format envelope for readability, converting bytes to hex
-            def serialize_envelope(obj: Any) -> Any:
-                if isinstance(obj, bytes):
-                    return f"<bytes:{len(obj)}:{obj[:20].hex()}...>" if len(obj) > 20 else obj.hex()
-                elif isinstance(obj, dict):
-                    return {k: serialize_envelope(v) for k, v in obj.items()}
-                elif isinstance(obj, list):
-                    return [serialize_envelope(v) for v in obj]
-                return obj
-                
-            serializable = serialize_envelope(envelope)
-            envelope_str = json.dumps(serializable, indent=2)
-            # Truncate large fields
-            if len(envelope_str) > 500:
-                envelope_str = envelope_str[:500] + "..."
-            self.log(f"{action} by {handler}:\n{envelope_str}")
+            # Verbosity is per runner; the global tracer level is left to the caller
+            tracer.emit(INFO, handler, "%s by %s:\n%s", action, handler, EnvelopeRepr(envelope), envelope=envelope)
             
     def run(self, protocol_dir: str, input_envelopes: Optional[List[dict[str, Any]]] = None, commands: Optional[List[Dict[str, Any]]] = None, db: Optional[sqlite3.Connection] = None) -> Dict[str, str]:
         """Run the pipeline with given protocol and optional input envelopes or commands.
@@ -64,10 +73,11 @@ class PipelineRunner:
         if db is None:
             db = get_connection(self.db_path)
             close_db = True
-        init_database(db, protocol_dir)
+        self._ensure_schema(db, protocol_dir)
 
         # Load protocol handlers
         self._load_protocol_handlers(protocol_dir)
+        self.codec = self._load_protocol_codec(protocol_dir)
 
         # Track stored events for return value
         stored_events = {}
@@ -93,11 +103,35 @@ class PipelineRunner:
 
         return stored_events
         
+    def metrics_snapshot(self) -> Dict[str, Any]:
+        """Return handler and queue metrics along with this runner's totals."""
+        snapshot = registry.metrics.snapshot()
+        snapshot['runner'] = {
+            'processed': self.processed_count,
+            'emitted': self.emitted_count,
+            'elapsed_ms': (time.time() - self.start_time) * 1000,
+        }
+        return snapshot
+
+    def _ensure_schema(self, db: sqlite3.Connection, protocol_dir: str) -> None:
+        """Initialize the schema once per connection and protocol."""
+        if db is not self._schema_db:
+            self._schema_db = db
+            self._schema_protocols = set()
+        protocol_key = str(Path(protocol_dir).resolve())
+        if protocol_key not in self._schema_protocols:
+            init_database(db, protocol_dir)
+            self._schema_protocols.add(protocol_key)
+
     def _load_protocol_handlers(self, protocol_dir: str) -> None:
-        """Dynamically load all handlers from a protocol."""
+        """Dynamically load all handlers from a protocol (once per process)."""
         import importlib
         import os
         
+        protocol_key = str(Path(protocol_dir).resolve())
+        if protocol_key in _loaded_protocols:
+            return
+
         protocol_name = Path(protocol_dir).name
         self.log(f"Loading handlers for protocol: {protocol_name}")
         
@@ -130,7 +164,30 @@ class PipelineRunner:
                 module_name = f"protocols.{protocol_name}.handlers.{handler_name}"
                 self.log(f"Checking module: {module_name}")
                 self._load_handler_module(module_name, handler_name)
+
+        stages = self._load_protocol_stages(protocol_dir)
+        if stages:
+            registry.set_stage_order(stages)
+
+        _loaded_protocols.add(protocol_key)
+
+    def _load_protocol_stages(self, protocol_dir: str) -> Tuple[str, ...]:
+        """Return the protocol's declared handler stage order, if it has one."""
+        try:
+            module = importlib.import_module(f"protocols.{Path(protocol_dir).name}.stages")
+        except ImportError:
+            return ()
+        return tuple(getattr(module, 'STAGES', ()))
                 
+    def _load_protocol_codec(self, protocol_dir: str) -> EnvelopeCodec:
+        """Return the protocol's envelope codec, or a codec without interned keys."""
+        try:
+            module = importlib.import_module(f"protocols.{Path(protocol_dir).name}.envelope_keys")
+        except ImportError:
+            return EnvelopeCodec()
+        codec = getattr(module, 'codec', None)
+        return codec if isinstance(codec, EnvelopeCodec) else EnvelopeCodec()
+
     def _load_handler_module(self, module_name: str, handler_name: str) -> None:
         """Load a handler module and register handler classes."""
         try:
@@ -178,70 +235,114 @@ class PipelineRunner:
         # Track total envelopes processed across all iterations for diagnostics
         total_envelopes_processed = 0
 
+        # In batch mode handlers commit into per-envelope savepoints and the
+        # runner commits the surrounding transaction
+        batch = BatchConnection(db) if self.batch_size is not None else None
+        handler_db: Any = batch if batch is not None else db
+        batch_pending = 0
+
+        # Unblocked envelopes may name parents (`_after`) released in the same
+        # cascade; they are held here until those parents validate in this run
+        parked: Dict[str, List[dict[str, Any]]] = {}
+        validated_ids: Set[str] = set()
+
         while queue:
             iterations += 1
             total_envelopes_processed += len(queue)
 
+            registry.metrics.record_queue_depth(len(queue))
+
             if self.verbose:
-                self.log(f"--- Iteration {iterations} with {len(queue)} envelopes ---")
+                tracer.emit(INFO, 'pipeline', "--- Iteration %d with %d envelopes ---", iterations, len(queue))
 
             next_queue = []
-            for envelope in queue:
-                # Use a simple accumulator field to track processing count
-                process_count = envelope.get('_process_count', 0) + 1
-                envelope['_process_count'] = process_count
-
-                # Check if this envelope has been processed too many times
-                if process_count > max_envelope_processes:
-                    # For debugging, generate a simple ID based on event type and a hash of the plaintext
-                    debug_id = f"{envelope.get('event_type', 'unknown')}_{envelope.get('event_id', 'no_id')}"
-                    self.log(f"ERROR: Envelope loop detected! {debug_id} processed {process_count} times")
-                    self.log(f"ERROR: Dropping envelope of type {envelope.get('event_type', 'unknown')}")
-                    continue  # Skip this envelope
-
-                self.processed_count += 1
-
-                # Process through all matching handlers
-                # The handlers modify the envelope in-place
-                emitted = registry.process_envelope(envelope, db)
-
-                # Track generated event_id for placeholder resolution
-                if 'event_id' in envelope:
-                    event_type = envelope.get('event_type', '')
-                    if event_type:
-                        if event_type not in generated_ids:
-                            generated_ids[event_type] = []
-                        generated_ids[event_type].append(envelope['event_id'])
-
-                # Track the processed envelope (handlers may have modified it)
-                all_processed.append(envelope)
-
-                # Normalize emitted to always be a flat list of envelopes
-                normalized_emitted = []
-                for item in emitted:
-                    if isinstance(item, dict):
-                        # Single envelope
-                        normalized_emitted.append(item)
-                    elif isinstance(item, list):
-                        # List of envelopes (shouldn't happen but handle it)
-                        for subitem in item:
-                            if isinstance(subitem, dict):
-                                normalized_emitted.append(subitem)
-                            else:
-                                self.log(f"WARNING: Skipping non-dict item in emitted: {type(subitem)}")
-                    else:
-                        self.log(f"WARNING: Skipping non-dict/list item in emitted: {type(item)}")
-
-                if self.verbose and normalized_emitted:
-                    for handler in registry._handlers:
-                        if handler.filter(envelope):
-                            self.log_envelope("CONSUMED", handler.name, envelope)
-                            for e in normalized_emitted:
-                                self.log_envelope("EMITTED", handler.name, e)
-
-                # Add emitted envelopes to next queue
-                next_queue.extend(normalized_emitted)
-                self.emitted_count += len(emitted)
+            while queue:
+                runnable = []
+                for envelope in queue:
+                    # Use a simple accumulator field to track processing count
+                    process_count = envelope.get('_process_count', 0) + 1
+                    envelope['_process_count'] = process_count
+
+                    # Check if this envelope has been processed too many times
+                    if process_count > max_envelope_processes:
+                        # For debugging, generate a simple ID based on event type and a hash of the plaintext
+                        debug_id = f"{envelope.get('event_type', 'unknown')}_{envelope.get('event_id', 'no_id')}"
+                        self.log(f"ERROR: Envelope loop detected! {debug_id} processed {process_count} times")
+                        self.log(f"ERROR: Dropping envelope of type {envelope.get('event_type', 'unknown')}")
+                        continue  # Skip this envelope
+
+                    self.processed_count += 1
+                    runnable.append(envelope)
+
+                # Children released by a parent that validates run in this
+                # same generation, right after the envelopes already in it
+                released: List[dict[str, Any]] = []
+
+                # Process through all matching handlers, stage by stage so
+                # batching handlers see the whole generation at their stage.
+                # The handlers modify the envelopes in-place
+                around = (lambda: self._envelope_savepoint(batch)) if batch is not None else None
+                for envelope, emitted in registry.process_generation(runnable, handler_db, around):
+                    if batch is not None:
+                        batch_pending += 1
+                        if self.batch_size and batch_pending >= self.batch_size:
+                            batch.commit_batch()
+                            batch_pending = 0
+
+                    # Track generated event_id for placeholder resolution
+                    if 'event_id' in envelope:
+                        event_type = envelope.get('event_type', '')
+                        if event_type:
+                            if event_type not in generated_ids:
+                                generated_ids[event_type] = []
+                            generated_ids[event_type].append(envelope['event_id'])
+
+                    # Track the processed envelope (handlers may have modified it)
+                    all_processed.append(envelope)
+
+                    event_id = envelope.get('event_id')
+                    if envelope.get('validated') is True and event_id and event_id not in validated_ids:
+                        validated_ids.add(event_id)
+                        if parked:
+                            released.extend(self._release_children(event_id, parked))
+
+                    # Normalize emitted to always be a flat list of envelopes
+                    normalized_emitted = []
+                    for item in emitted:
+                        if isinstance(item, dict):
+                            # Single envelope
+                            normalized_emitted.append(item)
+                        elif isinstance(item, list):
+                            # List of envelopes (shouldn't happen but handle it)
+                            for subitem in item:
+                                if isinstance(subitem, dict):
+                                    normalized_emitted.append(subitem)
+                                else:
+                                    self.log(f"WARNING: Skipping non-dict item in emitted: {type(subitem)}")
+                        else:
+                            self.log(f"WARNING: Skipping non-dict/list item in emitted: {type(item)}")
+
+                    if self.verbose and normalized_emitted:
+                        for handler in registry._handlers:
+                            if handler.filter(envelope):
+                                self.log_envelope("CONSUMED", handler.name, envelope)
+                                for e in normalized_emitted:
+                                    self.log_envelope("EMITTED", handler.name, e)
+
+                    # Add emitted envelopes to next queue
+                    next_queue.extend(self._hold_until_parents(normalized_emitted, parked, validated_ids))
+                    self.emitted_count += len(emitted)
+
+                queue = released
+
+            if batch is not None and batch_pending:
+                batch.commit_batch()
+                batch_pending = 0
+
+            if not next_queue and parked:
+                # Parents that never validated: let the children take their
+                # normal path (they re-block in resolve_deps if still missing)
+                next_queue = self._release_all(parked)
 
             queue = next_queue
 
@@ -293,6 +394,65 @@ class PipelineRunner:
 
     # Placeholder resolution removed: flows emit sequentially and provide real IDs.
 
+    @staticmethod
+    @contextmanager
+    def _envelope_savepoint(batch: BatchConnection) -> Iterator[None]:
+        """Run one stretch of an envelope's processing inside its own savepoint."""
+        batch.begin_envelope()
+        try:
+            yield
+        except Exception:
+            # Keep the work of envelopes that already completed
+            batch.abort_envelope()
+            batch.commit_batch()
+            raise
+        batch.end_envelope()
+
+    @staticmethod
+    def _hold_until_parents(envelopes: List[dict[str, Any]], parked: Dict[str, List[dict[str, Any]]],
+                            validated_ids: Set[str]) -> List[dict[str, Any]]:
+        """Return envelopes that can run now; park those whose `_after` parents have not validated."""
+        ready = []
+        for envelope in envelopes:
+            after = envelope.get('_after')
+            if after:
+                waiting = [parent for parent in after if parent not in validated_ids]
+                if waiting:
+                    envelope['_after'] = waiting
+                    for parent in waiting:
+                        parked.setdefault(parent, []).append(envelope)
+                    continue
+                envelope.pop('_after', None)
+            ready.append(envelope)
+        return ready
+
+    @staticmethod
+    def _release_children(parent_id: str, parked: Dict[str, List[dict[str, Any]]]) -> List[dict[str, Any]]:
+        """Return parked envelopes that were waiting only on parent_id."""
+        ready = []
+        for child in parked.pop(parent_id, []):
+            after = [parent for parent in child.get('_after', []) if parent != parent_id]
+            if after:
+                child['_after'] = after
+            else:
+                child.pop('_after', None)
+                ready.append(child)
+        return ready
+
+    @staticmethod
+    def _release_all(parked: Dict[str, List[dict[str, Any]]]) -> List[dict[str, Any]]:
+        """Return every parked envelope once, clearing the parking map."""
+        released = []
+        seen: Set[int] = set()
+        for children in parked.values():
+            for child in children:
+                if id(child) not in seen:
+                    seen.add(id(child))
+                    child.pop('_after', None)
+                    released.append(child)
+        parked.clear()
+        return released
+
     def _process_outgoing_queue(self, db: sqlite3.Connection) -> None:
         """Process any envelopes in the outgoing queue."""
         cursor = db.execute("""
@@ -312,10 +472,10 @@ class PipelineRunner:
             
             for row in rows:
                 try:
-                    envelope = json.loads(row['envelope_data'])
+                    envelope = self.codec.decode(row['envelope_data'])
                     envelopes.append(envelope)
                     ids_to_delete.append(row['id'])
-                except json.JSONDecodeError:
+                except (ValueError, IndexError, UnicodeDecodeError):
                     self.log(f"Failed to parse envelope {row['id']} from queue")
                     
             # Process the envelopes
@@ -2,13 +2,14 @@
 Generic query registry system for protocols.
 Queries are registered dynamically and enforce read-only database access.
 """
+from concurrent.futures import Future, ThreadPoolExecutor
 from typing import Dict, Any, List, Callable, Optional, TypeVar
 import sqlite3
 import functools
 import inspect
 import importlib
 from pathlib import Path
-from .db import ReadOnlyConnection, get_readonly_connection
+from .db import ConnectionPool, ReadOnlyConnection, get_readonly_connection
 
 T = TypeVar('T')
 
@@ -83,6 +84,33 @@ class QueryRegistry:
 query_registry = QueryRegistry()
 
 
+class QueryExecutor:
+    """
+    Runs registered queries on a thread pool against read-only pooled
+    connections, so reads proceed concurrently with pipeline writes.
+    """
+
+    def __init__(self, pool: ConnectionPool, registry: Optional[QueryRegistry] = None, max_workers: int = 4):
+        self.pool = pool
+        self.registry = registry if registry is not None else query_registry
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='query')
+
+    def _run(self, name: str, params: Dict[str, Any]) -> Any:
+        return self.registry.execute(name, params, self.pool.reader())
+
+    def submit(self, name: str, params: Optional[Dict[str, Any]] = None) -> "Future[Any]":
+        """Schedule a query and return a future for its result."""
+        return self._executor.submit(self._run, name, params or {})
+
+    def execute(self, name: str, params: Optional[Dict[str, Any]] = None) -> Any:
+        """Run a query on a worker thread and wait for the result."""
+        return self.submit(name, params).result()
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop accepting queries and release the worker threads."""
+        self._executor.shutdown(wait=wait)
+
+
 def query(_func: Callable | None = None, *, param_type: Any | None = None, result_type: Any | None = None) -> Callable:
     """
     Decorator for query functions that enforces read-only database access.
@@ -170,6 +198,17 @@ def get_logs(params: Dict[str, Any], db: ReadOnlyConnection) -> List[Dict[str, A
     return []
 
 
+def get_metrics(db: ReadOnlyConnection, params: Dict[str, Any]) -> Dict[str, Any]:
+    """Get pipeline handler and queue metrics."""
+    from .handlers import registry
+    snapshot = registry.metrics.snapshot()
+    handler = params.get('handler')
+    if handler:
+        snapshot['handlers'] = {k: v for k, v in snapshot['handlers'].items() if k == handler}
+    return snapshot
+
+
 # System queries are registered separately (not auto-discovered)
 query_registry.register('system.dump_database', dump_database)
 query_registry.register('system.logs', get_logs)
+query_registry.register('system.metrics', get_metrics)
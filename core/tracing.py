@@ -0,0 +1,168 @@
+"""
+Level-gated tracing for the pipeline.
+
+Trace calls are cheap when disabled: messages take %-style arguments that are
+only formatted once a record is actually emitted, so hot paths can pass whole
+envelopes without paying for their repr. Individual event_ids can be watched
+to trace a single event at full detail while everything else stays quiet.
+"""
+import json
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, Dict, List, Optional, Set
+
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+OFF = 100
+
+LEVEL_NAMES = {DEBUG: 'DEBUG', INFO: 'INFO', WARNING: 'WARNING', ERROR: 'ERROR'}
+
+
+@dataclass
+class TraceRecord:
+    """A single emitted trace line."""
+    timestamp: float
+    level: int
+    source: str
+    message: str
+    event_id: Optional[str] = None
+
+
+Sink = Callable[[TraceRecord], None]
+
+
+class PrintSink:
+    """Sink that prints records to stdout."""
+
+    def __call__(self, record: TraceRecord) -> None:
+        timestamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(record.timestamp))
+        print(f"[{timestamp}] [{record.source}] {record.message}")
+
+
+class RingBufferSink:
+    """Sink that keeps the most recent records in memory."""
+
+    def __init__(self, capacity: int = 1000):
+        self._records: Deque[TraceRecord] = deque(maxlen=capacity)
+
+    def __call__(self, record: TraceRecord) -> None:
+        self._records.append(record)
+
+    def records(self, event_id: Optional[str] = None) -> List[TraceRecord]:
+        """Return buffered records, optionally only those for one event."""
+        if event_id is None:
+            return list(self._records)
+        return [r for r in self._records if r.event_id == event_id]
+
+    def clear(self) -> None:
+        self._records.clear()
+
+
+class EnvelopeRepr:
+    """Lazy, readable rendering of an envelope (bytes shown as truncated hex)."""
+
+    max_length = 500
+
+    def __init__(self, envelope: Any):
+        self.envelope = envelope
+
+    @staticmethod
+    def _serializable(obj: Any) -> Any:
+        if isinstance(obj, bytes):
+            return f"<bytes:{len(obj)}:{obj[:20].hex()}...>" if len(obj) > 20 else obj.hex()
+        elif isinstance(obj, dict):
+            return {k: EnvelopeRepr._serializable(v) for k, v in obj.items()}
+        elif isinstance(obj, list):
+            return [EnvelopeRepr._serializable(v) for v in obj]
+        return obj
+
+    def __str__(self) -> str:
+        text = json.dumps(self._serializable(self.envelope), indent=2, default=str)
+        if len(text) > self.max_length:
+            text = text[:self.max_length] + "..."
+        return text
+
+
+class Tracer:
+    """Pluggable tracer with levels, per-source sampling and event watches."""
+
+    def __init__(self, level: int = WARNING, sinks: Optional[List[Sink]] = None):
+        self.level = level
+        self.sinks: List[Sink] = sinks if sinks is not None else [PrintSink()]
+        self._sample_every: Dict[str, int] = {}
+        self._sample_counts: Dict[str, int] = {}
+        self._watched: Set[str] = set()
+
+    def set_level(self, level: int) -> None:
+        self.level = level
+
+    def add_sink(self, sink: Sink) -> None:
+        self.sinks.append(sink)
+
+    def remove_sink(self, sink: Sink) -> None:
+        if sink in self.sinks:
+            self.sinks.remove(sink)
+
+    def sample(self, source: str, every: int) -> None:
+        """Emit only one in every `every` records from a source (1 disables sampling)."""
+        if every <= 1:
+            self._sample_every.pop(source, None)
+        else:
+            self._sample_every[source] = every
+        self._sample_counts.pop(source, None)
+
+    def watch(self, event_id: str) -> None:
+        """Trace everything about this event_id regardless of level or sampling."""
+        self._watched.add(event_id)
+
+    def unwatch(self, event_id: str) -> None:
+        self._watched.discard(event_id)
+
+    def enabled(self, level: int, source: str = '', envelope: Optional[Dict[str, Any]] = None) -> bool:
+        """Return True if a record at this level would be emitted."""
+        if self._watched and envelope is not None and envelope.get('event_id') in self._watched:
+            return True
+        if level < self.level or not self.sinks:
+            return False
+        every = self._sample_every.get(source)
+        if every is not None:
+            count = self._sample_counts.get(source, 0)
+            self._sample_counts[source] = count + 1
+            return count % every == 0
+        return True
+
+    def trace(self, level: int, source: str, message: str, *args: Any,
+              envelope: Optional[Dict[str, Any]] = None) -> None:
+        """Emit a record if enabled; `args` are %-formatted lazily."""
+        if not self.enabled(level, source, envelope):
+            return
+        self.emit(level, source, message, *args, envelope=envelope)
+
+    def emit(self, level: int, source: str, message: str, *args: Any,
+             envelope: Optional[Dict[str, Any]] = None) -> None:
+        """Emit a record to every sink, bypassing level and sampling (callers gate)."""
+        if args:
+            message = message % args
+        event_id = envelope.get('event_id') if envelope is not None else None
+        record = TraceRecord(time.time(), level, source, message, event_id)
+        for sink in self.sinks:
+            sink(record)
+
+    def debug(self, source: str, message: str, *args: Any, envelope: Optional[Dict[str, Any]] = None) -> None:
+        self.trace(DEBUG, source, message, *args, envelope=envelope)
+
+    def info(self, source: str, message: str, *args: Any, envelope: Optional[Dict[str, Any]] = None) -> None:
+        self.trace(INFO, source, message, *args, envelope=envelope)
+
+    def warning(self, source: str, message: str, *args: Any, envelope: Optional[Dict[str, Any]] = None) -> None:
+        self.trace(WARNING, source, message, *args, envelope=envelope)
+
+    def error(self, source: str, message: str, *args: Any, envelope: Optional[Dict[str, Any]] = None) -> None:
+        self.trace(ERROR, source, message, *args, envelope=envelope)
+
+
+# Global tracer instance
+tracer = Tracer()
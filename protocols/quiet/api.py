@@ -20,6 +20,7 @@ EXPOSED: dict[str, str] = {
     'address.announce': 'flow',
     'identity.create_as_user': 'flow',
     'sync_request.run': 'flow',
+    'transit_secret.create_transit_secret': 'flow',
 
     # Former commands converted to flows
     'user.create': 'flow',
@@ -28,6 +29,7 @@ EXPOSED: dict[str, str] = {
     # Queries
     'message.get': 'query',
     'user.get': 'query',
+    'transit_secret.list': 'query',
 }
 
 # No aliases: prefer natural names directly
@@ -0,0 +1,85 @@
+"""
+Protocol-level envelope key table for the binary envelope codec.
+
+APPEND ONLY: stored envelopes refer to keys by their position here, so
+existing entries must never be removed or reordered.
+"""
+
+from core.codec import EnvelopeCodec
+
+ENVELOPE_KEYS = (
+    # Event identity and content
+    'event_plaintext',
+    'event_type',
+    'event_id',
+    'event_ciphertext',
+    'event_key_id',
+    'event_sealed',
+    'type',
+    'network_id',
+    'group_id',
+    'channel_id',
+    'peer_id',
+    'identity_id',
+    'user_id',
+    'key_id',
+    'created_at',
+    'content',
+    'name',
+    'public_key',
+    'signature',
+    # Dependencies
+    'deps',
+    'deps_included_and_valid',
+    'resolved_deps',
+    'missing_deps',
+    'missing_deps_list',
+    'retry_count',
+    'unblocked',
+    'unsealed_secret',
+    'transit_secret',
+    # Pipeline state flags
+    'self_created',
+    'self_signed',
+    'sig_checked',
+    'sig_failed',
+    'validated',
+    'projected',
+    'stored',
+    'write_to_store',
+    'is_group_member',
+    'should_remove',
+    'error',
+    'request_id',
+    '_process_count',
+    # Transit and network
+    'raw_data',
+    'transit_ciphertext',
+    'transit_key_id',
+    'origin_ip',
+    'origin_port',
+    'received_at',
+    'dest_ip',
+    'dest_port',
+    'due_ms',
+    'outgoing',
+    'outgoing_checked',
+    'is_outgoing',
+    'is_sync_request',
+    'in_response_to',
+    # Keys and secrets
+    'key_ref',
+    'seal_to',
+    'encrypt_to',
+    'prekey_id',
+    'tag_id',
+    'secret',
+    'local_metadata',
+    'store_as_identity',
+    'local_only',
+    # Jobs and projection
+    'job_name',
+    'deltas',
+)
+
+codec = EnvelopeCodec(ENVELOPE_KEYS)
@@ -0,0 +1,288 @@
+"""
+Fixed-size binary encoding of event plaintexts.
+
+Every event encodes to exactly EVENT_SIZE (512) bytes:
+
+    0    1   version
+    1    1   type code (TYPE_CODES; UNKNOWN_TYPE keeps 'type' in the extras)
+    2    1   flags (FLAG_SIGNED, FLAG_OVERFLOW)
+    3    2   presence bitmap of the type's fixed fields
+    5    2   body length
+    7    ..  body: fixed fields, then the extras, then zero padding
+    448  64  Ed25519 signature (zero when unsigned)
+
+Fixed fields come from the event's TypedDict in events/registry.py, in
+declaration order: ``*_id`` strings are 16-byte ids (32 hex chars),
+``*public_key``/``*pubkey`` strings are 32-byte keys and ints are signed
+64-bit big-endian. A field whose value does not fit its slot (an empty id,
+a 64-char peer id) is left absent and travels in the extras instead, so
+encoding is lossless. Extras are every other field, sorted by name and
+encoded with the protocol's envelope codec.
+
+The signature covers the encoding of the event without its signature:
+all 512 bytes, with the signature slot and FLAG_SIGNED cleared.
+
+Layouts are append-only in the same way as envelope_keys: never reorder
+TYPE_CODES or the fields of a registered TypedDict.
+"""
+import hashlib
+import struct
+from typing import Any, Dict, Optional, Tuple
+
+from protocols.quiet.envelope_keys import codec as _extras_codec
+from protocols.quiet.events.registry import EVENT_TYPE_REGISTRY
+
+EVENT_SIZE = 512
+VERSION = 1
+SIGNATURE_OFFSET = 448
+SIGNATURE_SIZE = 64
+HEADER_SIZE = 7
+BODY_SIZE = SIGNATURE_OFFSET - HEADER_SIZE
+
+FLAG_SIGNED = 0x01
+# Body did not fit: it is cut short and ends with a digest of the full body.
+# Such encodings can be signed and hashed but not decoded.
+FLAG_OVERFLOW = 0x02
+_DIGEST_SIZE = 32
+
+UNKNOWN_TYPE = 0xFF
+
+# Codes shared with ideal_protocol_design.md where the event exists there;
+# types specific to this implementation use 0x80 and up.
+TYPE_CODES: Dict[str, int] = {
+    'message': 0x00,
+    'channel': 0x01,
+    'address': 0x0C,
+    'invite': 0x0D,
+    'user': 0x0E,
+    'group': 0x14,
+    'key': 0x18,
+    'identity': 0x80,
+    'network': 0x81,
+    'transit_secret': 0x82,
+    'member': 0x83,
+    'peer': 0x84,
+    'sync_request': 0x85,
+}
+_TYPE_NAMES = {code: name for name, code in TYPE_CODES.items()}
+
+_HEADER = struct.Struct('>BBBHH')
+_INT = struct.Struct('>q')
+_KIND_SIZES = {'id': 16, 'key': 32, 'int': 8}
+
+
+class EventTooLargeError(ValueError):
+    """The event does not fit in EVENT_SIZE bytes."""
+
+
+class EventLayout:
+    """Fixed-offset fields of one event type."""
+
+    def __init__(self, event_type: str, fields: Tuple[Tuple[str, str], ...]):
+        if len(fields) > 16:
+            raise ValueError(f"Too many fixed fields for {event_type}")
+        self.event_type = event_type
+        self.code = TYPE_CODES.get(event_type, UNKNOWN_TYPE)
+        # name -> (offset, kind, presence bit)
+        self.slots: Dict[str, Tuple[int, str, int]] = {}
+        offset = HEADER_SIZE
+        for bit, (name, kind) in enumerate(fields):
+            self.slots[name] = (offset, kind, 1 << bit)
+            offset += _KIND_SIZES[kind]
+        self.fixed_size = offset - HEADER_SIZE
+
+    @classmethod
+    def from_typed_dict(cls, event_type: str, typed_dict: Any) -> 'EventLayout':
+        fields = []
+        for name, annotation in typed_dict.__annotations__.items():
+            if name in ('type', 'signature'):
+                continue
+            if annotation is int:
+                fields.append((name, 'int'))
+            elif annotation in (str, Optional[str]):
+                if name.endswith('_id'):
+                    fields.append((name, 'id'))
+                elif name.endswith(('public_key', 'pubkey')):
+                    fields.append((name, 'key'))
+        return cls(event_type, tuple(fields))
+
+
+LAYOUTS: Dict[str, EventLayout] = {
+    event_type: EventLayout.from_typed_dict(event_type, typed_dict)
+    for event_type, typed_dict in EVENT_TYPE_REGISTRY.items()
+}
+_LAYOUTS_BY_CODE = {layout.code: layout for layout in LAYOUTS.values() if layout.code != UNKNOWN_TYPE}
+_NO_LAYOUT = EventLayout('', ())
+
+
+def _layout_for(event_type: Any) -> EventLayout:
+    layout = LAYOUTS.get(event_type)
+    if layout is not None:
+        return layout
+    if event_type in TYPE_CODES:
+        # Known type without a TypedDict: everything goes in the extras
+        return EventLayout(event_type, ())
+    return _NO_LAYOUT
+
+
+def _pack_slot(buf: bytearray, offset: int, kind: str, value: Any) -> bool:
+    """Write value into its slot; False if it does not fit there."""
+    if kind == 'int':
+        if type(value) is not int or not -(1 << 63) <= value < (1 << 63):
+            return False
+        _INT.pack_into(buf, offset, value)
+        return True
+    size = _KIND_SIZES[kind]
+    if not isinstance(value, str) or len(value) != size * 2 or value != value.lower():
+        return False
+    try:
+        buf[offset:offset + size] = bytes.fromhex(value)
+    except ValueError:
+        return False
+    return True
+
+
+def encode_event(event_plaintext: Dict[str, Any], *, allow_overflow: bool = False) -> bytes:
+    """Encode a plaintext event to exactly EVENT_SIZE bytes.
+
+    Raises EventTooLargeError if the event does not fit, unless
+    allow_overflow is set, in which case the body is cut short and ends
+    with a digest of the full body (see FLAG_OVERFLOW).
+    """
+    event_type = event_plaintext.get('type')
+    layout = _layout_for(event_type)
+    buf = bytearray(EVENT_SIZE)
+    flags = 0
+    presence = 0
+    extras: Dict[str, Any] = {}
+
+    for name, value in event_plaintext.items():
+        if name == 'type' and layout.code != UNKNOWN_TYPE:
+            continue
+        if name == 'signature' and isinstance(value, str) and len(value) == SIGNATURE_SIZE * 2:
+            try:
+                buf[SIGNATURE_OFFSET:] = bytes.fromhex(value)
+                flags |= FLAG_SIGNED
+                continue
+            except ValueError:
+                pass
+        slot = layout.slots.get(name)
+        if slot is not None and _pack_slot(buf, slot[0], slot[1], value):
+            presence |= slot[2]
+            continue
+        extras[name] = value
+
+    body_len = layout.fixed_size
+    if extras:
+        packed = _extras_codec.encode({name: extras[name] for name in sorted(extras)})
+        body_len += len(packed)
+        if body_len > BODY_SIZE:
+            if not allow_overflow:
+                raise EventTooLargeError(
+                    f"{event_type} event needs {body_len} body bytes, at most {BODY_SIZE} fit")
+            body = bytes(buf[HEADER_SIZE:HEADER_SIZE + layout.fixed_size]) + packed
+            keep = BODY_SIZE - _DIGEST_SIZE
+            buf[HEADER_SIZE:HEADER_SIZE + keep] = body[:keep]
+            buf[HEADER_SIZE + keep:SIGNATURE_OFFSET] = hashlib.blake2b(body, digest_size=_DIGEST_SIZE).digest()
+            flags |= FLAG_OVERFLOW
+            body_len = BODY_SIZE
+        else:
+            start = HEADER_SIZE + layout.fixed_size
+            buf[start:start + len(packed)] = packed
+
+    _HEADER.pack_into(buf, 0, VERSION, layout.code, flags, presence, body_len)
+    return bytes(buf)
+
+
+class EventView:
+    """Read-only access to an encoded event without decoding all of it.
+
+    Fixed fields are read straight out of the buffer; nothing is copied
+    until a value is returned.
+    """
+
+    __slots__ = ('buffer', 'layout', 'flags', 'presence', 'body_len')
+
+    def __init__(self, data: Any):
+        buffer = memoryview(data)
+        if len(buffer) != EVENT_SIZE:
+            raise ValueError(f"Encoded events are {EVENT_SIZE} bytes, got {len(buffer)}")
+        version, code, flags, presence, body_len = _HEADER.unpack_from(buffer, 0)
+        if version != VERSION:
+            raise ValueError(f"Unsupported event encoding version {version}")
+        self.buffer = buffer
+        if code in _LAYOUTS_BY_CODE:
+            self.layout = _LAYOUTS_BY_CODE[code]
+        elif code in _TYPE_NAMES:
+            self.layout = _layout_for(_TYPE_NAMES[code])
+        else:
+            self.layout = _NO_LAYOUT
+        self.flags = flags
+        self.presence = presence
+        self.body_len = body_len
+
+    @property
+    def event_type(self) -> Optional[str]:
+        if self.layout.code != UNKNOWN_TYPE:
+            return self.layout.event_type
+        return self.extras().get('type')
+
+    @property
+    def signature(self) -> Optional[bytes]:
+        if not self.flags & FLAG_SIGNED:
+            return None
+        return bytes(self.buffer[SIGNATURE_OFFSET:])
+
+    @property
+    def signed_bytes(self) -> bytes:
+        """The bytes the signature covers: the encoding without a signature."""
+        unsigned = bytearray(self.buffer[:SIGNATURE_OFFSET])
+        unsigned[2] &= ~FLAG_SIGNED
+        return bytes(unsigned) + bytes(SIGNATURE_SIZE)
+
+    def __contains__(self, name: str) -> bool:
+        slot = self.layout.slots.get(name)
+        return slot is not None and bool(self.presence & slot[2])
+
+    def __getitem__(self, name: str) -> Any:
+        slot = self.layout.slots.get(name)
+        if slot is None or not self.presence & slot[2]:
+            raise KeyError(name)
+        offset, kind, _ = slot
+        if kind == 'int':
+            return _INT.unpack_from(self.buffer, offset)[0]
+        return self.buffer[offset:offset + _KIND_SIZES[kind]].hex()
+
+    def get(self, name: str, default: Any = None) -> Any:
+        try:
+            return self[name]
+        except KeyError:
+            return default
+
+    def extras(self) -> Dict[str, Any]:
+        if self.flags & FLAG_OVERFLOW:
+            raise ValueError("Overflowed event encodings cannot be decoded")
+        start = HEADER_SIZE + self.layout.fixed_size
+        end = HEADER_SIZE + self.body_len
+        if end <= start:
+            return {}
+        return _extras_codec.decode(self.buffer[start:end])
+
+    def to_dict(self) -> Dict[str, Any]:
+        event: Dict[str, Any] = {}
+        if self.layout.code != UNKNOWN_TYPE:
+            event['type'] = self.layout.event_type
+        for name in self.layout.slots:
+            if name in self:
+                event[name] = self[name]
+        event.update(self.extras())
+        signature = self.signature
+        if signature is not None:
+            event['signature'] = signature.hex()
+        return event
+
+
+def decode_event(data: Any) -> Dict[str, Any]:
+    """Decode bytes produced by encode_event() back to the plaintext dict."""
+    return EventView(data).to_dict()
+
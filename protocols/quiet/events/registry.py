@@ -102,6 +102,15 @@ class UserEventData(TypedDict):
     created_at: int
     signature: str
 
+class PeerEventData(TypedDict):
+    """Peer event data structure"""
+    type: Literal["peer"]
+    public_key: str
+    identity_id: str
+    username: str
+    created_at: int
+    signature: str
+
 class MemberEventData(TypedDict):
     """Member event data structure (for group membership)"""
     type: Literal["member"]
@@ -125,6 +134,7 @@ EVENT_TYPE_REGISTRY: dict[str, Type[Any]] = {
     "invite": InviteEventData,
     "user": UserEventData,
     "member": MemberEventData,
+    "peer": PeerEventData,
 }
 
 # Command parameter types using dataclasses for validation
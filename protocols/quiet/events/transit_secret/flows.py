@@ -0,0 +1,60 @@
+"""
+Flows for transit secret operations.
+"""
+from __future__ import annotations
+
+import time
+from typing import Any, Dict
+
+from core import crypto
+from core.flows import FlowCtx, flow_op
+
+
+@flow_op()  # Registers as 'transit_secret.create_transit_secret'
+def create_transit_secret(params: Dict[str, Any]) -> Dict[str, Any]:
+    """Create a transit secret for one of our peers.
+
+    Only the key id is shared; the secret rides along in the envelope so the
+    projector records it in transit_keys, where the transit keyring finds it.
+    """
+    ctx = FlowCtx.from_params(params)
+    network_id = params.get('network_id', '')
+    peer_id = params.get('peer_id', '')
+    identity_id = params.get('identity_id', '')
+    if not network_id:
+        raise ValueError('network_id is required for create_transit_secret')
+    if not peer_id:
+        if not identity_id:
+            raise ValueError('identity_id or peer_id is required for create_transit_secret')
+        row = ctx.db.execute(
+            "SELECT peer_id FROM peers WHERE identity_id = ? ORDER BY created_at DESC LIMIT 1",
+            (identity_id,),
+        ).fetchone()
+        if not row:
+            raise ValueError(f'No peer found for identity {identity_id}')
+        peer_id = row[0]
+
+    transit_secret = crypto.generate_secret()
+    transit_key_id = crypto.generate_secret().hex()
+
+    event_id = ctx.emit_event(
+        'transit_secret',
+        {
+            'transit_key_id': transit_key_id,
+            'peer_id': peer_id,
+            'network_id': network_id,
+            'created_at': int(time.time() * 1000),
+        },
+        by=peer_id,
+        deps=[f'peer:{peer_id}'],
+        secret={'transit_secret': transit_secret},
+    )
+
+    return {
+        'ids': {'transit_secret': event_id},
+        'data': {
+            'transit_key_id': transit_key_id,
+            'peer_id': peer_id,
+            'network_id': network_id,
+        },
+    }
@@ -8,7 +8,8 @@ def project(envelope: Dict[str, Any]) -> List[Dict[str, Any]]:
     """
     Project transit secret event to state.
     Transit secrets are primarily for sharing the key_id publicly.
-    The actual secret is kept local.
+    The actual secret is kept local: it is only recorded, in transit_keys,
+    for transit secrets this node created itself.
     """
     event_data = envelope.get('event_plaintext', {})
     transit_key_id = event_data['transit_key_id']
@@ -29,5 +30,17 @@ def project(envelope: Dict[str, Any]) -> List[Dict[str, Any]]:
             }
         }
     ]
-    
+
+    transit_secret = envelope.get('secret', {}).get('transit_secret')
+    if transit_secret:
+        deltas.append({
+            'op': 'insert',
+            'table': 'transit_keys',
+            'data': {
+                'transit_key_id': transit_key_id,
+                'transit_secret': transit_secret,
+                'network_id': network_id
+            }
+        })
+
     return deltas
\ No newline at end of file
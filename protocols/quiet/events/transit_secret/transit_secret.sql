@@ -10,4 +10,11 @@ CREATE TABLE IF NOT EXISTS peer_transit_keys (
 
 -- Indexes for peer_transit_keys  
 CREATE INDEX IF NOT EXISTS idx_peer_transit_keys_peer ON peer_transit_keys(peer_id);
-CREATE INDEX IF NOT EXISTS idx_peer_transit_keys_network ON peer_transit_keys(network_id);
\ No newline at end of file
+CREATE INDEX IF NOT EXISTS idx_peer_transit_keys_network ON peer_transit_keys(network_id);
+
+-- Our own transit secrets (local only, never synced)
+CREATE TABLE IF NOT EXISTS transit_keys (
+    transit_key_id TEXT PRIMARY KEY,
+    transit_secret BLOB NOT NULL,
+    network_id TEXT NOT NULL
+);
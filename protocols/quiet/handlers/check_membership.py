@@ -59,6 +59,8 @@ def handler(envelope: dict[str, Any]) -> dict[str, Any]:
 class CheckMembershipHandler(Handler):
     """Handler for checking group membership."""
 
+    envelope_keys = ('event_plaintext',)
+
     @property
     def name(self) -> str:
         return "check_membership"
@@ -76,6 +76,8 @@ def handler(envelope: dict[str, Any]) -> dict[str, Any] | None:
 class CheckOutgoingHandler(Handler):
     """Handler for check outgoing."""
 
+    envelope_keys = ('outgoing',)
+
     @property
     def name(self) -> str:
         return "check_outgoing"
@@ -2,17 +2,24 @@
 Unified Crypto handler - Handles both transit and event encryption/decryption.
 
 This is a PURE handler that:
-- Uses only resolved_deps for key material (no database access)
+- Uses only resolved_deps for key material (the only database access is the
+  known-event check that drops re-delivered events after transit decryption)
 - Only processes envelopes with deps_included_and_valid=true (ignores envelopes with missing deps)
 - Transforms envelopes without side effects
 
 Replaces the legacy transit_crypto and event_crypto handlers.
-SQL schemas (transit_keys, event_keys tables) are deprecated - all keys come from events.
+SQL schemas (event_keys table) are deprecated - keys come from events; transit_keys
+only holds this node's own transit secrets.
 """
-from typing import Any, List
+from typing import Any, Callable, List, Optional, Tuple
 import sqlite3
 import hashlib
-from core.handlers import Handler
+from core import crypto
+from core.cache import LRUCache
+from core.handlers import DROPPED, Handler
+from protocols.quiet import transit
+from protocols.quiet.event_codec import EventTooLargeError, decode_event, encode_event
+from protocols.quiet.handlers.event_store import is_known_event
 
 
 def filter_func(envelope: dict[str, Any]) -> bool:
@@ -60,7 +67,8 @@ def filter_func(envelope: dict[str, Any]) -> bool:
     return False
 
 
-def handler(envelope: dict[str, Any]) -> dict[str, Any]:
+def handler(envelope: dict[str, Any],
+            is_known_event: Optional[Callable[[str], bool]] = None) -> dict[str, Any]:
     """
     Handle all crypto operations in order:
     1. Transit decryption (if incoming)
@@ -70,6 +78,8 @@ def handler(envelope: dict[str, Any]) -> dict[str, Any]:
 
     Args:
         envelope: dict[str, Any] needing crypto operations
+        is_known_event: Optional check for event_ids already received; events
+            it reports are dropped right after transit decryption
 
     Returns:
         Transformed envelope
@@ -79,6 +89,17 @@ def handler(envelope: dict[str, Any]) -> dict[str, Any]:
         'key_ref' not in envelope and
         envelope.get('deps_included_and_valid')):
         envelope = decrypt_transit(envelope)
+        if envelope.get('error'):
+            return envelope
+        # The event_id (hash of the event ciphertext) is now known: skip
+        # event decryption, signature checks, validation and projection for
+        # events we already have
+        if is_known_event is not None and is_known_event(envelope['event_id']):
+            envelope[DROPPED] = 'duplicate'
+            return envelope
+        if not envelope.get('deps_included_and_valid'):
+            # The event key still has to be resolved
+            return envelope
 
     # Phase 2: Event-layer operations
     # Handle seal/unseal first (special case of event crypto)
@@ -111,9 +132,21 @@ def handler(envelope: dict[str, Any]) -> dict[str, Any]:
     return envelope
 
 
+def _transit_secret(transit_key_data: Any) -> Optional[bytes]:
+    """The resolved transit secret, if it is a real 32-byte key."""
+    if not isinstance(transit_key_data, dict):
+        return None
+    secret = transit_key_data.get('transit_secret')
+    return secret if transit.is_real_secret(secret) else None
+
+
 def decrypt_transit(envelope: dict[str, Any]) -> dict[str, Any]:
-    """Decrypt transit layer to reveal event encryption layer."""
-    # TODO: Implement actual decryption logic
+    """Decrypt transit layer to reveal event encryption layer.
+
+    Packets under real transit secrets are normally opened by
+    ReceiveFromNetworkHandler already; this covers the ones that reached
+    resolve_deps, and keeps the stub for older placeholder secrets.
+    """
 
     # Extract transit key from resolved_deps
     transit_key_id = envelope['transit_key_id']
@@ -139,12 +172,24 @@ def decrypt_transit(envelope: dict[str, Any]) -> dict[str, Any]:
         transit_key_data = resolved_deps.get(transit_key_dep, {})
         network_id = transit_key_data.get('network_id', 'stub_network_id')
 
-    # Would normally:
-    # 1. Decrypt transit_ciphertext using transit key
-    # 2. Extract network_id, key_ref, event_ciphertext
-    # 3. Parse key_ref to determine encryption type
+    secret = _transit_secret(transit_key_data)
+    if secret is not None:
+        raw_data = bytes.fromhex(transit_key_id) + envelope['transit_ciphertext']
+        payload = transit.open_payload(raw_data, secret)
+        if payload is None:
+            envelope['error'] = "Transit decryption failed"
+            return envelope
+        opened = transit.transit_envelope({'raw_data': raw_data}, payload, network_id)
+        for field in ('network_id', 'event_ciphertext', 'event_id', 'key_ref', 'write_to_store'):
+            envelope[field] = opened[field]
+        missing = [dep for dep in opened['deps'] if dep not in envelope.get('deps', [])]
+        if missing:
+            # Resolve the event key before event decryption
+            envelope['deps'] = envelope.get('deps', []) + missing
+            envelope['deps_included_and_valid'] = False
+        return envelope
 
-    # Stub implementation
+    # Stub for placeholder secrets
     envelope['network_id'] = network_id
     envelope['event_ciphertext'] = b'stub_event_ciphertext'
 
@@ -183,7 +228,6 @@ def decrypt_transit(envelope: dict[str, Any]) -> dict[str, Any]:
 
 def encrypt_transit(envelope: dict[str, Any]) -> dict[str, Any]:
     """Apply transit layer encryption to outgoing envelope."""
-    # TODO: Implement actual transit encryption logic
 
     # Extract transit key from resolved_deps
     transit_key_id = envelope['transit_key_id']
@@ -202,12 +246,6 @@ def encrypt_transit(envelope: dict[str, Any]) -> dict[str, Any]:
         transit_key_dep = f"transit_key:{transit_key_id}"
         transit_key_data = resolved_deps.get(transit_key_dep, {})
 
-    # Would normally:
-    # 1. Create transit plaintext containing event_ciphertext and metadata
-    # 2. Encrypt using transit key
-    # 3. Strip all sensitive data from envelope
-
-    # Stub: Wrap event ciphertext in transit "encryption"
     event_ciphertext = envelope['event_ciphertext']
     transit_plaintext = {
         'event_ciphertext': event_ciphertext,
@@ -215,9 +253,16 @@ def encrypt_transit(envelope: dict[str, Any]) -> dict[str, Any]:
         'network_id': envelope.get('network_id')
     }
 
+    secret = _transit_secret(transit_key_data)
+    if secret is not None:
+        transit_ciphertext = transit.seal_payload(transit_key_id, secret, transit_plaintext)
+    else:
+        # Stub for placeholder secrets
+        transit_ciphertext = f"transit_encrypted:{transit_plaintext}".encode()
+
     # Create new envelope with only transit-layer data
     transit_envelope: dict[str, Any] = {
-        'transit_ciphertext': f"transit_encrypted:{transit_plaintext}".encode(),
+        'transit_ciphertext': transit_ciphertext,
         'transit_key_id': transit_key_id,
         'dest_ip': envelope.get('dest_ip', '127.0.0.1'),
         'dest_port': envelope.get('dest_port', 8080),
@@ -253,20 +298,79 @@ def unseal_key_event(envelope: dict[str, Any]) -> dict[str, Any]:
     return envelope
 
 
+# Plaintexts decrypted ahead of process() by decrypt_events(), keyed by
+# (key, event_ciphertext)
+decrypted_events = LRUCache(4096)
+
+
+def _event_key(envelope: dict[str, Any], key_id: Any) -> Optional[bytes]:
+    """The 32-byte secret of resolved dependency key:<key_id>, if there is one."""
+    dep = (envelope.get('resolved_deps') or {}).get(f"key:{key_id}")
+    secret = dep.get('unsealed_secret') if isinstance(dep, dict) else None
+    if isinstance(secret, str):
+        try:
+            secret = bytes.fromhex(secret)
+        except ValueError:
+            return None
+    if isinstance(secret, (bytes, bytearray)) and len(secret) == crypto.SECRET_KEY_SIZE:
+        return bytes(secret)
+    return None
+
+
+def _split_ciphertext(event_ciphertext: bytes) -> Tuple[bytes, bytes]:
+    """Split nonce || ciphertext into (ciphertext, nonce)."""
+    return event_ciphertext[crypto.NONCE_SIZE:], event_ciphertext[:crypto.NONCE_SIZE]
+
+
+def decrypt_events(envelopes: List[dict[str, Any]]) -> int:
+    """Decrypt envelopes that share keys in one pass per key.
+
+    Nothing is written to the envelopes; decrypt_event() then finds the
+    plaintexts in decrypted_events. Returns how many were decrypted.
+    """
+    by_key: dict[bytes, List[bytes]] = {}
+    for envelope in envelopes:
+        key_ref = envelope.get('key_ref')
+        if not isinstance(key_ref, dict) or key_ref.get('kind') != 'key':
+            continue
+        event_ciphertext = envelope.get('event_ciphertext')
+        secret = _event_key(envelope, key_ref.get('id'))
+        if secret is None or not isinstance(event_ciphertext, bytes):
+            continue
+        if decrypted_events.peek((secret, event_ciphertext)) is None:
+            by_key.setdefault(secret, []).append(event_ciphertext)
+
+    count = 0
+    for secret, ciphertexts in by_key.items():
+        plaintexts = crypto.decrypt_batch([_split_ciphertext(c) for c in ciphertexts], secret)
+        for event_ciphertext, plaintext in zip(ciphertexts, plaintexts):
+            if plaintext is not None:
+                decrypted_events.put((secret, event_ciphertext), plaintext)
+                count += 1
+    return count
+
+
 def decrypt_event(envelope: dict[str, Any]) -> dict[str, Any]:
     """Decrypt a regular event."""
-    # TODO: Implement actual decryption logic
+    secret = _event_key(envelope, envelope['key_ref'].get('id'))
 
-    # Would normally:
-    # 1. Get key from resolved_deps using event_key_id
-    # 2. Decrypt event_ciphertext using the key
-    # 3. Parse decrypted data as event_plaintext
-
-    # Stub implementation
-    envelope['event_plaintext'] = {
-        'type': envelope.get('event_type', 'unknown'),
-        'content': 'stub_decrypted_content'
-    }
+    if secret is None:
+        # No key material resolved (key events are still unsealed by a stub)
+        envelope['event_plaintext'] = {
+            'type': envelope.get('event_type', 'unknown'),
+            'content': 'stub_decrypted_content'
+        }
+    else:
+        event_ciphertext = envelope.get('event_ciphertext', b'')
+        try:
+            plaintext = decrypted_events.get((secret, event_ciphertext))
+            if plaintext is None:
+                ciphertext, nonce = _split_ciphertext(event_ciphertext)
+                plaintext = crypto.decrypt(ciphertext, secret, nonce)
+            envelope['event_plaintext'] = decode_event(plaintext)
+        except Exception as e:
+            envelope['error'] = f"Event decryption failed: {e}"
+            return envelope
 
     # Extract event_type from plaintext if not already set
     if 'event_type' not in envelope and 'type' in envelope['event_plaintext']:
@@ -306,31 +410,38 @@ def encrypt_event(envelope: dict[str, Any]) -> dict[str, Any]:
         return envelope
 
     # Regular event encryption
-    # TODO: Implement actual encryption logic
-    # Would normally:
-    # 1. Determine which key to use for encryption (from network/group context)
-    # 2. Serialize event_plaintext to canonical 512-byte form
-    # 3. Encrypt the serialized data
-    # 4. Set key_ref to indicate which key was used
-
-    # Stub: Use a deterministic "encryption" for testing
-    plaintext_str = str(event_plaintext)
-    envelope['event_ciphertext'] = f"encrypted:{plaintext_str}".encode()
-
-    # Determine key_ref (would normally come from group/network context)
-    if 'group_id' in event_plaintext:
-        # Group events use symmetric key encryption
-        envelope['key_ref'] = {
-            'kind': 'key',
-            'id': f"group_key_{event_plaintext['group_id']}"
-        }
+    try:
+        encoded = encode_event(event_plaintext)
+    except EventTooLargeError as e:
+        envelope['error'] = str(e)
+        return envelope
+
+    key_id = envelope.get('encrypt_to')
+    secret = _event_key(envelope, key_id) if key_id else None
+    if secret is not None:
+        # nonce || XChaCha20-Poly1305(512-byte event)
+        ciphertext, nonce = crypto.encrypt(encoded, secret)
+        envelope['event_ciphertext'] = nonce + ciphertext
+        envelope['key_ref'] = {'kind': 'key', 'id': key_id}
     else:
-        # Network events might use peer encryption
-        peer_id = event_plaintext.get('peer_id', envelope.get('peer_id', 'default_peer'))
-        envelope['key_ref'] = {
-            'kind': 'peer',
-            'id': peer_id
-        }
+        # Keyless events (no flow creates key events with real secrets, so
+        # none sets encrypt_to) keep the deterministic placeholder encoding
+        envelope['event_ciphertext'] = b"encrypted:" + encoded
+
+        # Determine key_ref (would normally come from group/network context)
+        if 'group_id' in event_plaintext:
+            # Group events use symmetric key encryption
+            envelope['key_ref'] = {
+                'kind': 'key',
+                'id': f"group_key_{event_plaintext['group_id']}"
+            }
+        else:
+            # Network events might use peer encryption
+            peer_id = event_plaintext.get('peer_id', envelope.get('peer_id', 'default_peer'))
+            envelope['key_ref'] = {
+                'kind': 'peer',
+                'id': peer_id
+            }
 
     # Generate event_id from ciphertext (blake2b-16 hash)
     # This ensures consistent event_id across all nodes
@@ -431,6 +542,10 @@ def open_sealed_event(envelope: dict[str, Any]) -> dict[str, Any]:
 class CryptoHandler(Handler):
     """Unified handler for all crypto operations."""
 
+    envelope_keys = (
+        'transit_key_id', 'outgoing_checked', 'key_ref', 'validated', 'seal_to', 'event_sealed',
+    )
+
     @property
     def name(self) -> str:
         return "crypto"
@@ -439,9 +554,13 @@ class CryptoHandler(Handler):
         """Check if this handler should process the envelope."""
         return filter_func(envelope)
 
+    def prefetch(self, envelopes: List[dict[str, Any]], db: sqlite3.Connection) -> None:
+        """Decrypt the events reaching this stage in one pass per key ahead of process()."""
+        decrypt_events([envelope for envelope in envelopes if filter_func(envelope)])
+
     def process(self, envelope: dict[str, Any], db: sqlite3.Connection) -> List[dict[str, Any]]:
         """Process the envelope."""
-        result = handler(envelope)
+        result = handler(envelope, lambda event_id: is_known_event(event_id, db))
         if result:
             return [result]
         return []
@@ -10,8 +10,12 @@ From plan.md:
 # Removed core.types import
 import sqlite3
 import time
-from typing import Dict, List, Optional, Any
-from core.handlers import Handler
+from typing import Dict, List, Optional, Any, Tuple
+from core.bloom import BloomFilter
+from core.db import database_instance_id
+from core.handlers import Handler, registry
+from core.tracing import tracer
+from protocols.quiet.handlers.resolve_deps import invalidate_dependencies
 
 
 def filter_func(envelope: dict[str, Any]) -> bool:
@@ -26,6 +30,63 @@ def filter_func(envelope: dict[str, Any]) -> bool:
             not envelope.get('store_as_identity'))
 
 
+# Bloom filter of event_ids in each database's events table, by instance id
+_known_events: Dict[str, BloomFilter] = {}
+# Smallest filter built; filters are rebuilt at twice the row count once full
+KNOWN_EVENTS_MIN_CAPACITY = 10_000
+
+
+def _known_events_filter(db: sqlite3.Connection) -> Optional[BloomFilter]:
+    """Return db's known-event filter, building it from the events table if needed."""
+    scope = database_instance_id(db)
+    if scope is None:
+        return None
+    known = _known_events.get(scope)
+    if known is None or known.saturated:
+        count = db.execute("SELECT COUNT(*) FROM events").fetchone()[0]
+        known = BloomFilter(max(KNOWN_EVENTS_MIN_CAPACITY, count * 2))
+        for row in db.execute("SELECT event_id FROM events"):
+            known.add(row[0])
+        _known_events[scope] = known
+    return known
+
+
+def might_be_stored(event_id: str, db: sqlite3.Connection) -> bool:
+    """False only if event_id is definitely not in the events table."""
+    known = _known_events_filter(db)
+    return known is None or event_id in known
+
+
+def remember_stored(event_id: str, db: sqlite3.Connection) -> None:
+    """Record that event_id now has a row in the events table."""
+    known = _known_events_filter(db)
+    if known is not None:
+        known.add(event_id)
+
+
+def is_known_event(event_id: str, db: sqlite3.Connection) -> bool:
+    """True if event_id has a row in the events table (stored or purged)."""
+    if not might_be_stored(event_id, db):
+        return False
+    return db.execute("SELECT 1 FROM events WHERE event_id = ?", (event_id,)).fetchone() is not None
+
+
+def _mark_existing(envelope: dict[str, Any], db: sqlite3.Connection) -> bool:
+    """If the envelope's event is already stored, mark the envelope and return True."""
+    cursor = db.execute(
+        "SELECT purged FROM events WHERE event_id = ?",
+        (envelope['event_id'],)
+    )
+    existing = cursor.fetchone()
+    if not existing:
+        return False
+    if existing['purged']:
+        envelope['error'] = "Event is purged"
+    else:
+        envelope['stored'] = True
+    return True
+
+
 def handler(envelope: dict[str, Any], db: sqlite3.Connection) -> dict[str, Any]:
     """
     Store event data in database.
@@ -42,18 +103,8 @@ def handler(envelope: dict[str, Any], db: sqlite3.Connection) -> dict[str, Any]:
         envelope['error'] = "No event_id to store"
         return envelope
     
-    # Check if already stored
-    cursor = db.execute(
-        "SELECT purged FROM events WHERE event_id = ?",
-        (event_id,)
-    )
-    existing = cursor.fetchone()
-    
-    if existing:
-        if existing['purged']:
-            envelope['error'] = "Event is purged"
-            return envelope
-        envelope['stored'] = True
+    # Check if already stored; ids the filter has never seen are new
+    if might_be_stored(event_id, db) and _mark_existing(envelope, db):
         return envelope
     
     # Store event
@@ -91,8 +142,15 @@ def handler(envelope: dict[str, Any], db: sqlite3.Connection) -> dict[str, Any]:
         ))
         
         db.commit()
+        remember_stored(event_id, db)
         envelope['stored'] = True
         
+    except sqlite3.IntegrityError as e:
+        db.rollback()
+        # Possibly stored by a writer the filter did not see
+        remember_stored(event_id, db)
+        if not _mark_existing(envelope, db):
+            envelope['error'] = f"Failed to store event: {str(e)}"
     except Exception as e:
         db.rollback()
         envelope['error'] = f"Failed to store event: {str(e)}"
@@ -144,16 +202,114 @@ def purge_event(event_id: str, db: sqlite3.Connection, reason: str = "validation
         db.execute("DELETE FROM projected_events WHERE event_id = ?", (event_id,))
         
         db.commit()
+        remember_stored(event_id, db)
+        invalidate_dependencies(db, [event_id])
         return True
         
     except Exception as e:
         db.rollback()
-        print(f"Failed to purge event {event_id}: {e}")
+        tracer.error('event_store', "Failed to purge event %s: %s", event_id, e)
         return False
 
+
+# Expired purged events deleted per transaction, so the write lock is short
+PURGED_GC_CHUNK = 500
+# Chunks per job run; the rest waits for the next run
+PURGED_GC_MAX_CHUNKS = 20
+# Free pages returned to the filesystem per run on incremental-vacuum databases
+INCREMENTAL_VACUUM_PAGES = 2048
+# Minimum time between full VACUUMs on databases without incremental vacuum
+FULL_VACUUM_EVERY_MS = 24 * 60 * 60 * 1000
+
+
+def gc_purged_events(db: sqlite3.Connection, now_ms: int, chunk_size: int = PURGED_GC_CHUNK,
+                     max_chunks: int = PURGED_GC_MAX_CHUNKS) -> int:
+    """Delete purged events whose TTL has passed, committing after each chunk.
+
+    Returns the number of events deleted.
+    """
+    deleted = 0
+    for _ in range(max_chunks):
+        rows = [(row[0],) for row in db.execute("""
+            SELECT event_id FROM events
+            WHERE purged = 1 AND ttl_expire_at < ?
+            LIMIT ?
+        """, (now_ms, chunk_size))]
+        if not rows:
+            break
+        db.executemany("DELETE FROM projected_events WHERE event_id = ?", rows)
+        db.executemany("DELETE FROM events WHERE event_id = ?", rows)
+        db.commit()
+        deleted += len(rows)
+        if len(rows) < chunk_size:
+            break
+    return deleted
+
+
+def reclaim_free_pages(db: sqlite3.Connection, now_ms: int, state: Dict[str, Any]) -> int:
+    """Give free pages back to the filesystem; returns the bytes reclaimed.
+
+    Databases in incremental auto-vacuum mode release a bounded number of
+    pages per call. Others get a full VACUUM at most once per
+    FULL_VACUUM_EVERY_MS (tracked in state['last_vacuum_ms']).
+    get_connection asks for incremental mode, so that VACUUM also converts
+    older databases. Nothing is done inside an open transaction.
+    """
+    # Both vacuum forms end any open transaction, which would break batch mode
+    if db.in_transaction:
+        return 0
+    page_size = db.execute("PRAGMA page_size").fetchone()[0]
+    auto_vacuum = db.execute("PRAGMA auto_vacuum").fetchone()[0]
+    free_pages = db.execute("PRAGMA freelist_count").fetchone()[0]
+    if not free_pages:
+        return 0
+
+    before = db.execute("PRAGMA page_count").fetchone()[0]
+    if auto_vacuum == 2:  # INCREMENTAL
+        # executescript steps the pragma to completion; execute() frees one page
+        db.executescript(f"PRAGMA incremental_vacuum({INCREMENTAL_VACUUM_PAGES});")
+    elif now_ms - int(state.get('last_vacuum_ms', 0)) >= FULL_VACUUM_EVERY_MS:
+        db.execute("VACUUM")
+        state['last_vacuum_ms'] = now_ms
+    else:
+        return 0
+    after = db.execute("PRAGMA page_count").fetchone()[0]
+    return max(0, before - after) * page_size
+
+
+def purged_events_job(state: Dict[str, Any], db: sqlite3.Connection,
+                      time_now_ms: int) -> Tuple[bool, Dict[str, Any], List[Dict[str, Any]]]:
+    """Job: delete expired purged events and reclaim the space they used."""
+    new_state = dict(state)
+    deleted = gc_purged_events(db, time_now_ms)
+    reclaimed = reclaim_free_pages(db, time_now_ms, new_state)
+
+    new_state['last_deleted'] = deleted
+    new_state['deleted_total'] = int(state.get('deleted_total', 0)) + deleted
+    new_state['last_reclaimed_bytes'] = reclaimed
+    new_state['reclaimed_bytes_total'] = int(state.get('reclaimed_bytes_total', 0)) + reclaimed
+    registry.metrics.set_gauge('purged_gc', {
+        'deleted': deleted,
+        'deleted_total': new_state['deleted_total'],
+        'reclaimed_bytes': reclaimed,
+        'reclaimed_bytes_total': new_state['reclaimed_bytes_total'],
+    })
+    if deleted or reclaimed:
+        tracer.info('event_store', "Deleted %d expired purged events, reclaimed %d bytes", deleted, reclaimed)
+    return True, new_state, []
+
+
+# Maintenance jobs run by JobHandler, by job name
+JOBS = {
+    'purged_events': purged_events_job,
+}
+
+
 class EventStoreHandler(Handler):
     """Handler for event store."""
 
+    envelope_keys = ('write_to_store',)
+
     @property
     def name(self) -> str:
         return "event_store"
@@ -5,11 +5,14 @@ import sqlite3
 import time
 from typing import Dict, List, Any, Tuple, Callable
 from core.handlers import Handler
+from core.tracing import tracer
 
 
 class JobHandler(Handler):
     """Executes scheduled jobs that maintain state between runs."""
 
+    envelope_keys = ('job_name',)
+
     @property
     def name(self) -> str:
         return "job"
@@ -19,7 +22,7 @@ class JobHandler(Handler):
         self.jobs: Dict[str, Callable[[Dict[str, Any], sqlite3.Connection, int], Tuple[bool, Dict[str, Any], List[Dict[str, Any]]]]] = self._load_jobs()
 
     def _load_jobs(self) -> Dict[str, Callable[[Dict[str, Any], sqlite3.Connection, int], Tuple[bool, Dict[str, Any], List[Dict[str, Any]]]]]:
-        """Dynamically load all job functions from event directories."""
+        """Dynamically load job functions from event directories and handler JOBS tables."""
         import os
         import importlib
         from pathlib import Path
@@ -54,7 +57,20 @@ class JobHandler(Handler):
                     jobs[event_type] = getattr(module, job_function_name)
                     # print(f"[JobHandler] Loaded job: {event_type}")
             except Exception as e:
-                print(f"[JobHandler] Failed to load job from {module_name}: {e}")
+                tracer.error('job', "Failed to load job from %s: %s", module_name, e)
+
+        # Handler maintenance jobs: a module-level JOBS dict of name -> function
+        handlers_dir = Path(__file__).parent
+        for handler_file in sorted(handlers_dir.glob('*.py')):
+            if handler_file.stem in ('__init__', 'job'):
+                continue
+            module_name = f'protocols.quiet.handlers.{handler_file.stem}'
+            try:
+                module = importlib.import_module(module_name)
+            except Exception as e:
+                tracer.error('job', "Failed to load jobs from %s: %s", module_name, e)
+                continue
+            jobs.update(getattr(module, 'JOBS', {}))
 
         return jobs
 
@@ -78,11 +94,12 @@ class JobHandler(Handler):
         row = cursor.fetchone()
         state = json.loads(row[0]) if row else {}
 
-        # Run the job (jobs get read-only access)
+        # Run the job. Maintenance jobs write: they delete rows, commit their
+        # own work in chunks and may VACUUM, so this must be the writer
         try:
             success, new_state, envelopes = job_fn(state, db, time_now_ms)
         except Exception as e:
-            print(f"[JobHandler] Job {job_name} failed: {e}")
+            tracer.error('job', "Job %s failed: %s", job_name, e)
             # Track failure
             cursor.execute("""
                 INSERT OR REPLACE INTO job_runs (job_name, last_run_ms, last_failure_ms, failure_count, last_state)
@@ -113,7 +130,7 @@ class JobHandler(Handler):
 
             db.commit()
 
-            print(f"[JobHandler] Job {job_name} succeeded, emitting {len(envelopes)} envelopes")
+            tracer.debug('job', "Job %s succeeded, emitting %d envelopes", job_name, len(envelopes))
             return envelopes
         else:
             # Track failure but don't update state
@@ -130,5 +147,5 @@ class JobHandler(Handler):
             """, (job_name, time_now_ms, time_now_ms, job_name, job_name, json.dumps(state)))
             db.commit()
 
-            print(f"[JobHandler] Job {job_name} returned failure")
+            tracer.warning('job', "Job %s returned failure", job_name)
             return []
@@ -7,7 +7,12 @@ from typing import List, Dict, Any, Optional
 import sqlite3
 import importlib
 from core.handlers import Handler
+from core.tracing import tracer
+from protocols.quiet.handlers.remove import apply_removal_deltas
+from protocols.quiet.handlers.resolve_deps import invalidate_for_deltas
+from protocols.quiet.handlers.signature import apply_signer_deltas
 from protocols.quiet.protocol_types import validate_envelope_fields, cast_envelope
+from protocols.quiet.transit import apply_transit_key_deltas
 
 
 class ProjectHandler(Handler):
@@ -16,6 +21,8 @@ class ProjectHandler(Handler):
     Consumes: envelopes with validated=True
     Emits: envelopes with projected=True and deltas
     """
+
+    envelope_keys = ('validated',)
     
     def __init__(self) -> None:
         # Map of event types to their projector modules
@@ -29,7 +36,7 @@ class ProjectHandler(Handler):
     def filter(self, envelope: dict[str, Any]) -> bool:
         """Process validated events that haven't been projected."""
         if not isinstance(envelope, dict):
-            print(f"[project] WARNING: filter got {type(envelope)} instead of dict")
+            tracer.warning('project', "filter got %s instead of dict", type(envelope))
             return False
         return (
             envelope.get('validated') is True and
@@ -59,14 +66,14 @@ class ProjectHandler(Handler):
 
             # Run projector - it should emit deltas
             deltas = projector.project(envelope)
-            print(f"[project] Generated {len(deltas) if deltas else 0} deltas")
+            tracer.debug('project', "Generated %d deltas", len(deltas) if deltas else 0, envelope=envelope)
             
             # Apply deltas
             from core.deltas import DeltaApplicator
             if deltas:
-                for delta in deltas:
-                    print(f"[project] Applying delta: {delta}")
-                    DeltaApplicator.apply(delta, db)
+                tracer.debug('project', "Applying deltas: %s", deltas, envelope=envelope)
+                # The handler commits below, after checking for unblocks
+                DeltaApplicator.apply_batch(deltas, db, commit=False)
             
             # Mark as projected and include deltas
             envelope['projected'] = True
@@ -84,6 +91,8 @@ class ProjectHandler(Handler):
                 unblock_envelopes = []
             
             db.commit()
+            if deltas:
+                self._notify_projected(deltas, db)
             
             # Don't re-emit the projected envelope - only emit unblocked events
             return unblock_envelopes
@@ -98,6 +107,13 @@ class ProjectHandler(Handler):
             return []
     
     
+    def _notify_projected(self, deltas: List[Dict[str, Any]], db: sqlite3.Connection) -> None:
+        """Bring in-memory caches in line with committed deltas."""
+        invalidate_for_deltas(db, deltas)
+        apply_removal_deltas(db, deltas)
+        apply_signer_deltas(db, deltas)
+        apply_transit_key_deltas(db, deltas)
+
     def _store_local_metadata(self, envelope: dict[str, Any], db: sqlite3.Connection) -> None:
         """Store local metadata for self-created identities."""
         # Check both local_metadata and secret fields
@@ -151,7 +167,7 @@ class ProjectHandler(Handler):
         events_dir = Path(__file__).parent.parent / 'events'
 
         if not events_dir.exists():
-            print(f"Events directory not found: {events_dir}")
+            tracer.warning('project', "Events directory not found: %s", events_dir)
             return
 
         # Iterate through all subdirectories in events/
@@ -165,8 +181,8 @@ class ProjectHandler(Handler):
                     try:
                         module = importlib.import_module(f'protocols.quiet.events.{event_type}.projector')
                         self.projectors[event_type] = module
-                        print(f"Loaded projector for {event_type}")
+                        tracer.debug('project', "Loaded projector for %s", event_type)
                     except ImportError as e:
-                        print(f"Failed to load {event_type} projector: {e}")
+                        tracer.error('project', "Failed to load %s projector: %s", event_type, e)
                     except Exception as e:
-                        print(f"Error loading {event_type} projector: {e}")
\ No newline at end of file
+                        tracer.error('project', "Error loading %s projector: %s", event_type, e)
\ No newline at end of file
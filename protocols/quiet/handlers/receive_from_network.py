@@ -1,12 +1,18 @@
 """
 Handler that processes envelopes from the network interface.
 Extracts transit layer information from raw network data.
+
+Packets under a transit key held in memory (see protocols.quiet.transit)
+are opened right here; packets under keys we do not hold are dropped
+without touching the database.
 """
 import time
 from typing import List, Dict, Any
 import sqlite3
-from core.handlers import Handler
+from core.handlers import DROPPED, Handler
 from core.crypto import hash
+from protocols.quiet import transit
+from protocols.quiet.handlers.event_store import is_known_event
 from protocols.quiet.protocol_types import validate_envelope_fields, cast_envelope
 # TODO: Handle imports: NetworkEnvelope, TransitEnvelope
 
@@ -17,6 +23,8 @@ class ReceiveFromNetworkHandler(Handler):
     Consumes: envelopes with origin_ip, origin_port, received_at, raw_data
     Emits: envelopes with transit_key_id and transit_ciphertext
     """
+
+    envelope_keys = ('raw_data',)
     
     @property
     def name(self) -> str:
@@ -30,6 +38,20 @@ class ReceiveFromNetworkHandler(Handler):
             envelope.get('transit_key_id') is None  # Not yet processed
         )
     
+    def prefetch(self, envelopes: List[dict[str, Any]], db: sqlite3.Connection) -> None:
+        """Open the packets reaching this stage in one batch ahead of process()."""
+        keyring = transit.keyring_for(db)
+        if keyring is None:
+            return
+        packets = [
+            envelope['raw_data'] for envelope in envelopes
+            if isinstance(envelope.get('raw_data'), bytes) and self.filter(envelope)
+            and transit.opened_packets.peek(envelope['raw_data']) is None
+        ]
+        for raw_data, payload in zip(packets, transit.open_packets(packets, keyring)):
+            if payload is not None:
+                transit.opened_packets.put(raw_data, payload)
+
     def process(self, envelope: dict[str, Any], db: sqlite3.Connection) -> List[dict[str, Any]]:
         """Extract transit key ID and ciphertext from raw data."""
         # Runtime validation - ensure we have required fields
@@ -44,6 +66,16 @@ class ReceiveFromNetworkHandler(Handler):
             envelope['error'] = "Raw data too short for transit layer"
             return []
         
+        keyring = transit.keyring_for(db)
+        if keyring is not None:
+            key = keyring.get(raw_data[:32].hex())
+            if key is None:
+                envelope[DROPPED] = 'unknown_transit_key'
+                return []
+            if transit.is_real_secret(key[0]):
+                return self._open(envelope, key, db)
+            # Older stub secrets still go through resolve_deps and crypto
+
         # Extract transit key ID (first 32 bytes)
         transit_key_id = raw_data[:32]
         transit_ciphertext = raw_data[32:]
@@ -60,4 +92,19 @@ class ReceiveFromNetworkHandler(Handler):
             'deps': [f'transit_key:{transit_key_id_hex}']
         }
         
-        return [new_envelope]
\ No newline at end of file
+        return [new_envelope]
+
+    def _open(self, envelope: dict[str, Any], key: tuple, db: sqlite3.Connection) -> List[dict[str, Any]]:
+        """Strip the transit layer in memory; drop what fails or is already known."""
+        raw_data = envelope['raw_data']
+        payload = transit.opened_packets.pop(raw_data)
+        if payload is None:
+            payload = transit.open_payload(raw_data, key[0])
+        if payload is None:
+            envelope[DROPPED] = 'undecryptable'
+            return []
+        new_envelope = transit.transit_envelope(envelope, payload, key[1])
+        if is_known_event(new_envelope['event_id'], db):
+            envelope[DROPPED] = 'duplicate'
+            return []
+        return [new_envelope]
@@ -4,11 +4,14 @@ import sqlite3
 import time
 from typing import Dict, List, Any, Callable
 from core.handlers import Handler
+from core.tracing import tracer
 
 
 class ReflectHandler(Handler):
     """Executes reflector functions in response to events."""
 
+    envelope_keys = ('validated',)
+
     @property
     def name(self) -> str:
         return "reflect"
@@ -67,7 +70,7 @@ class ReflectHandler(Handler):
                             reflectors[event_type] = reflector_fn
                             # print(f"[ReflectHandler] Loaded reflector: {event_type} -> {attr_name}")
             except Exception as e:
-                print(f"[ReflectHandler] Failed to load reflector from {module_name}: {e}")
+                tracer.error('reflect', "Failed to load reflector from %s: %s", module_name, e)
 
         return reflectors
 
@@ -93,12 +96,12 @@ class ReflectHandler(Handler):
         try:
             success, envelopes = reflector_fn(envelope, db, time_now_ms)
         except Exception as e:
-            print(f"[ReflectHandler] Reflector for {event_type} failed: {e}")
+            tracer.error('reflect', "Reflector for %s failed: %s", event_type, e, envelope=envelope)
             return []
 
         if success:
-            print(f"[ReflectHandler] Reflector for {event_type} succeeded, emitting {len(envelopes)} envelopes")
+            tracer.debug('reflect', "Reflector for %s succeeded, emitting %d envelopes", event_type, len(envelopes), envelope=envelope)
             return envelopes
         else:
-            print(f"[ReflectHandler] Reflector for {event_type} returned failure")
+            tracer.warning('reflect', "Reflector for %s returned failure", event_type, envelope=envelope)
             return []
@@ -10,7 +10,9 @@ From plan.md:
 from typing import Dict, List, Any, Optional, Set
 import sqlite3
 import importlib
+from core.db import database_instance_id
 from core.handlers import Handler
+from core.tracing import tracer
 
 
 # Cache for loaded remover modules
@@ -64,7 +66,7 @@ def handler(envelope: dict[str, Any], db: sqlite3.Connection) -> Optional[dict[s
                 if remover.should_remove(envelope, removal_context):
                     return None  # Drop the envelope
             except Exception as e:
-                print(f"Remover error for {event_type}: {e}")
+                tracer.error('remove', "Remover error for %s: %s", event_type, e)
     
     # Event passes removal checks
     envelope['should_remove'] = False
@@ -73,6 +75,10 @@ def handler(envelope: dict[str, Any], db: sqlite3.Connection) -> Optional[dict[s
 
 def is_explicitly_deleted(event_id: str, db: sqlite3.Connection) -> bool:
     """Check if this event_id has been explicitly deleted."""
+    context = _cached_removal_context(db)
+    if context is not None:
+        return event_id in context.deleted_messages
+
     cursor = db.execute("""
         SELECT 1 FROM deleted_events 
         WHERE event_id = ? 
@@ -82,31 +88,98 @@ def is_explicitly_deleted(event_id: str, db: sqlite3.Connection) -> bool:
     return cursor.fetchone() is not None
 
 
-def get_removal_context(db: sqlite3.Connection) -> Dict[str, Set[str]]:
-    """Get context for removal decisions."""
-    context: Dict[str, Set[str]] = {
-        'deleted_channels': set(),
-        'removed_users': set(),
-        'deleted_messages': set()
+class RemovalContext:
+    """Snapshot of deletion history used for removal decisions.
+
+    Loaded once per database and then kept current from projection deltas
+    (see apply_removal_deltas), so removers do not rescan the history for
+    every envelope.
+    """
+
+    # table -> (context key, id column)
+    TABLES = {
+        'deleted_channels': ('deleted_channels', 'channel_id'),
+        'removed_users': ('removed_users', 'user_id'),
+        'deleted_events': ('deleted_messages', 'event_id'),
     }
-    
-    # Get deleted channels
-    cursor = db.execute("SELECT channel_id FROM deleted_channels")
-    context['deleted_channels'] = {row['channel_id'] for row in cursor}
-    
-    # Get removed users  
-    cursor = db.execute("SELECT user_id FROM removed_users")
-    context['removed_users'] = {row['user_id'] for row in cursor}
-    
-    # Get deleted messages (include all explicit deletions regardless of reason)
-    cursor = db.execute("""
-        SELECT event_id FROM deleted_events
-    """)
-    context['deleted_messages'] = {row['event_id'] for row in cursor}
-    
+
+    def __init__(self) -> None:
+        self.sets: Dict[str, Set[str]] = {key: set() for key, _ in self.TABLES.values()}
+        self.stale = False
+
+    @property
+    def deleted_messages(self) -> Set[str]:
+        return self.sets['deleted_messages']
+
+    @classmethod
+    def load(cls, db: sqlite3.Connection) -> 'RemovalContext':
+        context = cls()
+        for table, (key, column) in cls.TABLES.items():
+            cursor = db.execute(f"SELECT {column} FROM {table}")
+            context.sets[key] = {row[0] for row in cursor}
+        return context
+
+    def apply_deltas(self, deltas: List[Dict[str, Any]]) -> None:
+        """Fold committed deltas on the deletion tables into the snapshot.
+
+        Changes the snapshot cannot follow (deletes or updates without the
+        id in `where`) mark it stale so it is reloaded on next use.
+        """
+        for delta in deltas:
+            target = self.TABLES.get(delta.get('table'))
+            if target is None:
+                continue
+            key, column = target
+            op = delta.get('op')
+            if op == 'insert' and (delta.get('data') or {}).get(column) is not None:
+                self.sets[key].add(delta['data'][column])
+            elif op == 'delete' and (delta.get('where') or {}).get(column) is not None:
+                self.sets[key].discard(delta['where'][column])
+            else:
+                self.stale = True
+
+
+# Removal context per database, by instance id
+_removal_contexts: Dict[str, RemovalContext] = {}
+
+
+def _cached_removal_context(db: sqlite3.Connection) -> Optional[RemovalContext]:
+    """Return db's shared RemovalContext, or None if db has no instance id."""
+    scope = database_instance_id(db)
+    if scope is None:
+        return None
+    context = _removal_contexts.get(scope)
+    if context is None or context.stale:
+        context = _removal_contexts[scope] = RemovalContext.load(db)
     return context
 
 
+def apply_removal_deltas(db: sqlite3.Connection, deltas: List[Dict[str, Any]]) -> None:
+    """Update db's removal context with committed projection deltas."""
+    scope = database_instance_id(db)
+    context = _removal_contexts.get(scope) if scope is not None else None
+    if context is not None and deltas:
+        context.apply_deltas(deltas)
+
+
+def invalidate_removal_context(db: sqlite3.Connection) -> None:
+    """Forget db's removal context after writes that bypass projection deltas."""
+    scope = database_instance_id(db)
+    if scope is not None:
+        _removal_contexts.pop(scope, None)
+
+
+def get_removal_context(db: sqlite3.Connection) -> Dict[str, Set[str]]:
+    """Get context for removal decisions.
+
+    The sets are shared between envelopes; removers must not modify them.
+    """
+    context = _cached_removal_context(db)
+    if context is None:
+        context = RemovalContext.load(db)
+    return context.sets
+
+
 def get_remover(event_type: str) -> Optional[Any]:
     """Load and cache remover for an event type."""
     if event_type in _removers_cache:
@@ -124,6 +197,8 @@ def get_remover(event_type: str) -> Optional[Any]:
 class RemoveHandler(Handler):
     """Handler for remove."""
 
+    envelope_keys = ('event_id', 'event_plaintext')
+
     @property
     def name(self) -> str:
         return "remove"
@@ -131,7 +206,7 @@ class RemoveHandler(Handler):
     def filter(self, envelope: dict[str, Any]) -> bool:
         """Check if this handler should process the envelope."""
         if not isinstance(envelope, dict):
-            print(f"[remove] WARNING: filter got {type(envelope)} instead of dict: {envelope}")
+            tracer.warning('remove', "filter got %s instead of dict: %s", type(envelope), envelope)
             return False
         return filter_func(envelope)
 
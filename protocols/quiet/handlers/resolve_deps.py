@@ -1,10 +1,11 @@
 """
-Combined Resolve Dependencies and Unblock handler.
+Resolve Dependencies and Unblock handlers.
 
 From plan.md:
 - Resolves dependencies from validated events and local secrets
 - Blocks events with missing dependencies  
-- Unblocks events when ALL dependencies are satisfied
+- Unblocks events when ALL dependencies are satisfied (the unblock stage,
+  once the event they waited on is stored and projected)
 - Tracks retry count (max 100) to prevent infinite loops
 """
 
@@ -12,13 +13,17 @@ From plan.md:
 import sqlite3
 import json
 import time
-from typing import List, Dict, Any, Optional, Tuple
-from core.handlers import Handler
+from typing import Iterable, List, Dict, Any, Optional, Set, Tuple
+from core.cache import ScopedLRUCache
+from core.db import database_instance_id
+from core.handlers import Handler, registry
+from core.tracing import tracer
+from protocols.quiet.envelope_keys import codec
 
 
 def filter_func(envelope: dict[str, Any]) -> bool:
     """
-    Process envelopes that need dependency resolution or can trigger unblocking.
+    Process envelopes that need dependency resolution or blocking.
     """
     # Don't process envelopes that have already been stored
     if envelope.get('stored') is True:
@@ -34,10 +39,6 @@ def filter_func(envelope: dict[str, Any]) -> bool:
     if (envelope.get('event_ciphertext') is not None and envelope.get('event_key_id')):
         return True
 
-    # Trigger unblocking: newly validated events might unblock others
-    if envelope.get('validated') is True:
-        return True
-
     # Block case: events with missing deps need to be blocked (requires event_id)
     if envelope.get('missing_deps') is True and envelope.get('event_id'):
         return True
@@ -47,44 +48,20 @@ def filter_func(envelope: dict[str, Any]) -> bool:
 
 def handler(envelope: dict[str, Any], db: sqlite3.Connection) -> List[dict[str, Any]]:
     """
-    Combined handler for dependency resolution and unblocking.
+    Handler for dependency resolution and blocking.
 
     Args:
-        envelope: dict[str, Any] needing resolution or triggering unblocking
+        envelope: dict[str, Any] needing resolution
         db: Database connection
 
     Returns:
-        List of envelopes - resolved events or unblocked events (NOT the triggering validated event)
+        List of envelopes - the resolved event, if its deps are all present
     """
     results = []
 
     # Declare minimal deps if missing, based on stage
     if 'deps' not in envelope:
-        deps: List[str] = []
-        if envelope.get('transit_ciphertext') is not None and envelope.get('transit_key_id'):
-            deps.append(f"transit_key:{envelope['transit_key_id']}")
-        elif envelope.get('event_ciphertext') is not None and envelope.get('event_key_id'):
-            deps.append(f"event_key:{envelope['event_key_id']}")
-        elif 'event_plaintext' in envelope:
-            pt = envelope['event_plaintext']
-            etype = envelope.get('event_type', '')
-            if etype == 'message':
-                if pt.get('channel_id'):
-                    deps.append(f"channel:{pt['channel_id']}")
-                if pt.get('peer_id'):
-                    deps.append(f"peer:{pt['peer_id']}")
-            elif etype == 'channel':
-                if pt.get('group_id'):
-                    deps.append(f"group:{pt['group_id']}")
-            elif etype == 'user':
-                if pt.get('invite_pubkey'):
-                    deps.append(f"invite:{pt['invite_pubkey']}")
-                if envelope.get('peer_id'):
-                    deps.append(f"peer:{envelope['peer_id']}")
-            elif etype == 'peer':
-                # New: peer depends on identity for signing
-                if pt.get('identity_id'):
-                    deps.append(f"identity:{pt['identity_id']}")
+        deps = implied_deps(envelope)
         if deps:
             envelope['deps'] = deps
             envelope['deps_included_and_valid'] = False
@@ -97,16 +74,6 @@ def handler(envelope: dict[str, Any], db: sqlite3.Connection) -> List[dict[str,
             results.append(resolved_envelope)
         # If missing deps, will be handled by blocking logic below
 
-    # Handle unblocking logic - validated events trigger unblocking but aren't re-emitted
-    if envelope.get('validated') is True:
-        # This is a newly validated event - check for blocked events
-        event_id = envelope.get('event_id')
-        if event_id:
-            # Check for events waiting on this one
-            unblocked = unblock_waiting_events(event_id, db)
-            results.extend(unblocked)
-        # Do NOT re-emit the validated event itself
-
     # Handle blocking logic
     if envelope.get('missing_deps') is True:
         # This event has missing deps - block it
@@ -116,10 +83,46 @@ def handler(envelope: dict[str, Any], db: sqlite3.Connection) -> List[dict[str,
     return results
 
 
+def implied_deps(envelope: dict[str, Any]) -> List[str]:
+    """Return the deps an envelope without explicit `deps` needs at its stage."""
+    deps: List[str] = []
+    if envelope.get('transit_ciphertext') is not None and envelope.get('transit_key_id'):
+        deps.append(f"transit_key:{envelope['transit_key_id']}")
+    elif envelope.get('event_ciphertext') is not None and envelope.get('event_key_id'):
+        deps.append(f"event_key:{envelope['event_key_id']}")
+    elif 'event_plaintext' in envelope:
+        pt = envelope['event_plaintext']
+        etype = envelope.get('event_type', '')
+        if etype == 'message':
+            if pt.get('channel_id'):
+                deps.append(f"channel:{pt['channel_id']}")
+            if pt.get('peer_id'):
+                deps.append(f"peer:{pt['peer_id']}")
+        elif etype == 'channel':
+            if pt.get('group_id'):
+                deps.append(f"group:{pt['group_id']}")
+        elif etype == 'user':
+            if pt.get('invite_pubkey'):
+                deps.append(f"invite:{pt['invite_pubkey']}")
+            if envelope.get('peer_id'):
+                deps.append(f"peer:{envelope['peer_id']}")
+        elif etype == 'peer':
+            # New: peer depends on identity for signing
+            if pt.get('identity_id'):
+                deps.append(f"identity:{pt['identity_id']}")
+    return deps
+
+
 def resolve_dependencies(envelope: dict[str, Any], db: sqlite3.Connection) -> Optional[dict[str, Any]]:
     """Resolve dependencies for an envelope."""
     deps_needed = envelope.get('deps', [])
 
+    # Events to be encrypted to a key need that key's secret
+    if envelope.get('encrypt_to') and 'event_ciphertext' not in envelope:
+        key_dep = f"key:{envelope['encrypt_to']}"
+        if key_dep not in deps_needed:
+            deps_needed = list(deps_needed) + [key_dep]
+
     if not deps_needed:
         envelope['deps_included_and_valid'] = True
         envelope['resolved_deps'] = {}
@@ -179,95 +182,227 @@ def block_event(envelope: dict[str, Any], db: sqlite3.Connection) -> None:
         # Store blocked envelope
         db.execute("""
             INSERT OR REPLACE INTO blocked_events 
-            (event_id, envelope_json, created_at, missing_deps, retry_count)
-            VALUES (?, ?, ?, ?, ?)
+            (event_id, envelope_json, created_at, missing_deps, retry_count, network_id)
+            VALUES (?, ?, ?, ?, ?, ?)
         """, (
             event_id,
-            json.dumps(envelope),
+            codec.encode(envelope),
             int(time.time() * 1000),
             json.dumps(missing_deps_list),
-            retry_count
+            retry_count,
+            envelope.get('network_id') or ''
         ))
         
         # Clear and insert dependency tracking
         db.execute("DELETE FROM blocked_event_deps WHERE event_id = ?", (event_id,))
         
-        for dep in missing_deps_list:
-            dep_event_id = dep.split(':')[-1] if ':' in dep else dep
-            db.execute("""
-                INSERT INTO blocked_event_deps (event_id, dep_id)
-                VALUES (?, ?)
-            """, (event_id, dep_event_id))
+        dep_event_ids = {dep.split(':')[-1] if ':' in dep else dep for dep in missing_deps_list}
+        db.executemany("""
+            INSERT INTO blocked_event_deps (event_id, dep_id)
+            VALUES (?, ?)
+        """, [(event_id, dep_event_id) for dep_event_id in dep_event_ids])
         
         db.commit()
         
     except Exception as e:
         db.rollback()
-        print(f"Failed to block event {event_id}: {e}")
+        tracer.error('resolve_deps', "Failed to block event %s: %s", event_id, e)
+
+
+# Max ids bound into a single IN (...) list
+_IN_CHUNK = 500
+
+
+def _chunks(items: List[str]) -> List[List[str]]:
+    return [items[i:i + _IN_CHUNK] for i in range(0, len(items), _IN_CHUNK)]
 
 
 def unblock_waiting_events(validated_event_id: str, db: sqlite3.Connection) -> List[dict[str, Any]]:
-    """Check and unblock events waiting on this validated event."""
+    """Release every blocked event that this validated event transitively unblocks.
+
+    Works level by level with set-based queries: level 1 is the waiters whose
+    deps are all present once this event is; level k+1 is the waiters whose
+    deps are all present or released at an earlier level. The released
+    envelopes are returned in that (topological) order. Envelopes that wait
+    on other released events carry their ids in `_after` so the pipeline can
+    hold them until those parents validate, instead of re-blocking them.
+    """
     if not validated_event_id:
         return []
-    
+
+    released_order: List[str] = []
+    retry_counts: Dict[str, int] = {}
+    parents: Dict[str, List[str]] = {}
+    exhausted: List[str] = []
+    released: Set[str] = set()
+    frontier = [validated_event_id]
+
+    while frontier:
+        # Waiters on anything in the frontier
+        waiters: Dict[str, int] = {}
+        for chunk in _chunks(frontier):
+            placeholders = ','.join('?' * len(chunk))
+            for row in db.execute(f"""
+                SELECT DISTINCT be.event_id, be.retry_count
+                FROM blocked_event_deps bed
+                JOIN blocked_events be ON be.event_id = bed.event_id
+                WHERE bed.dep_id IN ({placeholders})
+            """, chunk):
+                if row[0] not in released:
+                    waiters[row[0]] = row[1]
+
+        # Waiters that exhausted their retries are dropped rather than released
+        for waiter_id, retry_count in list(waiters.items()):
+            if retry_count >= 100:
+                exhausted.append(waiter_id)
+                del waiters[waiter_id]
+        if not waiters:
+            break
+
+        # Deps of those waiters that are still missing from the events table
+        missing: Dict[str, List[str]] = {}
+        for chunk in _chunks(list(waiters)):
+            placeholders = ','.join('?' * len(chunk))
+            for row in db.execute(f"""
+                SELECT bed.event_id, bed.dep_id
+                FROM blocked_event_deps bed
+                LEFT JOIN events e ON e.event_id = bed.dep_id AND e.purged = 0
+                WHERE bed.event_id IN ({placeholders}) AND e.event_id IS NULL
+            """, chunk):
+                missing.setdefault(row[0], []).append(row[1])
+
+        frontier = []
+        for waiter_id, retry_count in waiters.items():
+            waiting_on = missing.get(waiter_id, [])
+            if all(dep == validated_event_id or dep in released for dep in waiting_on):
+                frontier.append(waiter_id)
+                retry_counts[waiter_id] = retry_count
+                parents[waiter_id] = [dep for dep in waiting_on if dep in released]
+        released.update(frontier)
+        released_order.extend(frontier)
+
     unblocked = []
-    
-    # Find events blocked on this dependency
-    cursor = db.execute("""
-        SELECT be.event_id, be.envelope_json, be.retry_count
-        FROM blocked_events be
-        JOIN blocked_event_deps bed ON be.event_id = bed.event_id
-        WHERE bed.dep_id = ?
-    """, (validated_event_id,))
-    
-    blocked_events = cursor.fetchall()
-    
-    for blocked in blocked_events:
-        blocked_event_id = blocked['event_id']
-        retry_count = blocked['retry_count']
-        
-        # Check retry limit
-        if retry_count >= 100:
-            db.execute("DELETE FROM blocked_events WHERE event_id = ?", (blocked_event_id,))
-            continue
-        
-        # Check if ALL dependencies are now satisfied
-        if are_all_deps_satisfied(blocked_event_id, db):
-            # Unblock this event
-            blocked_envelope = json.loads(blocked['envelope_json'])
-            blocked_envelope['unblocked'] = True
-            blocked_envelope['retry_count'] = retry_count + 1
-            
-            # Remove from blocked events
-            db.execute("DELETE FROM blocked_events WHERE event_id = ?", (blocked_event_id,))
-            
-            unblocked.append(blocked_envelope)
-    
+    envelopes: Dict[str, Any] = {}
+    for chunk in _chunks(released_order):
+        placeholders = ','.join('?' * len(chunk))
+        for row in db.execute(f"""
+            SELECT event_id, envelope_json FROM blocked_events WHERE event_id IN ({placeholders})
+        """, chunk):
+            envelopes[row[0]] = row[1]
+
+    for event_id in released_order:
+        blocked_envelope = codec.decode(envelopes[event_id])
+        blocked_envelope['unblocked'] = True
+        blocked_envelope['retry_count'] = retry_counts[event_id] + 1
+        if parents[event_id]:
+            blocked_envelope['_after'] = parents[event_id]
+        unblocked.append(blocked_envelope)
+
+    removed = [(event_id,) for event_id in released_order + exhausted]
+    if removed:
+        db.executemany("DELETE FROM blocked_events WHERE event_id = ?", removed)
+        db.executemany("DELETE FROM blocked_event_deps WHERE event_id = ?", removed)
+
     db.commit()
     return unblocked
 
 
+# Blocked events whose deps have not arrived after this long are evicted
+BLOCKED_TTL_MS = 7 * 24 * 60 * 60 * 1000
+# Most blocked events kept per network; the oldest beyond this are evicted
+BLOCKED_PER_NETWORK_QUOTA = 10_000
+
+
+def _evict_blocked(event_ids: List[str], db: sqlite3.Connection) -> None:
+    rows = [(event_id,) for event_id in event_ids]
+    db.executemany("DELETE FROM blocked_event_deps WHERE event_id = ?", rows)
+    db.executemany("DELETE FROM blocked_events WHERE event_id = ?", rows)
+
+
+def compact_blocked_events(db: sqlite3.Connection, now_ms: int, ttl_ms: int = BLOCKED_TTL_MS,
+                           per_network_quota: int = BLOCKED_PER_NETWORK_QUOTA) -> Dict[str, int]:
+    """Evict blocked events older than ttl_ms, then the oldest beyond each network's quota.
+
+    Does not commit. Returns the number evicted for each reason.
+    """
+    expired = [row[0] for row in db.execute(
+        "SELECT event_id FROM blocked_events WHERE created_at < ?", (now_ms - ttl_ms,)
+    )]
+    if expired:
+        _evict_blocked(expired, db)
+
+    over_quota = [row[0] for row in db.execute("""
+        SELECT event_id FROM (
+            SELECT event_id, ROW_NUMBER() OVER (
+                PARTITION BY network_id ORDER BY created_at DESC, event_id
+            ) AS position
+            FROM blocked_events
+        )
+        WHERE position > ?
+    """, (per_network_quota,))]
+    if over_quota:
+        _evict_blocked(over_quota, db)
+
+    return {'expired': len(expired), 'over_quota': len(over_quota)}
+
+
+def blocked_queue_stats(db: sqlite3.Connection) -> Dict[str, Any]:
+    """Count blocked events, in total and by the type of dep they are missing.
+
+    An event missing deps of several types counts once under each type.
+    Untyped refs (bare event ids) count as 'event'.
+    """
+    total = db.execute("SELECT COUNT(*) FROM blocked_events").fetchone()[0]
+    by_dep_type = {row[0]: row[1] for row in db.execute("""
+        SELECT CASE WHEN instr(dep.value, ':') > 0
+                    THEN substr(dep.value, 1, instr(dep.value, ':') - 1)
+                    ELSE 'event' END AS dep_type,
+               COUNT(DISTINCT be.event_id)
+        FROM blocked_events be, json_each(be.missing_deps) dep
+        GROUP BY dep_type
+    """)}
+    return {'total': total, 'by_dep_type': by_dep_type}
+
+
+def blocked_events_job(state: Dict[str, Any], db: sqlite3.Connection,
+                       time_now_ms: int) -> Tuple[bool, Dict[str, Any], List[Dict[str, Any]]]:
+    """Job: compact the blocked queue and publish its size.
+
+    `ttl_ms` and `per_network_quota` in the job state override the defaults.
+    """
+    ttl_ms = int(state.get('ttl_ms', BLOCKED_TTL_MS))
+    quota = int(state.get('per_network_quota', BLOCKED_PER_NETWORK_QUOTA))
+
+    evicted = compact_blocked_events(db, time_now_ms, ttl_ms, quota)
+    stats = blocked_queue_stats(db)
+    registry.metrics.set_gauge('blocked_events', stats)
+    if evicted['expired'] or evicted['over_quota']:
+        tracer.info('resolve_deps', "Evicted %d expired and %d over-quota blocked events",
+                    evicted['expired'], evicted['over_quota'])
+
+    new_state = dict(state)
+    new_state['last_evicted'] = evicted
+    new_state['evicted_total'] = int(state.get('evicted_total', 0)) + evicted['expired'] + evicted['over_quota']
+    new_state['blocked'] = stats
+    return True, new_state, []
+
+
+# Maintenance jobs run by JobHandler, by job name
+JOBS = {
+    'blocked_events': blocked_events_job,
+}
+
+
 def are_all_deps_satisfied(event_id: str, db: sqlite3.Connection) -> bool:
     """Check if all dependencies for an event are satisfied."""
-    cursor = db.execute("""
-        SELECT dep_id FROM blocked_event_deps WHERE event_id = ?
-    """, (event_id,))
-    
-    all_deps = [row[0] for row in cursor]  # dep_id is first column
-    
-    for dep_id in all_deps:
-        # Check if this dependency exists and is not purged
-        exists = db.execute("""
-            SELECT 1 FROM events 
-            WHERE event_id = ? AND purged = 0
-            LIMIT 1
-        """, (dep_id,)).fetchone()
-        
-        if not exists:
-            return False
-    
-    return True
+    missing = db.execute("""
+        SELECT 1
+        FROM blocked_event_deps bed
+        LEFT JOIN events e ON e.event_id = bed.dep_id AND e.purged = 0
+        WHERE bed.event_id = ? AND e.event_id IS NULL
+        LIMIT 1
+    """, (event_id,)).fetchone()
+    return missing is None
 
 
     # Placeholder tracking/resolution removed (no longer needed)
@@ -282,7 +417,88 @@ def parse_dep_ref(dep_ref: str) -> Tuple[str, str]:
         return 'event', dep_ref
 
 
+# Resolved dependencies per database: dep_id -> {dep_type: record}.
+# Only found dependencies are cached, so a dep that arrives later is never
+# hidden by a stale miss; anything that changes or removes a cached row must
+# call invalidate_dependencies (or invalidate_for_deltas).
+dependency_cache = ScopedLRUCache(4096)
+
+# Tables fetch_dependency reads -> columns it looks rows up by
+_DEPENDENCY_TABLES = {
+    'events': ('event_id',),
+    'identities': ('identity_id',),
+    'peers': ('peer_id', 'identity_id'),
+    'transit_keys': ('transit_key_id',),
+}
+
+
+def _copy_dependency(record: Dict[str, Any]) -> Dict[str, Any]:
+    # Callers attach records to envelopes that later handlers mutate
+    return {k: dict(v) if isinstance(v, dict) else v for k, v in record.items()}
+
+
 def fetch_dependency(dep_id: str, dep_type: str, db: sqlite3.Connection) -> Optional[Dict[str, Any]]:
+    """Fetch a dependency, from the in-memory cache when possible."""
+    scope = database_instance_id(db)
+    if scope is None:
+        return _fetch_dependency(dep_id, dep_type, db)
+
+    cached = dependency_cache.get(scope, dep_id)
+    if cached is not None and dep_type in cached:
+        return _copy_dependency(cached[dep_type])
+
+    record = _fetch_dependency(dep_id, dep_type, db)
+    if record is not None:
+        _remember(scope, dep_id, dep_type, record)
+    return record
+
+
+def _remember(scope: str, dep_id: str, dep_type: str, record: Dict[str, Any]) -> None:
+    entry = dependency_cache.peek(scope, dep_id)
+    entry = dict(entry) if entry else {}
+    entry[dep_type] = _copy_dependency(record)
+    dependency_cache.put(scope, dep_id, entry)
+
+
+def invalidate_dependencies(db: sqlite3.Connection, ids: Iterable[str]) -> None:
+    """Forget cached dependencies for these ids in db's database."""
+    scope = database_instance_id(db)
+    if scope is not None:
+        dependency_cache.invalidate(scope, ids)
+
+
+def invalidate_for_deltas(db: sqlite3.Connection, deltas: List[Dict[str, Any]]) -> None:
+    """Forget cached dependencies touched by applied projection deltas.
+
+    Deltas on tables fetch_dependency does not read are ignored. A delta that
+    changes one of those tables without naming the looked-up ids drops the
+    whole database's entries.
+    """
+    scope = database_instance_id(db)
+    if scope is None or not deltas:
+        return
+    ids: Set[str] = set()
+    for delta in deltas:
+        columns = _DEPENDENCY_TABLES.get(delta.get('table'))
+        if columns is None:
+            continue
+        if delta.get('op') == 'insert':
+            # Only positive lookups are cached, so new rows cannot be stale
+            continue
+        found = False
+        for part in (delta.get('where') or {}, delta.get('data') or {}):
+            for column in columns:
+                if part.get(column) is not None:
+                    ids.add(part[column])
+                    found = True
+        if not found:
+            dependency_cache.clear(scope)
+            return
+    if ids:
+        dependency_cache.invalidate(scope, ids)
+
+
+def _fetch_dependency(dep_id: str, dep_type: str, db: sqlite3.Connection) -> Optional[Dict[str, Any]]:
     """Fetch a dependency - either a validated event or local secret."""
     
     if dep_type == 'identity':
@@ -297,20 +513,7 @@ def fetch_dependency(dep_id: str, dep_type: str, db: sqlite3.Connection) -> Opti
         )
         row = cur.fetchone()
         if row:
-            event_plaintext = {
-                'type': 'identity',
-                'identity_id': row['identity_id'],
-                'name': row['name'],
-                'public_key': row['public_key'] if isinstance(row['public_key'], str) else row['public_key'].hex(),
-                'private_key': row['private_key'].hex() if isinstance(row['private_key'], (bytes, bytearray)) else row['private_key'],
-                'created_at': row['created_at'],
-            }
-            return {
-                'event_plaintext': event_plaintext,
-                'event_type': 'identity',
-                'event_id': row['identity_id'],
-                'validated': True,
-            }
+            return _identity_record(row)
         return None
 
     elif dep_type == 'transit_key':
@@ -323,10 +526,7 @@ def fetch_dependency(dep_id: str, dep_type: str, db: sqlite3.Connection) -> Opti
         
         row = cursor.fetchone()
         if row:
-            return {
-                'transit_secret': row[0],  # transit_secret
-                'network_id': row[1]  # network_id
-            }
+            return _transit_key_record(row[0], row[1])
         return None
         
     elif dep_type == 'key':
@@ -339,14 +539,7 @@ def fetch_dependency(dep_id: str, dep_type: str, db: sqlite3.Connection) -> Opti
         
         row = cursor.fetchone()
         if row and row[1]:  # unsealed_secret
-            return {
-                'event_type': 'key',
-                'event_id': dep_id,
-                'key_id': row[0],  # key_id
-                'unsealed_secret': row[1],  # unsealed_secret
-                'group_id': row[2],  # group_id
-                'validated': True
-            }
+            return _key_record(dep_id, row[0], row[1], row[2])
         return None
 
     elif dep_type == 'peer':
@@ -372,21 +565,7 @@ def fetch_dependency(dep_id: str, dep_type: str, db: sqlite3.Connection) -> Opti
             row = cursor.fetchone()
 
         if row:
-            # row columns: peer_id, public_key, identity_id, created_at
-            event_plaintext = {
-                'type': 'peer',
-                'public_key': row[1],  # public_key
-                'identity_id': row[2],  # identity_id
-                'created_at': row[3]  # created_at
-            }
-            # Also update the event's peer_id to the actual peer_id if we resolved by identity
-            actual_peer_id = row[0]
-            return {
-                'event_plaintext': event_plaintext,
-                'event_type': 'peer',
-                'event_id': actual_peer_id,  # Use actual peer_id
-                'validated': True
-            }
+            return _peer_record(row)
         return None
 
     else:
@@ -399,19 +578,179 @@ def fetch_dependency(dep_id: str, dep_type: str, db: sqlite3.Connection) -> Opti
 
         row = cursor.fetchone()
         if row:
-            # Return minimal envelope - the dependency exists
-            return {
-                'event_plaintext': {},  # We don't store plaintext anymore
-                'event_type': row[0],  # row is a tuple, event_type is first column
-                'event_id': dep_id,
-                'validated': True
-            }
+            return _event_record(dep_id, row[0])
 
         return None
 
+
+def _identity_record(row: Any) -> Dict[str, Any]:
+    """Build an identity dependency from (identity_id, name, public_key, private_key, created_at)."""
+    identity_id, name, public_key, private_key, created_at = row
+    event_plaintext = {
+        'type': 'identity',
+        'identity_id': identity_id,
+        'name': name,
+        'public_key': public_key if isinstance(public_key, str) else public_key.hex(),
+        'private_key': private_key.hex() if isinstance(private_key, (bytes, bytearray)) else private_key,
+        'created_at': created_at,
+    }
+    return {
+        'event_plaintext': event_plaintext,
+        'event_type': 'identity',
+        'event_id': identity_id,
+        'validated': True,
+    }
+
+
+def _transit_key_record(transit_secret: Any, network_id: Any) -> Dict[str, Any]:
+    return {
+        'transit_secret': transit_secret,
+        'network_id': network_id
+    }
+
+
+def _key_record(dep_id: str, key_id: Any, unsealed_secret: Any, group_id: Any) -> Dict[str, Any]:
+    return {
+        'event_type': 'key',
+        'event_id': dep_id,
+        'key_id': key_id,
+        'unsealed_secret': unsealed_secret,
+        'group_id': group_id,
+        'validated': True
+    }
+
+
+def _peer_record(row: Any) -> Dict[str, Any]:
+    """Build a peer dependency from (peer_id, public_key, identity_id, created_at)."""
+    event_plaintext = {
+        'type': 'peer',
+        'public_key': row[1],  # public_key
+        'identity_id': row[2],  # identity_id
+        'created_at': row[3]  # created_at
+    }
+    # Resolving by identity_id yields the actual peer_id
+    return {
+        'event_plaintext': event_plaintext,
+        'event_type': 'peer',
+        'event_id': row[0],
+        'validated': True
+    }
+
+
+def _event_record(dep_id: str, event_type: str) -> Dict[str, Any]:
+    # Minimal envelope - the dependency exists
+    return {
+        'event_plaintext': {},  # We don't store plaintext anymore
+        'event_type': event_type,
+        'event_id': dep_id,
+        'validated': True
+    }
+
+
+# dep types with their own lookup; every other type is an events row
+_SPECIAL_DEP_TYPES = ('identity', 'transit_key', 'key', 'peer')
+
+
+def _select_in(db: sqlite3.Connection, sql: str, ids: List[str]) -> List[Any]:
+    """Run `sql` (containing one {ids} IN-list slot) over ids in chunks."""
+    rows: List[Any] = []
+    for chunk in _chunks(ids):
+        rows.extend(db.execute(sql.format(ids=','.join('?' * len(chunk))), chunk).fetchall())
+    return rows
+
+
+def prefetch_dependencies(dep_refs: Iterable[str], db: sqlite3.Connection) -> int:
+    """Load many dependencies into the cache with one query per dep type.
+
+    Refs already cached are skipped; refs that do not resolve are left for
+    fetch_dependency to report as missing. Returns the number of dependencies
+    loaded.
+    """
+    scope = database_instance_id(db)
+    if scope is None:
+        return 0
+
+    wanted: Dict[str, Set[str]] = {}
+    for dep_ref in dep_refs:
+        dep_type, dep_id = parse_dep_ref(dep_ref)
+        cached = dependency_cache.peek(scope, dep_id)
+        if cached is None or dep_type not in cached:
+            wanted.setdefault(dep_type, set()).add(dep_id)
+    if not wanted:
+        return 0
+
+    found: List[Tuple[str, str, Dict[str, Any]]] = []
+    try:
+        ids = sorted(wanted.pop('identity', ()))
+        if ids:
+            for row in _select_in(db, """
+                SELECT identity_id, name, public_key, private_key, created_at
+                FROM identities WHERE identity_id IN ({ids})
+            """, ids):
+                found.append((row[0], 'identity', _identity_record(row)))
+
+        ids = sorted(wanted.pop('transit_key', ()))
+        if ids:
+            for row in _select_in(db, """
+                SELECT transit_key_id, transit_secret, network_id
+                FROM transit_keys WHERE transit_key_id IN ({ids})
+            """, ids):
+                found.append((row[0], 'transit_key', _transit_key_record(row[1], row[2])))
+
+        ids = sorted(wanted.pop('key', ()))
+        if ids:
+            for row in _select_in(db, """
+                SELECT event_id, key_id, unsealed_secret, group_id
+                FROM events WHERE event_id IN ({ids}) AND event_type = 'key' AND purged = 0
+            """, ids):
+                if row[2]:
+                    found.append((row[0], 'key', _key_record(row[0], row[1], row[2], row[3])))
+
+        ids = sorted(wanted.pop('peer', ()))
+        if ids:
+            by_peer = {row[0]: row for row in _select_in(db, """
+                SELECT peer_id, public_key, identity_id, created_at
+                FROM peers WHERE peer_id IN ({ids})
+            """, ids)}
+            # Legacy refs name the peer by identity_id (see _fetch_dependency)
+            by_identity: Dict[str, Any] = {}
+            legacy = [dep_id for dep_id in ids if dep_id not in by_peer and len(dep_id) == 32]
+            if legacy:
+                for row in _select_in(db, """
+                    SELECT peer_id, public_key, identity_id, created_at
+                    FROM peers WHERE identity_id IN ({ids})
+                """, legacy):
+                    by_identity.setdefault(row[2], row)
+            for dep_id in ids:
+                row = by_peer.get(dep_id) or by_identity.get(dep_id)
+                if row is not None:
+                    found.append((dep_id, 'peer', _peer_record(row)))
+
+        # Every remaining type is a plain events lookup, so they share a query
+        ids = sorted(set().union(*wanted.values())) if wanted else []
+        if ids:
+            event_types = {row[0]: row[1] for row in _select_in(db, """
+                SELECT event_id, event_type FROM events WHERE event_id IN ({ids}) AND purged = 0
+            """, ids)}
+            for dep_type, dep_ids in wanted.items():
+                for dep_id in dep_ids:
+                    if dep_id in event_types:
+                        found.append((dep_id, dep_type, _event_record(dep_id, event_types[dep_id])))
+    except sqlite3.OperationalError as e:
+        # A table this protocol does not define; per-ref lookups handle it
+        tracer.debug('resolve_deps', "Dependency prefetch stopped: %s", e)
+
+    for dep_id, dep_type, record in found:
+        _remember(scope, dep_id, dep_type, record)
+    return len(found)
+
 class ResolveDepsHandler(Handler):
     """Handler for resolve deps."""
 
+    envelope_keys = (
+        'deps', 'transit_ciphertext', 'event_ciphertext', 'missing_deps',
+    )
+
     @property
     def name(self) -> str:
         return "resolve_deps"
@@ -419,11 +758,54 @@ class ResolveDepsHandler(Handler):
     def filter(self, envelope: dict[str, Any]) -> bool:
         """Check if this handler should process the envelope."""
         if not isinstance(envelope, dict):
-            print(f"[resolve_deps] WARNING: filter got {type(envelope)} instead of dict: {envelope}")
+            tracer.warning('resolve_deps', "filter got %s instead of dict: %s", type(envelope), envelope)
             return False
         return filter_func(envelope)
 
+    def prefetch(self, envelopes: List[dict[str, Any]], db: sqlite3.Connection) -> None:
+        """Load the deps of every envelope reaching this stage in a few queries."""
+        dep_refs: Set[str] = set()
+        for envelope in envelopes:
+            if not isinstance(envelope, dict) or not filter_func(envelope):
+                continue
+            if 'deps' in envelope:
+                if envelope.get('deps_included_and_valid') is not True:
+                    dep_refs.update(envelope['deps'] or ())
+            else:
+                dep_refs.update(implied_deps(envelope))
+        if dep_refs:
+            prefetch_dependencies(dep_refs, db)
+
     def process(self, envelope: dict[str, Any], db: sqlite3.Connection) -> List[dict[str, Any]]:
         """Process the envelope."""
         # resolve_deps handler function returns a list
         return handler(envelope, db)
+
+
+class UnblockHandler(Handler):
+    """Releases events blocked on an event once it has been validated and projected.
+
+    resolve_deps runs before validation, so an event validated within the
+    pipeline is already stored by the time it could come back to it; this
+    stage runs right after project instead, and is the only one that
+    releases waiters.
+    """
+
+    envelope_keys = ('validated',)
+
+    @property
+    def name(self) -> str:
+        return "unblock"
+
+    def filter(self, envelope: dict[str, Any]) -> bool:
+        """Validated events whose waiters have not been checked yet."""
+        return (
+            envelope.get('validated') is True and
+            bool(envelope.get('event_id')) and
+            not envelope.get('unblock_checked')
+        )
+
+    def process(self, envelope: dict[str, Any], db: sqlite3.Connection) -> List[dict[str, Any]]:
+        """Emit the events this one unblocks."""
+        envelope['unblock_checked'] = True
+        return unblock_waiting_events(envelope['event_id'], db)
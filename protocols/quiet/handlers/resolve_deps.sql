@@ -3,13 +3,15 @@
 
 CREATE TABLE IF NOT EXISTS blocked_events (
     event_id TEXT PRIMARY KEY,
-    envelope_json TEXT NOT NULL,  -- Serialized envelope JSON
+    envelope_json BLOB NOT NULL,  -- Envelope encoded with core.codec (older rows: JSON text)
     created_at INTEGER NOT NULL,
     missing_deps TEXT NOT NULL,   -- JSON array of missing dependency IDs
-    retry_count INTEGER DEFAULT 0 -- Track retries to prevent infinite loops
+    retry_count INTEGER DEFAULT 0, -- Track retries to prevent infinite loops
+    network_id TEXT NOT NULL DEFAULT ''  -- Network the event arrived on, for per-network quotas
 );
 
 CREATE INDEX IF NOT EXISTS idx_blocked_events_created ON blocked_events(created_at);
+CREATE INDEX IF NOT EXISTS idx_blocked_events_network ON blocked_events(network_id, created_at);
 
 -- Table to efficiently look up which events are waiting for a specific dependency
 CREATE TABLE IF NOT EXISTS blocked_event_deps (
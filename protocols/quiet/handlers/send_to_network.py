@@ -10,6 +10,7 @@ from protocols.quiet.protocol_types import OutgoingTransitEnvelope
 from typing import Any, List, Callable, cast
 import sqlite3
 from core.handlers import Handler
+from core.tracing import tracer
 
 
 def filter_func(envelope: dict[str, Any]) -> bool:
@@ -64,13 +65,15 @@ def handler(envelope: dict[str, Any], send_func: Callable) -> None:
         )
     except Exception as e:
         # Log error but don't crash
-        print(f"Failed to send to {transit_envelope['dest_ip']}:{transit_envelope['dest_port']}: {e}")
+        tracer.error('send_to_network', "Failed to send to %s:%s: %s", transit_envelope['dest_ip'], transit_envelope['dest_port'], e)
     
     # No return - this is a terminal handler
 
 class SendToNetworkHandler(Handler):
     """Handler for send to network."""
 
+    envelope_keys = ('dest_ip',)
+
     @property
     def name(self) -> str:
         return "send_to_network"
@@ -88,11 +91,11 @@ class SendToNetworkHandler(Handler):
         # Type check - in production this would be enforced by the type system
         required_fields = {'transit_ciphertext', 'transit_key_id', 'dest_ip', 'dest_port'}
         if not all(field in envelope for field in required_fields):
-            print(f"[send_to_network] ERROR: Missing required fields. Got: {envelope.keys()}")
+            tracer.error('send_to_network', "Missing required fields. Got: %s", list(envelope.keys()))
             return []
 
         # Log what we would send
-        print(f"[send_to_network] Would send to {envelope['dest_ip']}:{envelope['dest_port']}")
+        tracer.debug('send_to_network', "Would send to %s:%s", envelope['dest_ip'], envelope['dest_port'], envelope=envelope)
 
         # Terminal handler - no new envelopes
         return []
@@ -6,26 +6,26 @@ From plan.md:
 - Verify Filter: `event_plaintext` exists AND `sig_checked` is not true AND `deps_included_and_valid: true`
 - Transform: Signs events or verifies signatures
 """
-from typing import Any, List
+from typing import Any, List, Optional, Tuple
 import sqlite3
-import json
 import hashlib
+from core.cache import LRUCache, ScopedLRUCache
+from core.db import database_instance_id
 from core.handlers import Handler
+from protocols.quiet.event_codec import encode_event
 
 
 def canonicalize_event(event_plaintext: dict) -> bytes:
     """
     Create canonical 512-byte representation of signed event.
-    
-    The protocol requires a specific 512-byte format for event IDs.
-    This is a stub implementation - the real one would:
-    1. Serialize to deterministic JSON
-    2. Pad or truncate to exactly 512 bytes
-    3. Follow the protocol's specific canonical format
+
+    This is the fixed-size binary encoding from protocols.quiet.event_codec
+    (with any signature left out, so the signature slot is zero). Events
+    too large for 512 bytes are still signable: their encoding is cut short
+    and ends with a digest of the full body.
     """
-    # Deterministic JSON representation matching test signing behavior
-    canonical_json = json.dumps(event_plaintext, sort_keys=True)
-    return canonical_json.encode('utf-8')
+    event_plaintext = {k: v for k, v in event_plaintext.items() if k != 'signature'}
+    return encode_event(event_plaintext, allow_overflow=True)
 
 
 def filter_func(envelope: dict[str, Any]) -> bool:
@@ -84,33 +84,63 @@ def handler(envelope: dict[str, Any], db: sqlite3.Connection) -> dict[str, Any]:
         return verify_signature(envelope)
 
 
-def sign_event(envelope: dict[str, Any], db: sqlite3.Connection) -> dict[str, Any]:
-    """Sign a self-created event using the identity associated with the peer."""
+# Signing keys of local identities, per database. Entries are keyed
+# ('peer', peer_id) for events signed as a peer and ('key', public_key_hex)
+# for peer events, which name their own public key. Filled from projected
+# identity and peer rows (apply_signer_deltas) and on the first SQL lookup.
+signers = ScopedLRUCache(1024)
+
+
+def _load_signing_key(private_key: Any) -> Any:
+    from core.crypto import signing_key
+    if not isinstance(private_key, (bytes, bytearray)):
+        private_key = bytes.fromhex(private_key)
+    return signing_key(bytes(private_key))
 
+
+def apply_signer_deltas(db: sqlite3.Connection, deltas: List[dict[str, Any]]) -> None:
+    """Keep the signer cache in line with committed projection deltas.
+
+    Inserted identities (and peers of already cached identities) are added;
+    anything else touching identities or peers drops the database's signers.
+    """
+    scope = database_instance_id(db)
+    if scope is None:
+        return
+    for delta in deltas:
+        table = delta.get('table')
+        if table not in ('identities', 'peers'):
+            continue
+        data = delta.get('data') or {}
+        if delta.get('op') != 'insert':
+            signers.clear(scope)
+            continue
+        public_key = data.get('public_key')
+        if isinstance(public_key, bytes):
+            public_key = public_key.hex()
+        if table == 'identities':
+            if public_key and data.get('private_key'):
+                try:
+                    signers.put(scope, ('key', public_key), _load_signing_key(data['private_key']))
+                except Exception:
+                    continue
+        elif data.get('peer_id'):
+            key = signers.peek(scope, ('key', public_key))
+            if key is not None:
+                signers.put(scope, ('peer', data['peer_id']), key)
+
+
+def _lookup_signer(envelope: dict[str, Any], db: sqlite3.Connection) -> Tuple[Any, Optional[str]]:
+    """Return (signing_key, None) or (None, error), reading peers and identities."""
     event_plaintext = envelope.get('event_plaintext', {})
-    event_type = envelope.get('event_type')
 
     # Determine which public key to use for signing
-    public_key_hex = None
-
-    if event_type == 'peer':
+    if envelope.get('event_type') == 'peer':
         # For peer events, use the public_key from the event itself
         public_key_hex = event_plaintext.get('public_key')
-        if not public_key_hex:
-            envelope['error'] = "Peer event missing public_key"
-            envelope['sig_failed'] = True
-            return envelope
     else:
         # For other events, look up the peer's public key
         peer_id = envelope.get('peer_id')
-        if not peer_id:
-            envelope['error'] = "No peer_id in envelope for signing"
-            envelope['sig_failed'] = True
-            return envelope
-
-        # Placeholder peer_ids no longer supported (flows emit sequentially)
-
-        # Look up peer's public key from database
         cursor = db.execute("""
             SELECT public_key FROM peers
             WHERE peer_id = ?
@@ -118,19 +148,12 @@ def sign_event(envelope: dict[str, Any], db: sqlite3.Connection) -> dict[str, An
         row = cursor.fetchone()
 
         if not row:
-            envelope['error'] = f"Peer {peer_id} not found in database"
-            envelope['sig_failed'] = True
-            return envelope
+            return None, f"Peer {peer_id} not found in database"
 
         public_key_hex = row[0]
         if isinstance(public_key_hex, bytes):
             public_key_hex = public_key_hex.hex()
 
-    # Sign with the identity that has this public key
-    event_copy = event_plaintext.copy()
-    event_copy.pop('signature', None)
-    canonical = canonicalize_event(event_copy)
-
     # Sign using protocol identities (private key stored locally)
     try:
         cur = db.execute(
@@ -143,33 +166,71 @@ def sign_event(envelope: dict[str, Any], db: sqlite3.Connection) -> dict[str, An
         row = cur.fetchone()
         if not row or not row['private_key']:
             raise ValueError("Private key not found for signer")
-        from core.crypto import sign
-        private_key_bytes = row['private_key'] if isinstance(row['private_key'], (bytes, bytearray)) else bytes.fromhex(row['private_key'])
-        signature = sign(canonical, private_key_bytes).hex()
+        key = _load_signing_key(row['private_key'])
     except Exception as e:
-        envelope['error'] = str(e)
-        envelope['sig_failed'] = True
-        return envelope
+        return None, str(e)
+
+    scope = database_instance_id(db)
+    if scope is not None:
+        signers.put(scope, ('key', public_key_hex), key)
+        if envelope.get('event_type') != 'peer':
+            signers.put(scope, ('peer', envelope['peer_id']), key)
+    return key, None
+
+
+def sign_event(envelope: dict[str, Any], db: sqlite3.Connection) -> dict[str, Any]:
+    """Sign a self-created event using the identity associated with the peer."""
+
+    event_plaintext = envelope.get('event_plaintext', {})
+
+    if envelope.get('event_type') == 'peer':
+        if not event_plaintext.get('public_key'):
+            envelope['error'] = "Peer event missing public_key"
+            envelope['sig_failed'] = True
+            return envelope
+        cache_key = ('key', event_plaintext['public_key'])
+    else:
+        # Placeholder peer_ids no longer supported (flows emit sequentially)
+        if not envelope.get('peer_id'):
+            envelope['error'] = "No peer_id in envelope for signing"
+            envelope['sig_failed'] = True
+            return envelope
+        cache_key = ('peer', envelope['peer_id'])
+
+    scope = database_instance_id(db)
+    key = signers.get(scope, cache_key) if scope is not None else None
+    if key is None:
+        key, error = _lookup_signer(envelope, db)
+        if key is None:
+            envelope['error'] = error
+            envelope['sig_failed'] = True
+            return envelope
+
+    # Sign with the identity that has this public key
+    event_copy = event_plaintext.copy()
+    event_copy.pop('signature', None)
+    canonical = canonicalize_event(event_copy)
 
-    envelope['event_plaintext']['signature'] = signature
+    envelope['event_plaintext']['signature'] = key.sign(canonical).signature.hex()
     envelope['sig_checked'] = True
     envelope['self_signed'] = True
 
     return envelope
 
 
-def verify_signature(envelope: dict[str, Any]) -> dict[str, Any]:
-    """Verify signature on an event."""
-    from core import crypto
+# Signatures already known to be valid, keyed by
+# (public_key, signature, digest of the signed bytes). Only successes are
+# cached, so a hit can never turn a bad signature into a good one.
+verified_signatures = LRUCache(16384)
 
+
+def _verification_inputs(envelope: dict[str, Any]) -> Tuple[Optional[tuple], Optional[str]]:
+    """Return ((canonical, signature, public_key), None) or (None, error)."""
     event_plaintext = envelope.get('event_plaintext', {})
     signature = event_plaintext.get('signature')
 
     if not signature:
-        envelope['error'] = "No signature in event"
-        envelope['sig_checked'] = True
-        envelope['sig_failed'] = True
-        return envelope
+        return None, "No signature in event"
 
     # Get public key from peer dependency if available
     peer_id = event_plaintext.get('peer_id')
@@ -186,41 +247,88 @@ def verify_signature(envelope: dict[str, Any]) -> dict[str, Any]:
         public_key = event_plaintext.get('public_key')
 
     if not public_key:
-        envelope['error'] = "No public_key available for verification"
-        envelope['sig_checked'] = True
-        envelope['sig_failed'] = True
-        return envelope
+        return None, "No public_key available for verification"
 
     # Create canonical form without signature
     event_to_verify = event_plaintext.copy()
     event_to_verify.pop('signature', None)
 
-    # Verify signature
     try:
         canonical = canonicalize_event(event_to_verify)
-        sig_bytes = bytes.fromhex(signature)
-        pub_key_bytes = bytes.fromhex(public_key)
-
-        if crypto.verify(canonical, sig_bytes, pub_key_bytes):
-            envelope['sig_checked'] = True
-        else:
-            envelope['error'] = "Signature verification failed"
-            envelope['sig_checked'] = True
-            envelope['sig_failed'] = True
+        return (canonical, bytes.fromhex(signature), bytes.fromhex(public_key)), None
     except Exception as e:
-        envelope['error'] = f"Signature verification error: {str(e)}"
-        envelope['sig_checked'] = True
+        return None, f"Signature verification error: {str(e)}"
+
+
+def _cache_key(inputs: tuple) -> tuple:
+    canonical, sig_bytes, pub_key_bytes = inputs
+    return (pub_key_bytes, sig_bytes, hashlib.blake2b(canonical, digest_size=16).digest())
+
+
+def _apply_verification(envelope: dict[str, Any], error: Optional[str]) -> dict[str, Any]:
+    envelope['sig_checked'] = True
+    if error:
+        envelope['error'] = error
         envelope['sig_failed'] = True
 
     # Extract peer_id from event if it's a peer event
-    if event_plaintext.get('type') == 'peer':
+    if envelope.get('event_plaintext', {}).get('type') == 'peer':
         envelope['peer_id'] = envelope.get('event_id')  # peer_id IS the event_id for peer events
 
     return envelope
 
+
+def verify_signature(envelope: dict[str, Any]) -> dict[str, Any]:
+    """Verify signature on an event."""
+    from core import crypto
+
+    inputs, error = _verification_inputs(envelope)
+    if inputs is not None:
+        key = _cache_key(inputs)
+        if verified_signatures.get(key) is None:
+            try:
+                if crypto.verify(*inputs):
+                    verified_signatures.put(key, True)
+                else:
+                    error = "Signature verification failed"
+            except Exception as e:
+                error = f"Signature verification error: {str(e)}"
+
+    return _apply_verification(envelope, error)
+
+
+def verify_signatures(envelopes: List[dict[str, Any]]) -> int:
+    """Batch-verify envelopes and remember the valid signatures.
+
+    Nothing is written to the envelopes; a later verify_signature() call on
+    each one is then answered from verified_signatures. Returns how many
+    signatures were actually checked.
+    """
+    from core import crypto
+
+    pending = {}
+    for envelope in envelopes:
+        inputs, _ = _verification_inputs(envelope)
+        if inputs is None:
+            continue
+        key = _cache_key(inputs)
+        if key not in pending and verified_signatures.peek(key) is None:
+            pending[key] = inputs
+    if not pending:
+        return 0
+
+    results = crypto.verify_batch(list(pending.values()))
+    for key, ok in zip(pending, results):
+        if ok:
+            verified_signatures.put(key, True)
+    return len(pending)
+
+
 class SignatureHandler(Handler):
     """Handler that signs self-created events and verifies signatures."""
 
+    envelope_keys = ('deps_included_and_valid',)
+
     @property
     def name(self) -> str:
         return "signature"
@@ -229,6 +337,14 @@ class SignatureHandler(Handler):
         """Process envelopes that need signing or signature verification."""
         return filter_func(envelope)
 
+    def prefetch(self, envelopes: List[dict[str, Any]], db: sqlite3.Connection) -> None:
+        """Verify the signatures reaching this stage in one batch ahead of process()."""
+        verify_signatures([
+            envelope for envelope in envelopes
+            if filter_func(envelope)
+            and not (envelope.get('self_created') and not envelope['event_plaintext'].get('signature'))
+        ])
+
     def process(self, envelope: dict[str, Any], db: sqlite3.Connection) -> List[dict[str, Any]]:
         """Sign or verify signature on envelope."""
         result = handler(envelope, db)
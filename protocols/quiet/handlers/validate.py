@@ -6,6 +6,7 @@ from typing import List, Dict, Any, cast as type_cast
 import sqlite3
 import importlib
 from core.handlers import Handler
+from core.tracing import tracer
 from protocols.quiet.protocol_types import validate_envelope_fields
 from protocols.quiet.protocol_types import ValidatableEvent, BaseEnvelope
 from protocols.quiet.handlers.event_store import purge_event
@@ -17,6 +18,8 @@ class ValidateHandler(Handler):
     Consumes: envelopes with event_plaintext, sig_checked=True
     Emits: envelopes with validated=True
     """
+
+    envelope_keys = ('event_plaintext',)
     
     def __init__(self) -> None:
         # Map of event types to their validator modules
@@ -96,7 +99,7 @@ class ValidateHandler(Handler):
         events_dir = Path(__file__).parent.parent / 'events'
 
         if not events_dir.exists():
-            print(f"Events directory not found: {events_dir}")
+            tracer.warning('validate', "Events directory not found: %s", events_dir)
             return
 
         # Iterate through all subdirectories in events/
@@ -110,8 +113,8 @@ class ValidateHandler(Handler):
                     try:
                         module = importlib.import_module(f'protocols.quiet.events.{event_type}.validator')
                         self.validators[event_type] = module
-                        print(f"Loaded validator for {event_type}")
+                        tracer.debug('validate', "Loaded validator for %s", event_type)
                     except ImportError as e:
-                        print(f"Failed to load {event_type} validator: {e}")
+                        tracer.error('validate', "Failed to load %s validator: %s", event_type, e)
                     except Exception as e:
-                        print(f"Error loading {event_type} validator: {e}")
+                        tracer.error('validate', "Error loading %s validator: %s", event_type, e)
@@ -8,5 +8,14 @@ JOBS = [
         'params': {},
         'every_ms': 5_000,
     },
+    # Handler maintenance jobs (JOBS tables in protocols/quiet/handlers)
+    {
+        'job': 'blocked_events',
+        'every_ms': 60_000,
+    },
+    {
+        'job': 'purged_events',
+        'every_ms': 60 * 60_000,
+    },
 ]
 
@@ -0,0 +1,33 @@
+"""
+Stage order of the Quiet handler pipeline.
+
+The registry runs handlers in this order, so within a single
+process_envelope call an incoming event can go from the network layer to
+projection without waiting for another queue generation:
+
+    receive -> resolve_deps -> crypto -> remove -> signature -> validate
+            -> event_store -> project -> unblock -> reflect
+
+resolve_deps resolves and blocks; releasing the events an event unblocks
+waits for the unblock stage, once that event is stored and projected.
+
+Outgoing-only handlers come after the incoming chain. Handlers not listed
+here run after all listed ones, in registration order.
+"""
+
+STAGES = (
+    'receive_from_network',
+    'resolve_deps',
+    'crypto',
+    'remove',
+    'check_membership',
+    'signature',
+    'validate',
+    'event_store',
+    'project',
+    'unblock',
+    'reflect',
+    'check_outgoing',
+    'send_to_network',
+    'job',
+)
@@ -16,6 +16,7 @@ sys.path.insert(0, str(project_root))
 from core.db import get_connection, init_database
 from core.crypto import generate_keypair, sign
 from core.pipeline import PipelineRunner
+from protocols.quiet.handlers.signature import canonicalize_event
 
 
 def process_envelope(envelope, db):
@@ -64,7 +65,6 @@ def test_identity():
 @pytest.fixture
 def sample_identity_event(test_identity):
     """Create a sample identity event."""
-    import json
     import time
     
     event = {
@@ -76,7 +76,7 @@ def sample_identity_event(test_identity):
     }
     
     # Sign the event
-    message = json.dumps(event, sort_keys=True).encode()
+    message = canonicalize_event(event)
     signature = sign(message, test_identity["private_key"])
     event["signature"] = signature.hex()
     
@@ -86,7 +86,6 @@ def sample_identity_event(test_identity):
 @pytest.fixture
 def sample_key_event(test_identity):
     """Create a sample key event."""
-    import json
     import time
     
     event = {
@@ -100,7 +99,7 @@ def sample_key_event(test_identity):
     }
     
     # Sign the event
-    message = json.dumps(event, sort_keys=True).encode()
+    message = canonicalize_event(event)
     signature = sign(message, test_identity["private_key"])
     event["signature"] = signature.hex()
     
@@ -110,7 +109,6 @@ def sample_key_event(test_identity):
 @pytest.fixture
 def sample_transit_secret_event(test_identity):
     """Create a sample transit secret event."""
-    import json
     import time
     
     event = {
@@ -123,8 +121,46 @@ def sample_transit_secret_event(test_identity):
     }
     
     # Sign the event
-    message = json.dumps(event, sort_keys=True).encode()
+    message = canonicalize_event(event)
     signature = sign(message, test_identity["private_key"])
     event["signature"] = signature.hex()
     
     return event
+
+
+@pytest.fixture
+def received_peer_packets(initialized_db):
+    """Signed peer events as they arrive from the network, ready for runner.run()."""
+    from core.crypto import encrypt, generate_secret
+    from protocols.quiet import transit
+    from protocols.quiet.event_codec import encode_event
+
+    event_secret = generate_secret()
+    transit_key_id = "ab" * 32
+    transit_secret = generate_secret()
+    initialized_db.execute("""
+        INSERT INTO events (event_id, event_type, key_id, unsealed_secret, group_id, stored_at, purged)
+        VALUES ('key1', 'key', 'key1', ?, 'group1', 0, 0)
+    """, (event_secret,))
+    initialized_db.execute(
+        "INSERT INTO transit_keys (transit_key_id, transit_secret, network_id) VALUES (?, ?, 'net1')",
+        (transit_key_id, transit_secret))
+    initialized_db.execute("""
+        INSERT INTO peer_transit_keys (transit_key_id, peer_id, network_id, created_at)
+        VALUES (?, 'us', 'net1', 0)
+    """, (transit_key_id,))
+    initialized_db.commit()
+
+    packets = []
+    for i in range(8):
+        private_key, public_key = generate_keypair()
+        event = {"type": "peer", "public_key": public_key.hex(), "identity_id": f"identity{i}",
+                 "network_id": "net1", "created_at": 1000 + i}
+        event["signature"] = sign(canonicalize_event(event), private_key).hex()
+        ciphertext, nonce = encrypt(encode_event(event), event_secret)
+        payload = {"event_ciphertext": nonce + ciphertext,
+                   "key_ref": {"kind": "key", "id": "key1"}, "network_id": "net1"}
+        packets.append({"origin_ip": "10.0.0.1", "origin_port": 9999, "received_at": 1000,
+                        "raw_data": bytes.fromhex(transit_key_id)
+                        + transit.seal_payload(transit_key_id, transit_secret, payload)})
+    return {"db": initialized_db, "event_secret": event_secret, "packets": packets}
@@ -89,7 +89,8 @@ class HandlerTestBase:
                 envelope_json TEXT NOT NULL,
                 created_at INTEGER NOT NULL,
                 missing_deps TEXT NOT NULL,
-                retry_count INTEGER DEFAULT 0
+                retry_count INTEGER DEFAULT 0,
+                network_id TEXT NOT NULL DEFAULT ''
             )
         """)
         
@@ -0,0 +1,170 @@
+"""
+Tests for the batch commit wrapper used by the pipeline runner.
+"""
+import os
+import sqlite3
+import tempfile
+
+import pytest
+
+from core.db import BatchConnection
+from core.handlers import Handler, HandlerRegistry
+from core.pipeline import PipelineRunner
+
+
+class TestBatchConnection:
+    """Test savepoint semantics of BatchConnection."""
+
+    def setup_method(self):
+        self.db_fd, self.db_path = tempfile.mkstemp()
+        self.db = sqlite3.connect(self.db_path)
+        self.db.execute("CREATE TABLE items (name TEXT PRIMARY KEY)")
+        self.db.commit()
+
+    def teardown_method(self):
+        self.db.close()
+        os.close(self.db_fd)
+        os.unlink(self.db_path)
+
+    def _committed_names(self):
+        other = sqlite3.connect(self.db_path)
+        try:
+            return {row[0] for row in other.execute("SELECT name FROM items")}
+        finally:
+            other.close()
+
+    def test_handler_commit_is_deferred_to_batch(self):
+        """Handler commits inside an envelope are not visible until the batch commits."""
+        batch = BatchConnection(self.db)
+        batch.begin_envelope()
+        batch.execute("INSERT INTO items (name) VALUES ('a')")
+        batch.commit()
+        batch.end_envelope()
+
+        assert self._committed_names() == set()
+
+        batch.commit_batch()
+        assert self._committed_names() == {'a'}
+
+    def test_handler_rollback_only_undoes_current_envelope(self):
+        """A rollback inside one envelope keeps earlier envelopes' writes."""
+        batch = BatchConnection(self.db)
+        batch.begin_envelope()
+        batch.execute("INSERT INTO items (name) VALUES ('kept')")
+        batch.end_envelope()
+
+        batch.begin_envelope()
+        batch.execute("INSERT INTO items (name) VALUES ('dropped')")
+        batch.rollback()
+        batch.end_envelope()
+        batch.commit_batch()
+
+        assert self._committed_names() == {'kept'}
+
+    def test_rollback_after_checkpoint_keeps_checkpointed_work(self):
+        """commit() checkpoints the envelope like a per-handler commit would."""
+        batch = BatchConnection(self.db)
+        batch.begin_envelope()
+        batch.execute("INSERT INTO items (name) VALUES ('stored')")
+        batch.commit()
+        batch.execute("INSERT INTO items (name) VALUES ('failed')")
+        batch.rollback()
+        batch.end_envelope()
+        batch.commit_batch()
+
+        assert self._committed_names() == {'stored'}
+
+    def test_abort_envelope_discards_uncheckpointed_work(self):
+        """abort_envelope() drops writes made since the last checkpoint."""
+        batch = BatchConnection(self.db)
+        batch.begin_envelope()
+        batch.execute("INSERT INTO items (name) VALUES ('partial')")
+        batch.abort_envelope()
+        batch.commit_batch()
+
+        assert self._committed_names() == set()
+
+
+class RecordHandler(Handler):
+    """Inserts each envelope's item and commits, as storing handlers do."""
+
+    envelope_keys = ('item',)
+
+    @property
+    def name(self) -> str:
+        return "record"
+
+    def filter(self, envelope):
+        return 'item' in envelope and not envelope.get('recorded')
+
+    def process(self, envelope, db):
+        db.execute("INSERT INTO items (name) VALUES (?)", (envelope['item'],))
+        if envelope['item'] == 'boom':
+            raise RuntimeError("handler failed")
+        db.commit()
+        envelope['recorded'] = True
+        return []
+
+
+class TestRunnerBatchMode:
+    """Test PipelineRunner's batch_size commit policy end to end."""
+
+    @pytest.fixture(autouse=True)
+    def setup(self, tmp_path, monkeypatch):
+        import core.pipeline
+
+        registry = HandlerRegistry()
+        registry.register(RecordHandler())
+        monkeypatch.setattr(core.pipeline, 'registry', registry)
+
+        # A protocol with no handlers or schema of its own
+        self.protocol_dir = tmp_path / "batchproto"
+        self.protocol_dir.mkdir()
+        self.db_path = str(tmp_path / "batch.db")
+        self.db = sqlite3.connect(self.db_path)
+        self.db.execute("CREATE TABLE items (name TEXT PRIMARY KEY)")
+        self.db.commit()
+
+        # Names visible to another connection after each batch commit
+        self.commits = []
+        commit_batch = BatchConnection.commit_batch
+
+        def spy(batch):
+            commit_batch(batch)
+            self.commits.append(self._committed_names())
+
+        monkeypatch.setattr(BatchConnection, 'commit_batch', spy)
+        yield
+        self.db.close()
+
+    def _committed_names(self):
+        other = sqlite3.connect(self.db_path)
+        try:
+            return {row[0] for row in other.execute("SELECT name FROM items")}
+        finally:
+            other.close()
+
+    def _run(self, batch_size, items):
+        runner = PipelineRunner(db_path=self.db_path, batch_size=batch_size)
+        return runner.run(protocol_dir=str(self.protocol_dir),
+                          input_envelopes=[{'item': item} for item in items], db=self.db)
+
+    def test_batch_size_zero_commits_once_per_generation(self):
+        """The whole generation lands in one commit."""
+        self._run(0, ['a', 'b', 'c'])
+
+        assert self.commits == [{'a', 'b', 'c'}]
+
+    def test_batch_size_n_commits_every_n_envelopes(self):
+        """Every N envelopes are committed together, and the remainder at the end."""
+        self._run(2, ['a', 'b', 'c', 'd', 'e'])
+
+        assert self.commits == [{'a', 'b'}, {'a', 'b', 'c', 'd'}, {'a', 'b', 'c', 'd', 'e'}]
+
+    def test_handler_error_keeps_completed_envelopes(self):
+        """A failing envelope is rolled back; envelopes already done are committed."""
+        with pytest.raises(RuntimeError):
+            self._run(0, ['a', 'b', 'boom', 'c'])
+
+        assert self.commits == [{'a', 'b'}]
+        assert self._committed_names() == {'a', 'b'}
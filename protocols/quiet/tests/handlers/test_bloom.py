@@ -0,0 +1,45 @@
+"""
+Tests for the Bloom filter.
+"""
+import pytest
+
+from core.bloom import BloomFilter
+
+
+class TestBloomFilter:
+    """Test membership answers and sizing."""
+
+    def test_added_items_are_members(self):
+        bloom = BloomFilter(1000)
+        ids = [f'event{i}' for i in range(1000)]
+        for event_id in ids:
+            bloom.add(event_id)
+        assert all(event_id in bloom for event_id in ids)
+        assert len(bloom) == 1000
+
+    def test_false_positive_rate_is_near_target(self):
+        bloom = BloomFilter(5000, error_rate=0.01)
+        for i in range(5000):
+            bloom.add(f'known{i}')
+        false_positives = sum(f'unknown{i}' in bloom for i in range(10000))
+        assert false_positives < 300
+
+    def test_bytes_and_str_items(self):
+        bloom = BloomFilter(10)
+        bloom.add(b'\x00\x01')
+        assert b'\x00\x01' in bloom
+        assert 'absent' not in bloom
+
+    def test_saturation(self):
+        bloom = BloomFilter(2)
+        for item in ('a', 'b'):
+            bloom.add(item)
+        assert not bloom.saturated
+        bloom.add('c')
+        assert bloom.saturated
+
+    def test_rejects_bad_parameters(self):
+        with pytest.raises(ValueError):
+            BloomFilter(0)
+        with pytest.raises(ValueError):
+            BloomFilter(10, error_rate=1.5)
@@ -3,7 +3,6 @@ Tests for check_sig handler.
 """
 import pytest
 import sys
-import json
 from pathlib import Path
 
 # Add project root to path
@@ -11,8 +10,10 @@ protocol_dir = Path(__file__).parent.parent.parent
 project_root = protocol_dir.parent.parent
 sys.path.insert(0, str(project_root))
 
-from protocols.quiet.handlers.signature import SignatureHandler
-from core.crypto import sign, generate_keypair
+from core import crypto
+from core.crypto import sign, generate_keypair, verify, verify_batch
+from protocols.quiet.handlers import signature as signature_module
+from protocols.quiet.handlers.signature import SignatureHandler, canonicalize_event
 
 
 class TestCheckSigHandler:
@@ -69,7 +70,6 @@ class TestCheckSigHandler:
     @pytest.mark.handler
     def test_process_valid_signature(self, handler, test_identity, initialized_db):
         """Test processing event with valid signature."""
-        import json
         event = {
             "type": "peer",
             "public_key": test_identity["public_key"].hex(),
@@ -77,7 +77,7 @@ class TestCheckSigHandler:
             "username": "User",
             "created_at": 1000
         }
-        message = json.dumps(event, sort_keys=True).encode()
+        message = canonicalize_event(event)
         signature = sign(message, test_identity["private_key"]).hex()
         event["signature"] = signature
         envelope = {
@@ -99,7 +99,6 @@ class TestCheckSigHandler:
     @pytest.mark.handler
     def test_process_invalid_signature(self, handler, test_identity, initialized_db):
         """Test processing event with invalid signature."""
-        import json
         event = {
             "type": "peer",
             "public_key": test_identity["public_key"].hex(),
@@ -129,7 +128,6 @@ class TestCheckSigHandler:
     @pytest.mark.handler
     def test_process_tampered_event(self, handler, test_identity, initialized_db):
         """Test processing event where content was tampered."""
-        import json
         base = {
             "type": "peer",
             "public_key": test_identity["public_key"].hex(),
@@ -137,7 +135,7 @@ class TestCheckSigHandler:
             "username": "User",
             "created_at": 1000
         }
-        message = json.dumps(base, sort_keys=True).encode()
+        message = canonicalize_event(base)
         sig = sign(message, test_identity["private_key"]).hex()
         tampered = base.copy()
         tampered["username"] = "Hacked"
@@ -200,7 +198,7 @@ class TestCheckSigHandler:
         }
         
         # But sign with our test identity's key
-        message = json.dumps(event, sort_keys=True).encode()
+        message = canonicalize_event(event)
         signature = sign(message, test_identity["private_key"])
         event["signature"] = signature.hex()
         
@@ -218,3 +216,160 @@ class TestCheckSigHandler:
         # Should fail - signature doesn't match claimed peer_id
         assert result["sig_checked"] == True
         assert "error" in result
+
+
+class TestSignatureBatching:
+    """Batch verification and the verified-signature cache."""
+
+    def setup_method(self):
+        signature_module.verified_signatures.clear()
+
+    def teardown_method(self):
+        signature_module.verified_signatures.clear()
+
+    def _envelope(self, keypair, n, tamper=False):
+        private_key, public_key = keypair
+        event = {"type": "peer", "public_key": public_key.hex(), "identity_id": f"id{n}", "created_at": n}
+        event["signature"] = sign(canonicalize_event(event), private_key).hex()
+        if tamper:
+            event["created_at"] += 1
+        return {"event_id": f"e{n}", "event_type": "peer",
+                "event_plaintext": event, "deps_included_and_valid": True}
+
+    @pytest.mark.unit
+    def test_verify_batch_matches_single(self):
+        keys = [generate_keypair() for _ in range(3)]
+        items = []
+        for i in range(40):
+            private_key, public_key = keys[i % 3]
+            message = f"msg{i}".encode()
+            signature = sign(message, private_key)
+            if i % 7 == 0:
+                message += b"!"
+            items.append((message, signature, public_key))
+        items.append((b"x", b"short", keys[0][1]))
+        items.append((b"x", b"\0" * 64, b"bad key"))
+
+        expected = [verify(*item) if len(item[1]) == 64 and len(item[2]) == 32 else False
+                    for item in items]
+        assert verify_batch(items) == expected
+        assert verify_batch(items[:5]) == expected[:5]
+
+    @pytest.mark.unit
+    def test_prefetch_fills_cache_and_process_hits_it(self, monkeypatch):
+        keypair = generate_keypair()
+        envelopes = [self._envelope(keypair, i) for i in range(5)]
+        envelopes.append(self._envelope(keypair, 99, tamper=True))
+        handler = SignatureHandler()
+
+        handler.prefetch(envelopes, None)
+        assert len(signature_module.verified_signatures) == 5
+
+        calls = []
+        real_verify = crypto.verify
+        monkeypatch.setattr(crypto, "verify", lambda *a: calls.append(a) or real_verify(*a))
+        results = [handler.process(envelope, None)[0] for envelope in envelopes]
+
+        assert all(r["sig_checked"] for r in results)
+        assert [bool(r.get("sig_failed")) for r in results] == [False] * 5 + [True]
+        # Only the bad signature reached Ed25519 again
+        assert len(calls) == 1
+
+    @pytest.mark.unit
+    def test_cache_is_bound_to_content(self):
+        keypair = generate_keypair()
+        envelope = self._envelope(keypair, 1)
+        assert "sig_failed" not in signature_module.verify_signature(envelope)
+
+        forged = self._envelope(keypair, 1)
+        forged["event_plaintext"]["signature"] = envelope["event_plaintext"]["signature"]
+        forged["event_plaintext"]["username"] = "mallory"
+        assert signature_module.verify_signature(forged)["sig_failed"] is True
+
+
+class TestSignatureBatchingInRunner:
+    """Received events reach the signature stage as one batch."""
+
+    @pytest.fixture(autouse=True)
+    def clear_caches(self):
+        from protocols.quiet.handlers import crypto as crypto_handler
+        signature_module.verified_signatures.clear()
+        crypto_handler.decrypted_events.clear()
+        yield
+        signature_module.verified_signatures.clear()
+        crypto_handler.decrypted_events.clear()
+
+    @pytest.mark.unit
+    def test_runner_verifies_received_events_in_one_batch(self, received_peer_packets, monkeypatch):
+        from core.pipeline import PipelineRunner
+
+        db = received_peer_packets["db"]
+        packets = received_peer_packets["packets"]
+        batches, singles = [], []
+        real_verify_batch, real_verify = crypto.verify_batch, crypto.verify
+        monkeypatch.setattr(crypto, "verify_batch", lambda items: batches.append(len(items)) or real_verify_batch(items))
+        monkeypatch.setattr(crypto, "verify", lambda *a: singles.append(a) or real_verify(*a))
+
+        PipelineRunner(db_path=":memory:").run(protocol_dir=str(protocol_dir), input_envelopes=packets, db=db)
+
+        assert batches == [len(packets)]
+        assert singles == []
+        assert db.execute("SELECT COUNT(*) FROM peers").fetchone()[0] == len(packets)
+
+
+class TestSignerCache:
+    """sign_event reuses SigningKeys learned from projected identities and peers."""
+
+    @pytest.fixture(autouse=True)
+    def setup(self, initialized_db, test_identity):
+        signature_module.signers.clear()
+        self.db = initialized_db
+        self.identity = test_identity
+        public_key = test_identity["public_key"].hex()
+        signature_module.apply_signer_deltas(self.db, [
+            {"op": "insert", "table": "identities",
+             "data": {"identity_id": "ident1", "public_key": public_key,
+                      "private_key": test_identity["private_key"]}},
+            {"op": "insert", "table": "peers",
+             "data": {"peer_id": "peer1", "public_key": public_key, "identity_id": "ident1"}},
+        ])
+        self.selects = []
+        self.db.set_trace_callback(
+            lambda sql: self.selects.append(sql) if sql.lstrip().upper().startswith("SELECT") else None)
+        yield
+        self.db.set_trace_callback(None)
+        signature_module.signers.clear()
+
+    def _message(self):
+        return {"event_type": "message", "peer_id": "peer1", "self_created": True,
+                "event_plaintext": {"type": "message", "peer_id": "peer1", "content": "hi"}}
+
+    @pytest.mark.unit
+    def test_projected_signer_needs_no_sql(self):
+        result = signature_module.sign_event(self._message(), self.db)
+
+        assert result["self_signed"] is True
+        assert self.selects == []
+        event = dict(result["event_plaintext"])
+        signature = bytes.fromhex(event.pop("signature"))
+        assert verify(canonicalize_event(event), signature, self.identity["public_key"])
+
+    @pytest.mark.unit
+    def test_peer_event_uses_identity_key(self):
+        envelope = {"event_type": "peer", "self_created": True,
+                    "event_plaintext": {"type": "peer", "public_key": self.identity["public_key"].hex()}}
+
+        assert signature_module.sign_event(envelope, self.db)["self_signed"] is True
+        assert self.selects == []
+
+    @pytest.mark.unit
+    def test_removal_evicts_signers(self):
+        signature_module.apply_signer_deltas(
+            self.db, [{"op": "delete", "table": "identities", "where": {"identity_id": "ident1"}}])
+
+        result = signature_module.sign_event(self._message(), self.db)
+
+        # Falls back to the tables, where this peer was never stored
+        assert result["sig_failed"] is True
+        assert "peer1" in result["error"]
+        assert self.selects
@@ -0,0 +1,64 @@
+"""
+Tests for the binary envelope codec.
+"""
+import json
+
+import pytest
+
+from core.codec import EnvelopeCodec
+from protocols.quiet.envelope_keys import ENVELOPE_KEYS, codec
+
+
+class TestEnvelopeCodec:
+    """Test round-tripping and compactness of encoded envelopes."""
+
+    def test_round_trip_preserves_types(self):
+        """All supported value types survive encode/decode unchanged."""
+        envelope = {
+            'event_id': 'abc123',
+            'event_plaintext': {'type': 'message', 'content': 'héllo', 'created_at': 1_700_000_000_000},
+            'event_ciphertext': b'\x00\xff' * 40,
+            'deps': ['channel:c1', 'peer:p1'],
+            'retry_count': -3,
+            'score': 0.25,
+            'validated': True,
+            'stored': False,
+            'error': None,
+            'custom_field': {'nested': [1, [2, b'x']]},
+        }
+
+        assert codec.decode(codec.encode(envelope)) == envelope
+
+    def test_encoded_envelope_is_smaller_than_json(self):
+        """Known keys are interned and bytes are not hex-expanded."""
+        envelope = {
+            'event_id': 'a' * 32,
+            'event_type': 'message',
+            'event_ciphertext': bytes(range(256)),
+            'deps_included_and_valid': False,
+            'missing_deps_list': ['channel:' + 'c' * 32],
+        }
+        as_json = json.dumps({**envelope, 'event_ciphertext': envelope['event_ciphertext'].hex()})
+
+        assert len(codec.encode(envelope)) < len(as_json) * 0.6
+
+    def test_decodes_legacy_json(self):
+        """Rows written as JSON text before the codec still decode."""
+        assert codec.decode('{"event_id": "old"}') == {'event_id': 'old'}
+        assert codec.decode(b'{"event_id": "old"}') == {'event_id': 'old'}
+
+    def test_unknown_keys_and_key_tables(self):
+        """Keys outside the table round-trip, and tables reject duplicates."""
+        plain = EnvelopeCodec()
+        assert plain.decode(plain.encode({'anything': 1})) == {'anything': 1}
+        with pytest.raises(ValueError):
+            EnvelopeCodec(['event_id', 'event_id'])
+
+    def test_key_table_is_unique(self):
+        """The protocol key table has no duplicate entries."""
+        assert len(set(ENVELOPE_KEYS)) == len(ENVELOPE_KEYS)
+
+    def test_rejects_unsupported_types(self):
+        """Values that cannot be represented raise TypeError."""
+        with pytest.raises(TypeError):
+            codec.encode({'event_id': object()})
@@ -0,0 +1,110 @@
+"""
+Tests for the database connection pool.
+"""
+import os
+import tempfile
+import threading
+
+import sqlite3
+
+import pytest
+
+from core.db import ConnectionPool
+from core.queries import QueryExecutor, QueryRegistry
+
+
+class TestConnectionPool:
+    """Test reader reuse and the shared writer."""
+
+    def setup_method(self):
+        self.db_fd, self.db_path = tempfile.mkstemp(suffix='.db')
+        self.pool = ConnectionPool(self.db_path)
+        with self.pool.writer() as db:
+            db.execute("CREATE TABLE items (name TEXT PRIMARY KEY)")
+            db.commit()
+
+    def teardown_method(self):
+        self.pool.close()
+        os.close(self.db_fd)
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(self.db_path + suffix):
+                os.unlink(self.db_path + suffix)
+
+    def test_reader_is_reused_per_thread(self):
+        """The same thread gets the same read connection; other threads get their own."""
+        first = self.pool.reader()
+        assert self.pool.reader() is first
+
+        other = []
+        thread = threading.Thread(target=lambda: other.append(self.pool.reader()))
+        thread.start()
+        thread.join()
+
+        assert other[0] is not first
+
+    def test_reader_sees_committed_writes(self):
+        """Readers observe what the writer committed."""
+        reader = self.pool.reader()
+        with self.pool.writer() as db:
+            db.execute("INSERT INTO items (name) VALUES ('a')")
+            db.commit()
+
+        assert [row[0] for row in reader.execute("SELECT name FROM items")] == ['a']
+
+    def test_writer_rolls_back_on_error(self):
+        """An exception inside the writer block discards uncommitted work."""
+        with pytest.raises(RuntimeError):
+            with self.pool.writer() as db:
+                db.execute("INSERT INTO items (name) VALUES ('lost')")
+                raise RuntimeError("boom")
+
+        assert self.pool.reader().execute("SELECT COUNT(*) FROM items").fetchone()[0] == 0
+
+    def test_pragmas_applied(self):
+        """Pooled connections are tuned."""
+        with self.pool.writer() as db:
+            assert db.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+        reader = self.pool.reader()
+        assert reader.execute("PRAGMA temp_store").fetchone()[0] == 2  # MEMORY
+        assert reader.execute("PRAGMA query_only").fetchone()[0] == 1
+
+    def test_reader_is_read_only(self):
+        """Readers are refused writes by SQLite, not just by a prefix check."""
+        with pytest.raises(sqlite3.OperationalError):
+            self.pool.reader().execute("INSERT INTO items (name) VALUES ('x')")
+
+
+class TestQueryExecutor:
+    """Test queries running alongside an open write transaction."""
+
+    def setup_method(self):
+        self.db_fd, self.db_path = tempfile.mkstemp(suffix='.db')
+        self.pool = ConnectionPool(self.db_path)
+        with self.pool.writer() as db:
+            db.execute("CREATE TABLE items (name TEXT PRIMARY KEY)")
+            db.execute("INSERT INTO items (name) VALUES ('committed')")
+            db.commit()
+        registry = QueryRegistry()
+        registry.register('items.count', lambda db, params: db.execute("SELECT COUNT(*) FROM items").fetchone()[0])
+        self.executor = QueryExecutor(self.pool, registry=registry, max_workers=2)
+
+    def teardown_method(self):
+        self.executor.shutdown()
+        self.pool.close()
+        os.close(self.db_fd)
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(self.db_path + suffix):
+                os.unlink(self.db_path + suffix)
+
+    def test_query_runs_while_writer_holds_transaction(self):
+        """Queries see the last committed state without waiting for the writer."""
+        with self.pool.writer() as db:
+            db.execute("INSERT INTO items (name) VALUES ('pending')")
+            assert db.in_transaction
+
+            future = self.executor.submit('items.count')
+            assert future.result(timeout=5) == 1
+
+            db.commit()
+
+        assert self.executor.execute('items.count') == 2
@@ -0,0 +1,74 @@
+"""
+Tests for DeltaApplicator.
+"""
+import sqlite3
+
+from core.deltas import DeltaApplicator
+
+
+class RecordingConnection:
+    """Connection proxy that records which execute calls were made."""
+
+    def __init__(self, conn: sqlite3.Connection) -> None:
+        self.conn = conn
+        self.calls = []
+
+    def execute(self, sql, params=()):
+        self.calls.append(('execute', sql))
+        return self.conn.execute(sql, params)
+
+    def executemany(self, sql, seq):
+        seq = list(seq)
+        self.calls.append(('executemany', sql, len(seq)))
+        return self.conn.executemany(sql, seq)
+
+
+class TestDeltaApplicator:
+    """Test grouped delta application."""
+
+    def setup_method(self):
+        self.conn = sqlite3.connect(':memory:')
+        self.conn.execute("CREATE TABLE messages (message_id TEXT PRIMARY KEY, content TEXT)")
+        self.db = RecordingConnection(self.conn)
+
+    def teardown_method(self):
+        self.conn.close()
+
+    def _insert(self, message_id, content):
+        return {'op': 'insert', 'table': 'messages', 'data': {'message_id': message_id, 'content': content}}
+
+    def test_same_shape_deltas_use_executemany(self):
+        """Consecutive deltas with the same shape are applied in one executemany."""
+        deltas = [self._insert(f'm{i}', 'hi') for i in range(5)]
+
+        DeltaApplicator.apply_many(deltas, self.db)
+
+        assert [call[0] for call in self.db.calls] == ['executemany']
+        assert self.db.calls[0][2] == 5
+        assert self.conn.execute("SELECT COUNT(*) FROM messages").fetchone()[0] == 5
+
+    def test_order_is_preserved_across_shapes(self):
+        """Different shapes split the batch so deltas still apply in order."""
+        deltas = [
+            self._insert('m1', 'first'),
+            {'op': 'update', 'table': 'messages', 'data': {'content': 'edited'}, 'where': {'message_id': 'm1'}},
+            self._insert('m2', 'second'),
+            {'op': 'delete', 'table': 'messages', 'where': {'message_id': 'm2'}},
+        ]
+
+        DeltaApplicator.apply_many(deltas, self.db)
+
+        rows = self.conn.execute("SELECT message_id, content FROM messages").fetchall()
+        assert rows == [('m1', 'edited')]
+        assert len(self.db.calls) == 4
+
+    def test_apply_batch_rolls_back_on_error(self):
+        """apply_batch commits as a unit and rolls back if any delta fails."""
+        deltas = [self._insert('m1', 'hi'), {'op': 'upsert', 'table': 'messages', 'data': {}}]
+
+        try:
+            DeltaApplicator.apply_batch(deltas, self.conn)
+        except ValueError:
+            pass
+
+        assert self.conn.execute("SELECT COUNT(*) FROM messages").fetchone()[0] == 0
@@ -0,0 +1,156 @@
+"""
+Tests for the per-database dependency cache in resolve_deps.
+"""
+import sqlite3
+import time
+from pathlib import Path
+
+import pytest
+
+from core.db import database_instance_id, get_connection, init_database
+from protocols.quiet.handlers import resolve_deps
+from protocols.quiet.handlers.event_store import purge_event
+from protocols.quiet.handlers.resolve_deps import ResolveDepsHandler
+
+protocol_dir = str(Path(__file__).parent.parent.parent)
+
+
+class DependencyDbBase:
+    """An initialized in-memory database with one peer and one channel event."""
+
+    def setup_method(self):
+        resolve_deps.dependency_cache.clear()
+        self.db = get_connection(':memory:')
+        init_database(self.db, protocol_dir)
+        now = int(time.time() * 1000)
+        self.db.execute(
+            "INSERT INTO peers (peer_id, public_key, identity_id, created_at) VALUES (?, ?, ?, ?)",
+            ('peer1', 'aa' * 32, 'ident1', now)
+        )
+        self.db.execute(
+            "INSERT INTO events (event_id, event_type, stored_at, purged) VALUES (?, ?, ?, 0)",
+            ('chan1', 'channel', now)
+        )
+        self.db.commit()
+        self.db.set_trace_callback(self._record)
+        self.selects = []
+
+    def teardown_method(self):
+        self.db.close()
+        resolve_deps.dependency_cache.clear()
+
+    def _record(self, sql):
+        if sql.lstrip().upper().startswith('SELECT') and 'schema_meta' not in sql:
+            self.selects.append(sql)
+
+
+class TestDependencyCache(DependencyDbBase):
+    """fetch_dependency serves repeat lookups from memory."""
+
+    @pytest.mark.unit
+    def test_instance_id_comes_from_schema_meta(self):
+        """Only connections opened by get_connection on an initialized database have an id."""
+        assert database_instance_id(self.db)
+        assert database_instance_id(sqlite3.connect(':memory:')) is None
+
+    @pytest.mark.unit
+    def test_repeat_fetch_is_served_from_memory(self):
+        first = resolve_deps.fetch_dependency('peer1', 'peer', self.db)
+        second = resolve_deps.fetch_dependency('peer1', 'peer', self.db)
+        assert first == second
+        assert first['event_id'] == 'peer1'
+        assert len(self.selects) == 1
+
+    @pytest.mark.unit
+    def test_cached_records_are_copies(self):
+        first = resolve_deps.fetch_dependency('peer1', 'peer', self.db)
+        first['event_plaintext']['public_key'] = 'tampered'
+        second = resolve_deps.fetch_dependency('peer1', 'peer', self.db)
+        assert second['event_plaintext']['public_key'] == 'aa' * 32
+
+    @pytest.mark.unit
+    def test_misses_are_not_cached(self):
+        assert resolve_deps.fetch_dependency('peer2', 'peer', self.db) is None
+        self.db.execute(
+            "INSERT INTO peers (peer_id, public_key, identity_id, created_at) VALUES (?, ?, ?, ?)",
+            ('peer2', 'bb' * 32, 'ident2', 0)
+        )
+        assert resolve_deps.fetch_dependency('peer2', 'peer', self.db)['event_id'] == 'peer2'
+
+    @pytest.mark.unit
+    def test_purge_invalidates(self):
+        assert resolve_deps.fetch_dependency('chan1', 'channel', self.db) is not None
+        assert purge_event('chan1', self.db)
+        assert resolve_deps.fetch_dependency('chan1', 'channel', self.db) is None
+
+    @pytest.mark.unit
+    def test_deltas_invalidate(self):
+        assert resolve_deps.fetch_dependency('peer1', 'peer', self.db) is not None
+        self.db.execute("DELETE FROM peers WHERE peer_id = 'peer1'")
+        resolve_deps.invalidate_for_deltas(
+            self.db, [{'op': 'delete', 'table': 'peers', 'where': {'peer_id': 'peer1'}}]
+        )
+        assert resolve_deps.fetch_dependency('peer1', 'peer', self.db) is None
+
+
+class TestDependencyPrefetch(DependencyDbBase):
+    """prefetch_dependencies loads many refs with one query per dep type."""
+
+    def _add_events(self, count):
+        self.db.set_trace_callback(None)
+        self.db.executemany(
+            "INSERT INTO events (event_id, event_type, stored_at, purged) VALUES (?, 'channel', 0, 0)",
+            [(f'chan{i}',) for i in range(2, count + 2)]
+        )
+        self.db.commit()
+        self.db.set_trace_callback(self._record)
+
+    @pytest.mark.unit
+    def test_one_query_per_dep_type(self):
+        self._add_events(20)
+        refs = [f'channel:chan{i}' for i in range(1, 22)] + ['group:chan3', 'peer:peer1', 'peer:peer1']
+
+        loaded = resolve_deps.prefetch_dependencies(refs, self.db)
+
+        assert loaded == 23
+        # peers, then one events query shared by channel and group refs
+        assert len(self.selects) == 2
+        self.selects.clear()
+        assert resolve_deps.fetch_dependency('chan7', 'channel', self.db)['event_type'] == 'channel'
+        assert resolve_deps.fetch_dependency('peer1', 'peer', self.db)['event_id'] == 'peer1'
+        assert self.selects == []
+
+    @pytest.mark.unit
+    def test_prefetch_matches_single_fetch(self):
+        ident = 'i' * 32
+        self.db.execute(
+            "INSERT INTO peers (peer_id, public_key, identity_id, created_at) VALUES ('peer9', 'cc', ?, 5)",
+            (ident,)
+        )
+        expected = resolve_deps._fetch_dependency(ident, 'peer', self.db)
+
+        resolve_deps.prefetch_dependencies([f'peer:{ident}', 'peer:nope'], self.db)
+
+        assert resolve_deps.dependency_cache.peek(database_instance_id(self.db), ident) == {'peer': expected}
+        assert resolve_deps.dependency_cache.peek(database_instance_id(self.db), 'nope') is None
+
+    @pytest.mark.unit
+    def test_handler_prefetch_collects_generation_deps(self):
+        self._add_events(3)
+        envelopes = [
+            {'event_id': f'm{i}', 'event_type': 'message', 'deps': [f'channel:chan{i}']}
+            for i in range(2, 5)
+        ]
+        envelopes.append({
+            'event_id': 'm9', 'event_type': 'message',
+            'event_plaintext': {'channel_id': 'chan1', 'peer_id': 'peer1'}, 'missing_deps': True,
+        })
+
+        ResolveDepsHandler().prefetch(envelopes, self.db)
+
+        assert len(self.selects) == 2
+        self.selects.clear()
+        for envelope in envelopes[:3]:
+            resolve_deps.resolve_dependencies(envelope, self.db)
+            assert envelope['deps_included_and_valid'] is True
+        assert self.selects == []
@@ -0,0 +1,76 @@
+"""
+Tests for the fixed-size binary event encoding.
+"""
+import pytest
+
+from protocols.quiet.event_codec import (
+    EVENT_SIZE, SIGNATURE_OFFSET, EventTooLargeError, EventView, LAYOUTS,
+    decode_event, encode_event,
+)
+
+
+def _message(**overrides):
+    event = {
+        'type': 'message',
+        'channel_id': 'a1' * 16,
+        'group_id': '',
+        'network_id': 'b2' * 16,
+        'peer_id': 'c3' * 32,
+        'content': 'héllo',
+        'created_at': 1_700_000_000_000,
+    }
+    event.update(overrides)
+    return event
+
+
+class TestEventCodec:
+    """Events encode to 512 bytes with fields at fixed offsets."""
+
+    def test_round_trip(self):
+        """Fields that fit a slot and fields that do not both survive."""
+        event = _message()
+        encoded = encode_event(event)
+
+        assert len(encoded) == EVENT_SIZE
+        assert decode_event(encoded) == event
+
+    def test_fixed_fields_are_read_in_place(self):
+        view = EventView(bytearray(encode_event(_message())))
+        offset = LAYOUTS['message'].slots['channel_id'][0]
+
+        assert view.event_type == 'message'
+        assert view['channel_id'] == 'a1' * 16
+        assert view['created_at'] == 1_700_000_000_000
+        assert view.buffer[offset:offset + 16].tobytes() == bytes.fromhex('a1' * 16)
+        # Empty and over-long ids are not fixed fields
+        assert 'group_id' not in view and 'peer_id' not in view
+        assert view.extras()['peer_id'] == 'c3' * 32
+
+    def test_signature_slot(self):
+        """The signed form differs from the unsigned form only in its signature slot and flag."""
+        unsigned = encode_event(_message())
+        signed = encode_event(_message(signature='ef' * 64))
+        view = EventView(signed)
+
+        assert view.signature == bytes.fromhex('ef' * 64)
+        assert view.signed_bytes == unsigned
+        assert signed[3:SIGNATURE_OFFSET] == unsigned[3:SIGNATURE_OFFSET]
+        assert decode_event(signed)['signature'] == 'ef' * 64
+
+    def test_unknown_types_keep_their_name(self):
+        event = {'type': 'experimental', 'value': 7, 'channel_id': 'a1' * 16}
+
+        assert decode_event(encode_event(event)) == event
+
+    def test_too_large(self):
+        event = _message(content='x' * 600)
+
+        with pytest.raises(EventTooLargeError):
+            encode_event(event)
+
+        overflowed = encode_event(event, allow_overflow=True)
+        assert len(overflowed) == EVENT_SIZE
+        # The digest keeps the tail of the content significant
+        assert overflowed != encode_event(_message(content='x' * 599 + 'y'), allow_overflow=True)
+        with pytest.raises(ValueError):
+            decode_event(overflowed)
@@ -2,8 +2,11 @@
 Tests for crypto handler (event crypto functionality).
 """
 import pytest
+from core import crypto as core_crypto
+from core.crypto import generate_secret
+from protocols.quiet.handlers import crypto as crypto_handler
 from protocols.quiet.handlers.crypto import (
-    filter_func, handler, unseal_key_event, decrypt_event, encrypt_event
+    CryptoHandler, filter_func, handler, unseal_key_event, decrypt_event, encrypt_event
 )
 from protocols.quiet.tests.handlers.test_base import HandlerTestBase
 
@@ -195,3 +198,103 @@ class TestEventCryptoHandler(HandlerTestBase):
         assert 'key_id' in result
         assert 'unsealed_secret' in result
         assert 'group_id' in result
+
+
+class TestEventEncryption(HandlerTestBase):
+    """Events encrypted to a resolved key use XChaCha20-Poly1305."""
+
+    def setup_method(self):
+        super().setup_method()
+        crypto_handler.decrypted_events.clear()
+        self.secret = generate_secret()
+        self.deps = {"key:k1": {"event_type": "key", "unsealed_secret": self.secret}}
+
+    def _encrypted(self, n=0):
+        plaintext = {"type": "message", "channel_id": "a1" * 16, "content": f"hello {n}", "created_at": n}
+        envelope = self.create_envelope(
+            event_type="message", event_plaintext=dict(plaintext),
+            encrypt_to="k1", resolved_deps=self.deps,
+        )
+        encrypt_event(envelope)
+        return plaintext, self.create_envelope(
+            event_id=envelope['event_id'], event_ciphertext=envelope['event_ciphertext'],
+            key_ref=envelope['key_ref'], resolved_deps=self.deps,
+            deps_included_and_valid=True, should_remove=False,
+        )
+
+    def test_round_trip(self):
+        plaintext, received = self._encrypted()
+
+        assert received['key_ref'] == {"kind": "key", "id": "k1"}
+        assert len(received['event_ciphertext']) == 24 + 512 + 16
+        assert handler(received)['event_plaintext'] == plaintext
+        assert received['event_type'] == 'message'
+
+    def test_nonces_differ(self):
+        _, first = self._encrypted()
+        _, second = self._encrypted()
+        assert first['event_ciphertext'] != second['event_ciphertext']
+
+    def test_tampered_ciphertext_is_rejected(self):
+        _, received = self._encrypted()
+        received['event_ciphertext'] = received['event_ciphertext'][:-1] + b'\0'
+
+        result = decrypt_event(received)
+
+        assert 'event_plaintext' not in result
+        assert 'decryption failed' in result['error']
+
+    def test_prefetch_decrypts_shared_key_batch(self, monkeypatch):
+        batch = [self._encrypted(n) for n in range(5)]
+
+        CryptoHandler().prefetch([env for _, env in batch], None)
+        assert len(crypto_handler.decrypted_events) == 5
+
+        monkeypatch.setattr(crypto_handler.crypto, 'decrypt', None)  # must not be needed
+        for plaintext, envelope in batch:
+            assert decrypt_event(envelope)['event_plaintext'] == plaintext
+
+    def test_cipher_objects_are_reused(self):
+        assert core_crypto.cipher(self.secret) is core_crypto.cipher(self.secret)
+        ciphertext, nonce = core_crypto.encrypt(b'x', self.secret)
+        assert core_crypto.decrypt_batch([(ciphertext, nonce), (ciphertext, bytes(24))], self.secret) == [b'x', None]
+
+
+class TestEventDecryptionInRunner:
+    """Received events reach the crypto stage as one batch."""
+
+    @pytest.fixture(autouse=True)
+    def clear_cache(self):
+        crypto_handler.decrypted_events.clear()
+        yield
+        crypto_handler.decrypted_events.clear()
+
+    def test_runner_decrypts_received_events_in_one_batch(self, received_peer_packets, monkeypatch):
+        from pathlib import Path
+        from core.pipeline import PipelineRunner
+
+        db = received_peer_packets["db"]
+        packets = received_peer_packets["packets"]
+        event_secret = received_peer_packets["event_secret"]
+        batches, singles = [], []
+        real_decrypt_batch, real_decrypt = core_crypto.decrypt_batch, core_crypto.decrypt
+
+        def decrypt_batch(items, key, *args, **kwargs):
+            if key == event_secret:
+                batches.append(len(items))
+            return real_decrypt_batch(items, key, *args, **kwargs)
+
+        def decrypt(ciphertext, key, *args, **kwargs):
+            if key == event_secret:
+                singles.append(ciphertext)
+            return real_decrypt(ciphertext, key, *args, **kwargs)
+
+        monkeypatch.setattr(core_crypto, 'decrypt_batch', decrypt_batch)
+        monkeypatch.setattr(core_crypto, 'decrypt', decrypt)
+
+        protocol_dir = str(Path(__file__).resolve().parents[2])
+        PipelineRunner(db_path=':memory:').run(protocol_dir=protocol_dir, input_envelopes=packets, db=db)
+
+        assert batches == [len(packets)]
+        assert singles == []
+        assert db.execute("SELECT COUNT(*) FROM peers").fetchone()[0] == len(packets)
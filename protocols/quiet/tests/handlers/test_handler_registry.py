@@ -0,0 +1,279 @@
+"""
+Tests for HandlerRegistry dispatch.
+"""
+import sqlite3
+from pathlib import Path
+from typing import Any, List
+
+from core import pipeline
+from core.db import get_connection
+from core.handlers import Handler, HandlerRegistry
+
+
+class RecordingHandler(Handler):
+    """Handler that records filter calls and sets a flag when processed."""
+
+    def __init__(self, name: str, keys: tuple, flag: str, sets: str = '') -> None:
+        self._name = name
+        self.envelope_keys = keys
+        self.flag = flag
+        self.sets = sets
+        self.filter_calls = 0
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    def filter(self, envelope: dict[str, Any]) -> bool:
+        self.filter_calls += 1
+        return envelope.get(self.flag) is True and not envelope.get(self._name)
+
+    def process(self, envelope: dict[str, Any], db: sqlite3.Connection) -> List[dict[str, Any]]:
+        envelope[self._name] = True
+        if self.sets:
+            envelope[self.sets] = True
+        return [envelope]
+
+
+class TestHandlerRegistry:
+    """Test indexed dispatch in the handler registry."""
+
+    def test_filter_skipped_without_subscribed_keys(self):
+        """Handlers are not consulted for envelopes lacking their keys."""
+        registry = HandlerRegistry()
+        store = RecordingHandler('store', ('write_to_store',), 'write_to_store')
+        registry.register(store)
+
+        registry.process_envelope({'raw_data': b'x'}, None)
+
+        assert store.filter_calls == 0
+
+    def test_handler_without_keys_sees_every_envelope(self):
+        """Handlers that declare no keys keep the old behavior."""
+        registry = HandlerRegistry()
+        catch_all = RecordingHandler('catch_all', (), 'anything')
+        registry.register(catch_all)
+
+        registry.process_envelope({'raw_data': b'x'}, None)
+
+        assert catch_all.filter_calls == 1
+
+    def test_keys_added_by_earlier_handler_enable_later_handler(self):
+        """A handler becomes a candidate once an earlier one adds its key."""
+        registry = HandlerRegistry()
+        validate = RecordingHandler('validate', ('sig_checked',), 'sig_checked', sets='validated')
+        project = RecordingHandler('project', ('validated',), 'validated')
+        registry.register(validate)
+        registry.register(project)
+
+        envelope = {'sig_checked': True}
+        registry.process_envelope(envelope, None)
+
+        assert envelope.get('validate') is True
+        assert envelope.get('project') is True
+
+    def test_registration_order_is_preserved(self):
+        """Handlers earlier in registration order are not revisited."""
+        registry = HandlerRegistry()
+        project = RecordingHandler('project', ('validated',), 'validated')
+        validate = RecordingHandler('validate', ('sig_checked',), 'sig_checked', sets='validated')
+        registry.register(project)
+        registry.register(validate)
+
+        envelope = {'sig_checked': True}
+        emitted = registry.process_envelope(envelope, None)
+
+        assert envelope.get('validate') is True
+        assert 'project' not in envelope
+        # Re-queued once for the earlier handler that now wants it
+        assert emitted == [envelope]
+
+    def test_register_same_name_replaces_in_place(self):
+        """Re-registering a handler name does not grow the handler list."""
+        registry = HandlerRegistry()
+        first = RecordingHandler('validate', ('sig_checked',), 'sig_checked')
+        project = RecordingHandler('project', ('validated',), 'validated')
+        second = RecordingHandler('validate', ('sig_checked',), 'sig_checked')
+        registry.register(first)
+        registry.register(project)
+        registry.register(second)
+
+        assert registry._handlers == [second, project]
+        assert registry.get_handler('validate') is second
+
+
+class TestStageOrder:
+    """Test declared stage ordering and the re-queue guard."""
+
+    def test_stage_order_overrides_registration_order(self):
+        registry = HandlerRegistry()
+        project = RecordingHandler('project', ('validated',), 'validated')
+        validate = RecordingHandler('validate', ('sig_checked',), 'sig_checked', sets='validated')
+        extra = RecordingHandler('extra', ('x',), 'x')
+        registry.register(extra)
+        registry.register(project)
+        registry.register(validate)
+        registry.set_stage_order(['validate', 'project'])
+
+        assert [h.name for h in registry._handlers] == ['validate', 'project', 'extra']
+
+        envelope = {'sig_checked': True}
+        emitted = registry.process_envelope(envelope, None)
+
+        # Both stages ran in one call and nothing is left to re-queue
+        assert envelope.get('validate') is True and envelope.get('project') is True
+        assert emitted == []
+
+    def test_late_registration_keeps_stage_order(self):
+        registry = HandlerRegistry()
+        registry.set_stage_order(['validate', 'project'])
+        registry.register(RecordingHandler('project', ('validated',), 'validated'))
+        registry.register(RecordingHandler('validate', ('sig_checked',), 'sig_checked'))
+
+        assert [h.name for h in registry._handlers] == ['validate', 'project']
+
+    def test_envelope_emitted_by_several_stages_is_not_requeued(self):
+        registry = HandlerRegistry()
+        registry.register(RecordingHandler('first', ('a',), 'a', sets='b'))
+        registry.register(RecordingHandler('second', ('b',), 'b', sets='c'))
+        registry.register(RecordingHandler('third', ('z',), 'z'))
+        registry.set_stage_order(['third', 'first', 'second'])
+
+        envelope = {'a': True, 'z': False}
+        emitted = registry.process_envelope(envelope, None)
+
+        assert envelope.get('first') and envelope.get('second')
+        assert emitted == []
+
+
+class DroppingHandler(RecordingHandler):
+    """RecordingHandler that drops what it processes."""
+
+    def process(self, envelope: dict[str, Any], db: sqlite3.Connection) -> List[dict[str, Any]]:
+        emitted = super().process(envelope, db)
+        envelope['dropped'] = 'test'
+        return emitted + [{'side_effect': True}]
+
+
+class TestRegistryDrop:
+    """Test that dropped envelopes stop at the dropping handler."""
+
+    def test_dropped_envelope_skips_later_handlers_and_is_not_requeued(self):
+        registry = HandlerRegistry()
+        registry.register(DroppingHandler('dedupe', ('raw',), 'raw', sets='decoded'))
+        later = RecordingHandler('later', ('decoded',), 'decoded')
+        registry.register(later)
+
+        envelope = {'raw': True}
+        emitted = registry.process_envelope(envelope, None)
+
+        assert later.filter_calls == 0
+        assert emitted == [{'side_effect': True}]
+        assert registry.process_envelope(envelope, None) == []
+
+
+class PrefetchingHandler(RecordingHandler):
+    """RecordingHandler that records prefetch calls."""
+
+    def __init__(self, *args: Any, fail: bool = False, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.fail = fail
+        self.prefetched: List[List[dict]] = []
+
+    def prefetch(self, envelopes: List[dict[str, Any]], db: sqlite3.Connection) -> None:
+        self.prefetched.append(list(envelopes))
+        if self.fail:
+            raise RuntimeError("prefetch broke")
+
+
+class TestRegistryPrefetch:
+    """Test the stage-arrival prefetch hook."""
+
+    def test_prefetch_sees_envelopes_reaching_its_stage(self):
+        """Envelopes that gain the handler's keys earlier in the pass join the batch."""
+        registry = HandlerRegistry()
+        handler = PrefetchingHandler('store', ('write_to_store',), 'write_to_store')
+        registry.register(RecordingHandler('decrypt', ('x',), 'x', sets='write_to_store'))
+        registry.register(handler)
+
+        first, other, last = {'x': True}, {'raw_data': b'x'}, {'write_to_store': True}
+        finished = [envelope for envelope, _ in registry.process_generation([first, other, last], None)]
+
+        assert handler.prefetched == [[first, last]]
+        assert first['store'] is True and last['store'] is True
+        assert sorted(map(id, finished)) == sorted(map(id, [first, other, last]))
+
+    def test_prefetch_waits_for_earlier_stages(self):
+        """A batching handler runs only after every earlier one has."""
+        registry = HandlerRegistry()
+        early = PrefetchingHandler('decrypt', ('x',), 'x', sets='write_to_store')
+        late = PrefetchingHandler('store', ('write_to_store',), 'write_to_store')
+        registry.register(early)
+        registry.register(late)
+
+        ahead, behind = {'write_to_store': True}, {'x': True}
+        list(registry.process_generation([ahead, behind], None))
+
+        assert early.prefetched == [[behind]]
+        assert late.prefetched == [[ahead, behind]]
+
+    def test_prefetch_failure_is_not_fatal(self):
+        registry = HandlerRegistry()
+        handler = PrefetchingHandler('store', ('write_to_store',), 'write_to_store', fail=True)
+        registry.register(handler)
+
+        envelope = {'write_to_store': True}
+        list(registry.process_generation([envelope], None))
+        assert handler.prefetched == [[envelope]]
+        assert envelope['store'] is True
+
+    def test_single_envelope_skips_prefetch(self):
+        registry = HandlerRegistry()
+        handler = PrefetchingHandler('store', ('write_to_store',), 'write_to_store')
+        registry.register(handler)
+
+        envelope = {'write_to_store': True}
+        registry.process_envelope(envelope, None)
+        assert handler.prefetched == []
+        assert envelope['store'] is True
+
+
+class TestRunnerLoading:
+    """Test that repeated runs reuse loaded handlers and schema."""
+
+    def test_repeated_runs_load_once(self, monkeypatch):
+        """Handlers register once and the schema initializes once per connection."""
+        protocol_dir = str(Path(__file__).resolve().parents[2])
+        init_calls = []
+        real_init = pipeline.init_database
+
+        def counting_init(db, protocol):
+            init_calls.append(protocol)
+            real_init(db, protocol)
+
+        monkeypatch.setattr(pipeline, 'init_database', counting_init)
+        db = get_connection(':memory:')
+        try:
+            runner = pipeline.PipelineRunner(db_path=':memory:')
+            runner.run(protocol_dir=protocol_dir, input_envelopes=[], db=db)
+            handler_count = len(pipeline.registry._handlers)
+            runner.run(protocol_dir=protocol_dir, input_envelopes=[], db=db)
+        finally:
+            db.close()
+
+        assert len(pipeline.registry._handlers) == handler_count
+        assert len(init_calls) == 1
+
+    def test_protocol_stage_order_is_applied(self):
+        """Loaded handlers run in the order declared by the protocol's STAGES."""
+        from protocols.quiet.stages import STAGES
+        protocol_dir = str(Path(__file__).resolve().parents[2])
+        db = get_connection(':memory:')
+        try:
+            pipeline.PipelineRunner(db_path=':memory:').run(protocol_dir=protocol_dir, input_envelopes=[], db=db)
+        finally:
+            db.close()
+
+        names = [h.name for h in pipeline.registry._handlers if h.name in STAGES]
+        assert names == [name for name in STAGES if name in names]
+        assert names[:3] == ['receive_from_network', 'resolve_deps', 'crypto']
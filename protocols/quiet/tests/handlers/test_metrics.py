@@ -0,0 +1,84 @@
+"""
+Tests for pipeline metrics collection.
+"""
+import sqlite3
+from typing import Any, List
+
+from core.handlers import Handler, HandlerRegistry
+from core.metrics import PipelineMetrics, percentile
+from core.queries import query_registry
+
+
+class FanOutHandler(Handler):
+    """Handler that emits two envelopes for every stored envelope."""
+
+    envelope_keys = ('write_to_store',)
+
+    @property
+    def name(self) -> str:
+        return 'fan_out'
+
+    def filter(self, envelope: dict[str, Any]) -> bool:
+        return envelope.get('write_to_store') is True and not envelope.get('stored')
+
+    def process(self, envelope: dict[str, Any], db: sqlite3.Connection) -> List[dict[str, Any]]:
+        envelope['stored'] = True
+        return [{'outgoing': True}, {'outgoing': True}]
+
+
+class TestPipelineMetrics:
+    """Test metrics recorded by the handler registry."""
+
+    def test_registry_records_calls_hits_and_fan_out(self):
+        """Filter hits, process calls and emitted counts are tracked per handler."""
+        registry = HandlerRegistry()
+        registry.register(FanOutHandler())
+
+        registry.process_envelope({'write_to_store': True}, None)
+        registry.process_envelope({'write_to_store': False}, None)
+
+        stats = registry.metrics.snapshot()['handlers']['fan_out']
+        assert stats['filter_calls'] == 2
+        assert stats['filter_hits'] == 1
+        assert stats['calls'] == 1
+        assert stats['emitted'] == 2
+        assert stats['fan_out'] == 2.0
+        assert stats['p99_ms'] >= stats['p50_ms'] >= 0.0
+
+    def test_queue_depths_are_bounded(self):
+        """Only the most recent queue depths are kept; the maximum is tracked."""
+        metrics = PipelineMetrics()
+        metrics.depth_window = 3
+        metrics.reset()
+        for depth in [5, 50, 1, 2, 3]:
+            metrics.record_queue_depth(depth)
+
+        queue = metrics.snapshot()['queue']
+        assert queue['iterations'] == 5
+        assert queue['max_depth'] == 50
+        assert queue['depths'] == [1, 2, 3]
+
+    def test_gauges_keep_latest_value(self):
+        """Gauges are overwritten, not accumulated, and cleared by reset."""
+        metrics = PipelineMetrics()
+        metrics.set_gauge('blocked_events', {'total': 3})
+        metrics.set_gauge('blocked_events', {'total': 1})
+        assert metrics.snapshot()['gauges'] == {'blocked_events': {'total': 1}}
+        metrics.reset()
+        assert metrics.snapshot()['gauges'] == {}
+
+    def test_percentile(self):
+        """Percentiles use nearest rank over the samples."""
+        samples = [float(i) for i in range(1, 101)]
+        assert percentile(samples, 0.5) == 51.0
+        assert percentile(samples, 0.99) == 99.0
+        assert percentile([], 0.5) == 0.0
+
+    def test_system_metrics_query_is_registered(self):
+        """Metrics are exposed through the system query registry."""
+        db = sqlite3.connect(':memory:')
+        try:
+            result = query_registry.execute('system.metrics', {}, db)
+        finally:
+            db.close()
+        assert set(result) == {'since', 'handlers', 'queue', 'gauges'}
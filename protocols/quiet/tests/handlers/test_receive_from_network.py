@@ -112,4 +112,174 @@ class TestReceiveFromNetworkHandler(HandlerTestBase):
         result = results[0]
         assert result['origin_ip'] == "10.0.0.1"
         assert result['origin_port'] == 9999
-        assert result['received_at'] == 9876543210
\ No newline at end of file
+        assert result['received_at'] == 9876543210
+
+class TestTransitFastPath:
+    """Packets under transit keys held in memory are opened before any SQL."""
+
+    @pytest.fixture(autouse=True)
+    def setup(self, initialized_db):
+        from core.crypto import generate_secret
+        from protocols.quiet import transit
+
+        self.db = initialized_db
+        self.handler = ReceiveFromNetworkHandler()
+        self.transit_key_id = "ab" * 32
+        self.secret = generate_secret()
+        transit.opened_packets.clear()
+        transit.keyring_for(self.db)
+        transit.apply_transit_key_deltas(self.db, [
+            {"op": "insert", "table": "transit_keys",
+             "data": {"transit_key_id": self.transit_key_id, "transit_secret": self.secret,
+                      "network_id": "net1"}},
+        ])
+        self.selects = []
+        self.db.set_trace_callback(
+            lambda sql: self.selects.append(sql) if sql.lstrip().upper().startswith("SELECT") else None)
+        yield
+        self.db.set_trace_callback(None)
+        transit.opened_packets.clear()
+
+    def _packet(self, raw_data):
+        return {"origin_ip": "10.0.0.1", "origin_port": 9999, "received_at": 1000, "raw_data": raw_data}
+
+    def _sealed(self, event_ciphertext=b"event ciphertext"):
+        from protocols.quiet import transit
+
+        payload = {"event_ciphertext": event_ciphertext,
+                   "key_ref": {"kind": "key", "id": "key1"}, "network_id": "net1"}
+        return bytes.fromhex(self.transit_key_id) + transit.seal_payload(self.transit_key_id, self.secret, payload)
+
+    @pytest.mark.unit
+    def test_held_key_is_opened_in_memory(self):
+        results = self.handler.process(self._packet(self._sealed()), self.db)
+
+        assert len(results) == 1
+        result = results[0]
+        assert result["transit_key_id"] == self.transit_key_id
+        assert result["event_ciphertext"] == b"event ciphertext"
+        assert result["key_ref"] == {"kind": "key", "id": "key1"}
+        assert result["deps"] == ["key:key1"]
+        assert "transit_ciphertext" not in result
+        assert not any("transit_keys" in sql for sql in self.selects)
+
+    @pytest.mark.unit
+    def test_unknown_key_is_dropped_without_sql(self):
+        envelope = self._packet(b"\xcd" * 32 + b"x" * 64)
+
+        assert self.handler.process(envelope, self.db) == []
+        assert envelope["dropped"] == "unknown_transit_key"
+        assert self.selects == []
+
+    @pytest.mark.unit
+    def test_tampered_packet_is_dropped_without_sql(self):
+        raw_data = bytearray(self._sealed())
+        raw_data[-1] ^= 1
+        envelope = self._packet(bytes(raw_data))
+
+        assert self.handler.process(envelope, self.db) == []
+        assert envelope["dropped"] == "undecryptable"
+        assert self.selects == []
+
+    @pytest.mark.unit
+    def test_prefetch_opens_a_batch(self):
+        from core import crypto
+        from protocols.quiet import transit
+
+        envelopes = [self._packet(self._sealed(b"event %d" % i)) for i in range(2 * crypto.PARALLEL_VERIFY_MIN)]
+        envelopes.append(self._packet(b"\xcd" * 32 + b"x" * 64))
+
+        self.handler.prefetch(envelopes, self.db)
+
+        assert len(transit.opened_packets) == 2 * crypto.PARALLEL_VERIFY_MIN
+        assert "event_ciphertext" not in envelopes[0]
+        results = self.handler.process(envelopes[3], self.db)
+        assert results[0]["event_ciphertext"] == b"event 3"
+        assert transit.opened_packets.peek(envelopes[3]["raw_data"]) is None
+
+    @pytest.mark.unit
+    def test_retired_key_is_forgotten(self):
+        from protocols.quiet import transit
+
+        transit.apply_transit_key_deltas(self.db, [
+            {"op": "delete", "table": "peer_transit_keys", "where": {"transit_key_id": self.transit_key_id}},
+        ])
+        envelope = self._packet(self._sealed())
+
+        assert self.handler.process(envelope, self.db) == []
+        assert envelope["dropped"] == "unknown_transit_key"
+
+    @pytest.mark.unit
+    def test_encrypt_transit_round_trip(self):
+        from protocols.quiet.handlers.crypto import encrypt_transit
+
+        outgoing = encrypt_transit({
+            "event_ciphertext": b"event ciphertext", "key_ref": {"kind": "key", "id": "key1"},
+            "network_id": "net1", "transit_key_id": self.transit_key_id,
+            "resolved_deps": {f"transit_key:{self.transit_key_id}": {
+                "transit_secret": self.secret, "network_id": "net1"}},
+        })
+        raw_data = bytes.fromhex(outgoing["transit_key_id"]) + outgoing["transit_ciphertext"]
+
+        results = self.handler.process(self._packet(raw_data), self.db)
+
+        assert results[0]["event_ciphertext"] == b"event ciphertext"
+        assert results[0]["network_id"] == "net1"
+
+
+class TestTransitSecretEndToEnd:
+    """A transit secret created through the API opens packets sealed under it."""
+
+    @pytest.fixture(autouse=True)
+    def setup(self, tmp_path):
+        from pathlib import Path
+        from core.api import APIClient
+        from protocols.quiet import transit
+
+        self.protocol_dir = Path(__file__).resolve().parents[2]
+        self.db_path = tmp_path / "transit.db"
+        transit.opened_packets.clear()
+        self.api = APIClient(protocol_dir=self.protocol_dir, reset_db=True, db_path=self.db_path)
+        yield
+        transit.opened_packets.clear()
+
+    def _sealed(self, transit_key_id, secret, network_id):
+        from protocols.quiet import transit
+
+        payload = {"event_ciphertext": b"event ciphertext",
+                   "key_ref": {"kind": "key", "id": "key1"}, "network_id": network_id}
+        raw_data = bytes.fromhex(transit_key_id) + transit.seal_payload(transit_key_id, secret, payload)
+        return {"origin_ip": "10.0.0.1", "origin_port": 9999, "received_at": 1000, "raw_data": raw_data}
+
+    @pytest.mark.integration
+    def test_created_transit_secret_opens_packets(self):
+        from core.api import APIClient
+        from protocols.quiet import transit
+
+        ids = self.api.execute_operation("identity.create_as_user", {"name": "Alice"})["ids"]
+        created = self.api.execute_operation("transit_secret.create_transit_secret", {
+            "network_id": ids["network"], "identity_id": ids["identity"]})
+        transit_key_id = created["data"]["transit_key_id"]
+
+        listed = self.api.execute_operation("transit_secret.list", {"network_id": ids["network"]})
+        assert [row["transit_key_id"] for row in listed] == [transit_key_id]
+        with self.api.pool.writer() as db:
+            secret = db.execute(
+                "SELECT transit_secret FROM transit_keys WHERE transit_key_id = ?", (transit_key_id,)
+            ).fetchone()[0]
+            assert transit.is_real_secret(secret)
+            results = ReceiveFromNetworkHandler().process(self._sealed(transit_key_id, secret, ids["network"]), db)
+
+        assert len(results) == 1
+        assert results[0]["event_ciphertext"] == b"event ciphertext"
+        assert results[0]["network_id"] == ids["network"]
+        assert "transit_ciphertext" not in results[0]
+
+        # A restarted node loads the keyring from the projection
+        transit._keyrings.clear()
+        restarted = APIClient(protocol_dir=self.protocol_dir, reset_db=False, db_path=self.db_path)
+        with restarted.pool.writer() as db:
+            results = ReceiveFromNetworkHandler().process(self._sealed(transit_key_id, secret, ids["network"]), db)
+            assert transit_key_id in transit.keyring_for(db)
+
+        assert results[0]["event_ciphertext"] == b"event ciphertext"
@@ -3,7 +3,8 @@ Tests for remove handler.
 """
 import pytest
 from protocols.quiet.handlers.remove import (
-    filter_func, handler, is_explicitly_deleted, get_removal_context, get_remover
+    filter_func, handler, is_explicitly_deleted, get_removal_context, get_remover,
+    apply_removal_deltas, invalidate_removal_context,
 )
 from protocols.quiet.tests.handlers.test_base import HandlerTestBase
 
@@ -171,4 +172,53 @@ class TestRemoveHandler(HandlerTestBase):
         result = handler(envelope, self.db)
         
         assert result is not None
-        assert result['should_remove'] is False
\ No newline at end of file
+        assert result['should_remove'] is False
+
+class TestRemovalContextCache:
+    """Test the shared, delta-maintained removal context."""
+
+    def setup_method(self):
+        from pathlib import Path
+        from core.db import get_connection, init_database
+        self.db = get_connection(':memory:')
+        init_database(self.db, str(Path(__file__).parent.parent.parent))
+        self.db.execute(
+            "INSERT INTO deleted_events (event_id, deleted_at) VALUES ('gone', 1)"
+        )
+        self.db.commit()
+        self.scans = []
+        self.db.set_trace_callback(
+            lambda sql: self.scans.append(sql)
+            if sql.lstrip().startswith('SELECT') and ('deleted_' in sql or 'removed_' in sql) else None
+        )
+
+    def teardown_method(self):
+        invalidate_removal_context(self.db)
+        self.db.close()
+
+    def test_history_is_loaded_once(self):
+        for _ in range(5):
+            assert is_explicitly_deleted('gone', self.db)
+            assert get_removal_context(self.db)['deleted_messages'] == {'gone'}
+        assert len(self.scans) == 3
+
+    def test_deltas_update_context(self):
+        get_removal_context(self.db)
+        apply_removal_deltas(self.db, [
+            {'op': 'insert', 'table': 'deleted_channels', 'data': {'channel_id': 'c1', 'deleted_at': 2}},
+            {'op': 'delete', 'table': 'deleted_events', 'where': {'event_id': 'gone'}},
+            {'op': 'insert', 'table': 'messages', 'data': {'message_id': 'm1'}},
+        ])
+
+        context = get_removal_context(self.db)
+        assert context['deleted_channels'] == {'c1'}
+        assert not is_explicitly_deleted('gone', self.db)
+        assert len(self.scans) == 3
+
+    def test_untracked_change_reloads(self):
+        get_removal_context(self.db)
+        self.db.execute("DELETE FROM deleted_events")
+        apply_removal_deltas(self.db, [{'op': 'delete', 'table': 'deleted_events', 'where': {}}])
+
+        assert get_removal_context(self.db)['deleted_messages'] == set()
+        assert len(self.scans) == 6
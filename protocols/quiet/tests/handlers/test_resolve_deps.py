@@ -47,10 +47,13 @@ class TestResolveDepsHandler:
     
     @pytest.mark.unit
     @pytest.mark.handler
-    def test_filter_validated_triggers_unblock(self, resolve_filter):
-        """Validated events can trigger unblocking of others."""
+    def test_filter_validated_left_to_unblock_stage(self, resolve_filter):
+        """Validated events release waiters in the unblock stage, not here."""
+        from protocols.quiet.handlers.resolve_deps import UnblockHandler
+
         envelope = {"validated": True, "event_id": "e1"}
-        assert resolve_filter(envelope) is True
+        assert resolve_filter(envelope) is False
+        assert UnblockHandler().filter(envelope) is True
     
     @pytest.mark.unit
     @pytest.mark.handler
@@ -0,0 +1,85 @@
+"""
+Tests for fingerprinted schema initialization.
+"""
+import os
+import shutil
+import sqlite3
+import tempfile
+
+from core import db as core_db
+
+
+class TestSchemaInit:
+    """Test that init_database only applies new or changed schema files."""
+
+    def setup_method(self):
+        self.protocol_dir = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.protocol_dir, 'events', 'note'))
+        os.makedirs(os.path.join(self.protocol_dir, 'handlers'))
+        self.note_sql = os.path.join(self.protocol_dir, 'events', 'note', 'note.sql')
+        self.store_sql = os.path.join(self.protocol_dir, 'handlers', 'store.sql')
+        self._write(self.note_sql, "CREATE TABLE IF NOT EXISTS notes (id TEXT PRIMARY KEY);")
+        self._write(self.store_sql, "CREATE TABLE IF NOT EXISTS store (id TEXT PRIMARY KEY);")
+        self.conn = sqlite3.connect(':memory:')
+
+    def teardown_method(self):
+        self.conn.close()
+        shutil.rmtree(self.protocol_dir)
+
+    def _write(self, path, sql):
+        with open(path, 'w') as f:
+            f.write(sql)
+        # Make sure the stat-based hash cache sees the change
+        st = os.stat(path)
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+
+    def _count_loads(self, monkeypatch):
+        loaded = []
+        real_load = core_db._load_schema_file
+
+        def counting_load(path, conn):
+            loaded.append(path)
+            real_load(path, conn)
+
+        monkeypatch.setattr(core_db, '_load_schema_file', counting_load)
+        return loaded
+
+    def test_unchanged_schema_is_skipped(self, monkeypatch):
+        """A second init with the same files applies nothing."""
+        core_db.init_database(self.conn, self.protocol_dir)
+        loaded = self._count_loads(monkeypatch)
+
+        core_db.init_database(self.conn, self.protocol_dir)
+
+        assert loaded == []
+
+    def test_only_changed_files_are_applied(self, monkeypatch):
+        """Changing one file re-applies just that file."""
+        core_db.init_database(self.conn, self.protocol_dir)
+        loaded = self._count_loads(monkeypatch)
+
+        self._write(self.note_sql, "CREATE TABLE IF NOT EXISTS notes (id TEXT PRIMARY KEY);\n"
+                                   "CREATE TABLE IF NOT EXISTS note_tags (tag TEXT);")
+        core_db.init_database(self.conn, self.protocol_dir)
+
+        assert loaded == [self.note_sql]
+        tables = {row[0] for row in self.conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+        assert {'notes', 'note_tags', 'store', 'schema_meta'} <= tables
+
+    def test_new_columns_are_added_to_existing_tables(self):
+        """A column added to a changed file reaches tables created before it."""
+        core_db.init_database(self.conn, self.protocol_dir)
+        self.conn.execute("INSERT INTO notes (id) VALUES ('n1')")
+
+        self._write(self.note_sql, "CREATE TABLE IF NOT EXISTS notes (\n"
+                                   "    id TEXT PRIMARY KEY,\n"
+                                   "    -- Owning network\n"
+                                   "    network_id TEXT NOT NULL DEFAULT '',\n"
+                                   "    UNIQUE(id, network_id)\n"
+                                   ");\n"
+                                   "CREATE INDEX IF NOT EXISTS idx_notes_network ON notes(network_id);")
+        core_db.init_database(self.conn, self.protocol_dir)
+
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(notes)")]
+        assert columns == ['id', 'network_id']
+        assert self.conn.execute("SELECT network_id FROM notes").fetchone() == ('',)
@@ -0,0 +1,99 @@
+"""
+Tests for the pipeline tracer.
+"""
+from core.pipeline import PipelineRunner
+from core.tracing import DEBUG, ERROR, INFO, WARNING, RingBufferSink, Tracer, tracer
+
+
+class Unprintable:
+    """Object that fails the test if it is ever formatted."""
+
+    def __str__(self) -> str:
+        raise AssertionError("formatted while tracing was disabled")
+
+
+class TestTracer:
+    """Test level gating, watches and sampling."""
+
+    def setup_method(self):
+        self.sink = RingBufferSink(capacity=10)
+        self.tracer = Tracer(level=WARNING, sinks=[self.sink])
+
+    def test_disabled_level_does_not_format_arguments(self):
+        """Arguments are only formatted when the record is emitted."""
+        self.tracer.debug('project', "Applying delta: %s", Unprintable())
+
+        assert self.sink.records() == []
+
+    def test_enabled_level_formats_message(self):
+        """Records at or above the level reach the sinks."""
+        self.tracer.error('job', "Job %s failed: %s", 'sync', 'boom')
+
+        records = self.sink.records()
+        assert len(records) == 1
+        assert records[0].level == ERROR
+        assert records[0].message == "Job sync failed: boom"
+
+    def test_watched_event_bypasses_level(self):
+        """Everything about a watched event_id is traced."""
+        self.tracer.watch('abc')
+
+        self.tracer.debug('validate', "checking", envelope={'event_id': 'abc'})
+        self.tracer.debug('validate', "checking", envelope={'event_id': 'other'})
+
+        records = self.sink.records()
+        assert len(records) == 1
+        assert self.sink.records(event_id='abc') == records
+
+    def test_sampling_keeps_one_in_n(self):
+        """Sampled sources emit only every Nth record."""
+        self.tracer.set_level(DEBUG)
+        self.tracer.sample('registry', 3)
+
+        for i in range(7):
+            self.tracer.info('registry', "record %d", i)
+
+        assert [r.message for r in self.sink.records()] == ["record 0", "record 3", "record 6"]
+
+    def test_ring_buffer_keeps_most_recent(self):
+        """The ring buffer drops the oldest records first."""
+        self.tracer.set_level(INFO)
+        for i in range(15):
+            self.tracer.info('pipeline', "record %d", i)
+
+        records = self.sink.records()
+        assert len(records) == 10
+        assert records[0].message == "record 5"
+
+
+class TestRunnerVerbosity:
+    """Verbose logging belongs to one runner, not to the global tracer."""
+
+    def setup_method(self):
+        self.sink = RingBufferSink(capacity=10)
+        self.level = tracer.level
+        tracer.add_sink(self.sink)
+
+    def teardown_method(self):
+        tracer.remove_sink(self.sink)
+        tracer.set_level(self.level)
+
+    def test_verbose_runner_leaves_global_level_alone(self):
+        """Creating a verbose runner does not turn on tracing for everyone else."""
+        tracer.set_level(WARNING)
+
+        PipelineRunner(db_path=':memory:', verbose=True)
+
+        assert tracer.level == WARNING
+
+    def test_only_the_verbose_runner_logs_envelopes(self):
+        """A verbose runner's envelope logs are emitted whatever the level."""
+        tracer.set_level(WARNING)
+        envelope = {'event_id': 'abc', 'event_type': 'message'}
+
+        PipelineRunner(db_path=':memory:', verbose=False).log_envelope("CONSUMED", 'validate', envelope)
+        PipelineRunner(db_path=':memory:', verbose=True).log_envelope("CONSUMED", 'validate', envelope)
+
+        records = self.sink.records()
+        assert len(records) == 1
+        assert records[0].message.startswith("CONSUMED by validate:")
@@ -163,4 +163,31 @@ class TestTransitCryptoHandler(HandlerTestBase):
         assert 'key_ref' not in result
         assert 'event_id' not in result
         assert 'event_plaintext' not in result
-        assert 'network_id' not in result
\ No newline at end of file
+        assert 'network_id' not in result
+
+    def _incoming(self):
+        return self.create_envelope(
+            deps_included_and_valid=True,
+            transit_key_id="test_transit_key",
+            transit_ciphertext=b"encrypted_data",
+            resolved_deps={
+                "transit_key:test_transit_key": {
+                    "transit_secret": b"test_transit_secret",
+                    "network_id": "test_network"
+                }
+            }
+        )
+
+    def test_known_event_dropped_after_transit_decrypt(self):
+        """Re-delivered events stop before the event layer is touched."""
+        seen = []
+        result = handler(self._incoming(), lambda event_id: seen.append(event_id) or True)
+
+        assert result['dropped'] == 'duplicate'
+        assert seen == [result['event_id']]
+        assert 'event_plaintext' not in result
+
+    def test_new_event_continues(self):
+        result = handler(self._incoming(), lambda event_id: False)
+        assert 'dropped' not in result
+        assert result['event_plaintext']
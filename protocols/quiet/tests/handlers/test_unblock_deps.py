@@ -4,7 +4,12 @@ Tests for unblock_deps handler.
 import pytest
 import json
 import time
-from protocols.quiet.handlers.resolve_deps import filter_func, handler
+from core.pipeline import PipelineRunner
+from core.handlers import registry
+from protocols.quiet.handlers.job import JobHandler
+from protocols.quiet.handlers.resolve_deps import (
+    UnblockHandler, blocked_events_job, blocked_queue_stats, compact_blocked_events, filter_func, handler,
+)
 from protocols.quiet.tests.handlers.test_base import HandlerTestBase
 
 
@@ -12,12 +17,13 @@ class TestUnblockDepsHandler(HandlerTestBase):
     """Test the unblock_deps handler."""
     
     def test_filter_accepts_validated(self):
-        """Test filter accepts newly validated events."""
+        """Test the unblock stage, not resolve_deps, takes newly validated events."""
         envelope = self.create_envelope(
             validated=True,
             event_id="validated_event"
         )
-        assert filter_func(envelope) is True
+        assert UnblockHandler().filter(envelope) is True
+        assert filter_func(envelope) is False
     
     def test_filter_accepts_missing_deps(self):
         """Test filter accepts events with missing dependencies."""
@@ -112,7 +118,7 @@ class TestUnblockDepsHandler(HandlerTestBase):
             event_id="dep2"
         )
         
-        results = handler(envelope, self.db)
+        results = UnblockHandler().process(envelope, self.db)
         # Should return the unblocked envelope only
         assert len(results) == 1
         unblocked = results[0]
@@ -164,7 +170,7 @@ class TestUnblockDepsHandler(HandlerTestBase):
             event_id="dep1"
         )
         
-        results = handler(envelope, self.db)
+        results = UnblockHandler().process(envelope, self.db)
         
         # Should NOT unblock (dep2 still missing) and no emission from handler
         assert len(results) == 0
@@ -212,7 +218,7 @@ class TestUnblockDepsHandler(HandlerTestBase):
             event_id="dep1"
         )
         
-        results = handler(envelope, self.db)
+        results = UnblockHandler().process(envelope, self.db)
         
         # Should NOT unblock (exceeded retry limit) and no emission
         assert len(results) == 0
@@ -283,3 +289,228 @@ class TestUnblockDepsHandler(HandlerTestBase):
         deps = [row['dep_id'] for row in cursor]
         # Blocked dep ids are stored without prefixes in current schema
         assert deps == ["123", "456"]
+
+    def test_blocked_envelope_with_bytes_round_trips(self):
+        """Envelopes carrying bytes can be blocked and come back intact."""
+        envelope = self.create_envelope(
+            missing_deps=True,
+            event_id="bytes_event",
+            event_type="message",
+            event_ciphertext=b"\x00\x01ciphertext",
+            missing_deps_list=["channel:late_channel"],
+            retry_count=0
+        )
+        handler(envelope, self.db)
+
+        self.db.execute("""
+            INSERT INTO events (event_id, event_type, stored_at, validated)
+            VALUES (?, ?, ?, ?)
+        """, ("late_channel", "channel", 1000, True))
+        self.db.commit()
+
+        results = UnblockHandler().process(self.create_envelope(validated=True, event_id="late_channel"), self.db)
+
+        assert len(results) == 1
+        assert results[0]['event_id'] == "bytes_event"
+        assert results[0]['event_ciphertext'] == b"\x00\x01ciphertext"
+        assert results[0]['unblocked'] is True
+
+    def test_unblock_many_waiters_with_constant_queries(self):
+        """Releasing many waiters does not issue a query per dependency."""
+        for i in range(50):
+            handler(self.create_envelope(
+                missing_deps=True,
+                event_id=f"waiter_{i}",
+                missing_deps_list=["channel:shared_channel", "peer:test_event_id"],
+                retry_count=0
+            ), self.db)
+        handler(self.create_envelope(
+            missing_deps=True,
+            event_id="still_waiting",
+            missing_deps_list=["channel:shared_channel", "peer:absent_peer"],
+            retry_count=0
+        ), self.db)
+
+        self.db.execute("""
+            INSERT INTO events (event_id, event_type, stored_at, validated)
+            VALUES (?, ?, ?, ?)
+        """, ("shared_channel", "channel", 1000, True))
+        self.db.commit()
+
+        statements = []
+        self.db.set_trace_callback(statements.append)
+        try:
+            results = UnblockHandler().process(self.create_envelope(validated=True, event_id="shared_channel"), self.db)
+        finally:
+            self.db.set_trace_callback(None)
+
+        assert sorted(r['event_id'] for r in results) == sorted(f"waiter_{i}" for i in range(50))
+        # Waiters, their missing deps, their envelopes, and the next level's waiters
+        assert len([s for s in statements if s.lstrip().upper().startswith('SELECT')]) == 4
+        remaining = self.db.execute("SELECT event_id FROM blocked_events").fetchall()
+        assert [row['event_id'] for row in remaining] == ["still_waiting"]
+
+    def test_unblock_releases_transitive_chain_in_order(self):
+        """Waiters on waiters are released in the same pass, parents first."""
+        handler(self.create_envelope(
+            missing_deps=True, event_id="message_1",
+            missing_deps_list=["channel:root_channel"], retry_count=0
+        ), self.db)
+        handler(self.create_envelope(
+            missing_deps=True, event_id="reply_1",
+            missing_deps_list=["message:message_1", "channel:root_channel"], retry_count=0
+        ), self.db)
+        handler(self.create_envelope(
+            missing_deps=True, event_id="reaction_1",
+            missing_deps_list=["message:reply_1"], retry_count=0
+        ), self.db)
+
+        self.db.execute("""
+            INSERT INTO events (event_id, event_type, stored_at, validated)
+            VALUES (?, ?, ?, ?)
+        """, ("root_channel", "channel", 1000, True))
+        self.db.commit()
+
+        results = UnblockHandler().process(self.create_envelope(validated=True, event_id="root_channel"), self.db)
+
+        assert [r['event_id'] for r in results] == ["message_1", "reply_1", "reaction_1"]
+        assert '_after' not in results[0]
+        assert results[1]['_after'] == ["message_1"]
+        assert results[2]['_after'] == ["reply_1"]
+        assert self.db.execute("SELECT COUNT(*) FROM blocked_events").fetchone()[0] == 0
+
+
+class TestUnblockCascadeParking:
+    """Test how the runner holds cascade children until parents validate."""
+
+    def test_children_wait_for_all_parents(self):
+        """A child with two released parents runs only after both validate."""
+        parked = {}
+        child = {'event_id': 'reaction', '_after': ['message', 'reply']}
+        ready = PipelineRunner._hold_until_parents([{'event_id': 'message'}, child], parked, set())
+
+        assert [e['event_id'] for e in ready] == ['message']
+        assert PipelineRunner._release_children('message', parked) == []
+        released = PipelineRunner._release_children('reply', parked)
+        assert released == [child]
+        assert '_after' not in child
+
+    def test_already_validated_parent_does_not_park(self):
+        """Parents validated earlier in the run do not hold the child."""
+        parked = {}
+        child = {'event_id': 'reply', '_after': ['message']}
+
+        ready = PipelineRunner._hold_until_parents([child], parked, {'message'})
+
+        assert ready == [child]
+        assert parked == {}
+
+    def test_release_all_returns_each_child_once(self):
+        """Draining parked children yields each envelope once."""
+        parked = {}
+        child = {'event_id': 'reaction', '_after': ['message', 'reply']}
+        PipelineRunner._hold_until_parents([child], parked, set())
+
+        assert PipelineRunner._release_all(parked) == [child]
+        assert parked == {}
+
+
+class TestBlockedQueueCompaction(HandlerTestBase):
+    """Test TTL and quota eviction of blocked events."""
+
+    def _block(self, event_id, created_at, network_id='net1', deps=('channel:c1',)):
+        self.db.execute("""
+            INSERT INTO blocked_events (event_id, envelope_json, created_at, missing_deps, retry_count, network_id)
+            VALUES (?, '{}', ?, ?, 0, ?)
+        """, (event_id, created_at, json.dumps(list(deps)), network_id))
+        self.db.executemany(
+            "INSERT INTO blocked_event_deps (event_id, dep_id) VALUES (?, ?)",
+            [(event_id, dep.split(':')[-1]) for dep in deps]
+        )
+
+    def _blocked_ids(self):
+        return {row[0] for row in self.db.execute("SELECT event_id FROM blocked_events")}
+
+    def test_block_records_network(self):
+        """Blocked events remember the network they arrived on."""
+        envelope = self.create_envelope(
+            event_id="e1", missing_deps=True, missing_deps_list=["channel:c1"], network_id="net9"
+        )
+        handler(envelope, self.db)
+        row = self.db.execute("SELECT network_id FROM blocked_events WHERE event_id = 'e1'").fetchone()
+        assert row[0] == "net9"
+
+    def test_expired_events_are_evicted(self):
+        """Events older than the TTL go, along with their dep rows."""
+        self._block('old', 1_000)
+        self._block('new', 9_000)
+
+        evicted = compact_blocked_events(self.db, now_ms=10_000, ttl_ms=5_000)
+
+        assert evicted == {'expired': 1, 'over_quota': 0}
+        assert self._blocked_ids() == {'new'}
+        assert self.db.execute(
+            "SELECT COUNT(*) FROM blocked_event_deps WHERE event_id = 'old'"
+        ).fetchone()[0] == 0
+
+    def test_quota_evicts_oldest_per_network(self):
+        """Each network keeps only its newest events up to the quota."""
+        for i in range(4):
+            self._block(f'a{i}', 1_000 + i, network_id='netA')
+        self._block('b0', 500, network_id='netB')
+
+        evicted = compact_blocked_events(self.db, now_ms=2_000, ttl_ms=10_000, per_network_quota=2)
+
+        assert evicted == {'expired': 0, 'over_quota': 2}
+        assert self._blocked_ids() == {'a2', 'a3', 'b0'}
+
+    def test_stats_by_missing_dep_type(self):
+        self._block('e1', 1, deps=('channel:c1', 'peer:p1'))
+        self._block('e2', 1, deps=('channel:c2', 'raw'))
+
+        stats = blocked_queue_stats(self.db)
+
+        assert stats == {'total': 2, 'by_dep_type': {'channel': 2, 'peer': 1, 'event': 1}}
+
+    def test_job_publishes_gauge_and_uses_state_overrides(self):
+        self._block('old', 1_000)
+        self._block('new', 9_000)
+
+        success, state, emitted = blocked_events_job({'ttl_ms': 5_000}, self.db, 10_000)
+
+        assert success and emitted == []
+        assert state['ttl_ms'] == 5_000
+        assert state['last_evicted'] == {'expired': 1, 'over_quota': 0}
+        assert registry.metrics.gauges['blocked_events']['total'] == 1
+
+    def test_job_handler_loads_handler_jobs(self):
+        assert JobHandler().jobs['blocked_events'] is blocked_events_job
+
+
+def test_scheduler_tick_evicts_expired_blocked_events(tmp_path):
+    """The blocked_events job is scheduled, and a tick runs it through the pipeline."""
+    from pathlib import Path
+    from core.api import APIClient
+    from core.jobs import JOB_PREFIX
+
+    api = APIClient(protocol_dir=Path('protocols/quiet'), reset_db=True, db_path=tmp_path / 'node.db')
+    try:
+        assert api.scheduler.job_configs[JOB_PREFIX + 'blocked_events'] > 0
+        with api.pool.writer() as db:
+            db.execute("""
+                INSERT INTO blocked_events (event_id, envelope_json, created_at, missing_deps, retry_count, network_id)
+                VALUES ('stale', '{}', 1000, '["channel:c1"]', 0, 'net1')
+            """)
+            db.execute("INSERT INTO blocked_event_deps (event_id, dep_id) VALUES ('stale', 'c1')")
+            db.commit()
+
+        assert api.tick_scheduler() >= 1
+
+        with api.pool.writer() as db:
+            assert db.execute("SELECT COUNT(*) FROM blocked_events").fetchone()[0] == 0
+            assert db.execute("SELECT COUNT(*) FROM blocked_event_deps").fetchone()[0] == 0
+            assert db.execute(
+                "SELECT success_count FROM job_runs WHERE job_name = 'blocked_events'"
+            ).fetchone()[0] == 1
+    finally:
+        api.close()
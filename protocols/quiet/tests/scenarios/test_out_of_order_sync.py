@@ -20,6 +20,7 @@ import json
 from core.api import APIClient
 from core.db import get_connection
 from core.crypto import sign
+from protocols.quiet.event_codec import encode_event
 from protocols.quiet.handlers.signature import canonicalize_event
 
 
@@ -28,8 +29,8 @@ def blake2_16_hex(data: bytes) -> str:
 
 
 def enc_ciphertext_for_plaintext(pt: Dict[str, Any]) -> bytes:
-    # Matches stub in protocols/quiet/handlers/crypto.encrypt_event
-    return f"encrypted:{str(pt)}".encode()
+    # Matches the keyless encoding in protocols/quiet/handlers/crypto.encrypt_event
+    return b"encrypted:" + encode_event(pt)
 
 
 def sign_plaintext(pt: Dict[str, Any], priv_hex: str | bytes) -> str:
@@ -168,6 +169,9 @@ def test_out_of_order_delivery_with_tick():
             alice_db2.close()
         peer_pt_fields[0] = ('public_key', alice_pub)
         peer_env = build_env('peer', peer_pt_fields, alice_priv)
+        # Deps as the create flows declare them. Without explicit deps a peer
+        # is held for its identity, which is local to Alice and never synced.
+        peer_env['deps'] = []
 
         # 2) Message (arrives first, before channel) - do NOT preset validation/deps
         msg_pt_fields = [
@@ -181,6 +185,7 @@ def test_out_of_order_delivery_with_tick():
         msg_env = build_env('message', msg_pt_fields, alice_priv,
                             preset_sig=True, preset_cipher_id=True,
                             preset_validated=False, preset_deps_valid=False)
+        msg_env['deps'] = [f'channel:{msg_channel}', f'peer:{msg_author}']
 
         # 3) Channel (arrives later, triggers unblocking)
         # Order must match flows: group_id, name, network_id, creator_id, created_at
@@ -192,6 +197,12 @@ def test_out_of_order_delivery_with_tick():
             ('created_at', ch_created_at),
         ]
         ch_env = build_env('channel', ch_pt_fields, alice_priv)
+        # Arrives already validated; Bob holds no copy of the group it names
+        ch_env['deps'] = []
+
+        # Received events are stored, as the transit layer marks them
+        for env in (peer_env, msg_env, ch_env):
+            env['write_to_store'] = True
 
         # Inject into Bob in out-of-order sequence: peer -> message -> tick -> channel
         # Use runner directly with Bob's DB connection
@@ -227,3 +238,59 @@ def test_out_of_order_delivery_with_tick():
 
         finally:
             bob_db.close()
+
+
+def test_parent_validated_in_pipeline_unblocks_child():
+    """A blocked event is projected once its parent is validated by the pipeline itself."""
+    with tempfile.NamedTemporaryFile(suffix='.db') as tmp:
+        api = APIClient(protocol_dir=Path('protocols/quiet'), reset_db=True, db_path=Path(tmp.name))
+        ids = api.execute_operation('identity.create_as_user', {
+            'name': 'Alice',
+            'network_name': 'Net A',
+            'group_name': 'Main',
+            'channel_name': 'general',
+        })['ids']
+
+        db = get_connection(str(tmp.name))
+        try:
+            priv = db.execute(
+                "SELECT private_key FROM identities WHERE identity_id = ?", (ids['identity'],)
+            ).fetchone()['private_key']
+
+            channel_env = build_env('channel', [
+                ('group_id', ids['group']),
+                ('name', 'later'),
+                ('network_id', ids['network']),
+                ('creator_id', ids['peer']),
+                ('created_at', 1_700_000_000_000),
+                # Names the signer for verification
+                ('peer_id', ids['peer']),
+            ], priv, preset_validated=False, preset_deps_valid=False)
+            channel_env['deps'] = [f"group:{ids['group']}", f"peer:{ids['peer']}"]
+            message_env = build_env('message', [
+                ('channel_id', channel_env['event_id']),
+                ('group_id', ids['group']),
+                ('network_id', ids['network']),
+                ('peer_id', ids['peer']),
+                ('content', 'arrived first'),
+                ('created_at', 1_700_000_000_001),
+            ], priv, preset_validated=False, preset_deps_valid=False)
+            # Deps as the create flows declare them
+            message_env['deps'] = [f"channel:{channel_env['event_id']}", f"peer:{ids['peer']}"]
+            # As left by event decryption
+            channel_env['write_to_store'] = message_env['write_to_store'] = True
+
+            api.runner.run(protocol_dir=str(api.protocol_dir), input_envelopes=[message_env], db=db)
+            assert db.execute(
+                "SELECT COUNT(*) FROM blocked_events WHERE event_id = ?", (message_env['event_id'],)
+            ).fetchone()[0] == 1
+
+            api.runner.run(protocol_dir=str(api.protocol_dir), input_envelopes=[channel_env], db=db)
+
+            row = db.execute(
+                "SELECT content FROM messages WHERE message_id = ?", (message_env['event_id'],)
+            ).fetchone()
+            assert row is not None and row['content'] == 'arrived first'
+            assert db.execute("SELECT COUNT(*) FROM blocked_events").fetchone()[0] == 0
+        finally:
+            db.close()
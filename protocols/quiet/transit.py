@@ -0,0 +1,234 @@
+"""
+In-memory transit layer.
+
+A packet is ``transit_key_id (32 bytes) || nonce (24) || ciphertext`` where
+the ciphertext is XChaCha20-Poly1305 under the transit secret, with the key
+id as associated data. The plaintext is a dict of event_ciphertext, key_ref
+and network_id, encoded with the protocol's envelope codec.
+
+Active transit secrets are held per database in a TransitKeyring. It is
+loaded once from the transit_secret projection (transit_keys joined with
+peer_transit_keys) and then kept current from projection deltas
+(apply_transit_key_deltas), so opening a packet costs no SQL. Packets for
+keys we do not hold, or that fail authentication, are dropped before they
+reach the pipeline: traffic from strangers never touches the database.
+"""
+import hashlib
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from core import crypto
+from core.cache import LRUCache
+from core.db import database_instance_id
+from protocols.quiet.envelope_keys import codec
+
+TRANSIT_KEY_ID_SIZE = 32
+
+# Packets opened ahead of ReceiveFromNetworkHandler.process(), by raw_data
+opened_packets = LRUCache(4096)
+
+
+class TransitKeyring:
+    """Transit secrets of one database, by hex transit_key_id."""
+
+    def __init__(self) -> None:
+        self._keys: Dict[str, Tuple[bytes, Any]] = {}
+        self._lock = threading.Lock()
+
+    def load(self, db: sqlite3.Connection) -> None:
+        try:
+            # Our own secrets, as long as the transit_secret event that
+            # published their key id is still projected
+            rows = db.execute(
+                """
+                SELECT tk.transit_key_id, tk.transit_secret, tk.network_id
+                FROM transit_keys tk
+                JOIN peer_transit_keys ptk ON ptk.transit_key_id = tk.transit_key_id
+                """
+            ).fetchall()
+        except sqlite3.OperationalError:
+            # Databases created before transit_keys had a schema
+            rows = []
+        with self._lock:
+            self._keys = {}
+            for key_id, secret, network_id in rows:
+                if secret:
+                    self._keys[key_id] = (_secret_bytes(secret), network_id)
+
+    def add(self, transit_key_id: str, secret: Any, network_id: Any = None) -> None:
+        with self._lock:
+            self._keys[transit_key_id] = (_secret_bytes(secret), network_id)
+
+    def remove(self, transit_key_id: str) -> None:
+        with self._lock:
+            self._keys.pop(transit_key_id, None)
+
+    def get(self, transit_key_id: str) -> Optional[Tuple[bytes, Any]]:
+        """Return (secret, network_id), or None for keys we do not hold."""
+        return self._keys.get(transit_key_id)
+
+    def __contains__(self, transit_key_id: str) -> bool:
+        return transit_key_id in self._keys
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+
+_keyrings: Dict[str, TransitKeyring] = {}
+_keyrings_lock = threading.Lock()
+
+
+def _secret_bytes(secret: Any) -> bytes:
+    if isinstance(secret, str):
+        try:
+            return bytes.fromhex(secret)
+        except ValueError:
+            return secret.encode()
+    return bytes(secret)
+
+
+def is_real_secret(secret: Any) -> bool:
+    """Whether a transit secret can key XChaCha20-Poly1305 (older stubs cannot)."""
+    return isinstance(secret, (bytes, bytearray)) and len(secret) == crypto.SECRET_KEY_SIZE
+
+
+def keyring_for(db: sqlite3.Connection) -> Optional[TransitKeyring]:
+    """The database's keyring, loaded on first use; None for unscoped connections."""
+    scope = database_instance_id(db)
+    if scope is None:
+        return None
+    with _keyrings_lock:
+        keyring = _keyrings.get(scope)
+        if keyring is None:
+            keyring = TransitKeyring()
+            keyring.load(db)
+            _keyrings[scope] = keyring
+        return keyring
+
+
+def apply_transit_key_deltas(db: sqlite3.Connection, deltas: List[Dict[str, Any]]) -> None:
+    """Keep a loaded keyring in line with committed projection deltas.
+
+    New transit_keys rows are added. Deleting a transit_keys or
+    peer_transit_keys row retires its key; a change that does not name the
+    key id makes the keyring reload on next use.
+    """
+    scope = database_instance_id(db)
+    if scope is None:
+        return
+    keyring = _keyrings.get(scope)
+    if keyring is None:
+        return
+    for delta in deltas:
+        table = delta.get('table')
+        if table not in ('transit_keys', 'peer_transit_keys'):
+            continue
+        data = delta.get('data') or {}
+        if delta.get('op') == 'insert':
+            if table == 'transit_keys' and data.get('transit_key_id') and data.get('transit_secret'):
+                keyring.add(data['transit_key_id'], data['transit_secret'], data.get('network_id'))
+            continue
+        key_id = (delta.get('where') or {}).get('transit_key_id') or data.get('transit_key_id')
+        if key_id is None:
+            with _keyrings_lock:
+                _keyrings.pop(scope, None)
+            return
+        keyring.remove(key_id)
+
+
+def seal_payload(transit_key_id: str, secret: bytes, payload: Dict[str, Any]) -> bytes:
+    """Encrypt a transit payload; returns nonce || ciphertext (no key id)."""
+    key_id = bytes.fromhex(transit_key_id)
+    ciphertext, nonce = crypto.encrypt(codec.encode(payload), secret, aad=key_id)
+    return nonce + ciphertext
+
+
+def open_payload(raw_data: bytes, secret: bytes) -> Optional[Dict[str, Any]]:
+    """Decrypt a whole packet (key id included); None if it does not authenticate."""
+    key_id = raw_data[:TRANSIT_KEY_ID_SIZE]
+    body = raw_data[TRANSIT_KEY_ID_SIZE:]
+    try:
+        plaintext = crypto.decrypt(body[crypto.NONCE_SIZE:], secret, body[:crypto.NONCE_SIZE], aad=key_id)
+        payload = codec.decode(plaintext)
+    except Exception:
+        return None
+    return payload if isinstance(payload, dict) else None
+
+
+def _open_group(secret: bytes, packets: List[bytes]) -> List[Optional[Dict[str, Any]]]:
+    return [open_payload(raw_data, secret) for raw_data in packets]
+
+
+def open_packets(packets: List[bytes], keyring: TransitKeyring) -> List[Optional[Dict[str, Any]]]:
+    """Decrypt raw packets; results keep input order, None where dropped.
+
+    Packets are grouped by transit key. Batches of PARALLEL_VERIFY_MIN or
+    more are split across the shared crypto worker pool.
+    """
+    results: List[Optional[Dict[str, Any]]] = [None] * len(packets)
+    groups: Dict[bytes, List[int]] = {}
+    for index, raw_data in enumerate(packets):
+        if len(raw_data) <= TRANSIT_KEY_ID_SIZE + crypto.NONCE_SIZE:
+            continue
+        key = keyring.get(raw_data[:TRANSIT_KEY_ID_SIZE].hex())
+        if key is None or not is_real_secret(key[0]):
+            continue
+        groups.setdefault(key[0], []).append(index)
+
+    jobs = []
+    chunk = crypto.PARALLEL_VERIFY_MIN
+    parallel = sum(len(indexes) for indexes in groups.values()) >= 2 * chunk
+    for secret, indexes in groups.items():
+        for i in range(0, len(indexes), chunk if parallel else len(indexes)):
+            part = indexes[i:i + chunk] if parallel else indexes
+            batch = [packets[index] for index in part]
+            if parallel:
+                jobs.append((part, crypto.worker_pool().submit(_open_group, secret, batch)))
+            else:
+                jobs.append((part, _open_group(secret, batch)))
+    for part, opened in jobs:
+        if not isinstance(opened, list):
+            opened = opened.result()
+        for index, payload in zip(part, opened):
+            results[index] = payload
+    return results
+
+
+def transit_envelope(packet: Dict[str, Any], payload: Dict[str, Any], network_id: Any) -> Dict[str, Any]:
+    """Build the envelope the pipeline sees once the transit layer is removed."""
+    event_ciphertext = payload.get('event_ciphertext', b'')
+    key_ref = payload.get('key_ref')
+    envelope: Dict[str, Any] = {
+        'origin_ip': packet.get('origin_ip'),
+        'origin_port': packet.get('origin_port'),
+        'received_at': packet.get('received_at'),
+        'transit_key_id': packet['raw_data'][:TRANSIT_KEY_ID_SIZE].hex(),
+        'network_id': payload.get('network_id') or network_id,
+        'event_ciphertext': event_ciphertext,
+        'event_id': hashlib.blake2b(event_ciphertext, digest_size=16).hexdigest(),
+        'key_ref': key_ref,
+        'write_to_store': True,
+        # Event-layer decryption needs the key's secret
+        'deps': [f"key:{key_ref['id']}"] if isinstance(key_ref, dict) and key_ref.get('kind') == 'key' else [],
+    }
+    return envelope
+
+
+def open_incoming(packets: List[Dict[str, Any]], db: sqlite3.Connection) -> List[Dict[str, Any]]:
+    """Strip the transit layer from received packets ahead of the pipeline.
+
+    Returns envelopes ready for PipelineRunner.run(). Packets that cannot
+    be opened with a held key are dropped; no SQL is run for them.
+    """
+    keyring = keyring_for(db)
+    if keyring is None:
+        return []
+    opened = open_packets([packet.get('raw_data') or b'' for packet in packets], keyring)
+    envelopes = []
+    for packet, payload in zip(packets, opened):
+        if payload is None:
+            continue
+        key = keyring.get(packet['raw_data'][:TRANSIT_KEY_ID_SIZE].hex())
+        envelopes.append(transit_envelope(packet, payload, key[1] if key else None))
+    return envelopes
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Measure the per-event cost of event-layer crypto.
+
+Runs each step over N synthetic message events and prints the time per
+event and the resulting events/second, for sizing nodes:
+
+    python scripts/bench_event_crypto.py --events 20000
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core import crypto  # noqa: E402
+from protocols.quiet.event_codec import decode_event, encode_event  # noqa: E402
+from protocols.quiet.handlers.signature import canonicalize_event  # noqa: E402
+from protocols.quiet import transit  # noqa: E402
+
+
+def _events(count):
+    return [
+        {
+            'type': 'message',
+            'channel_id': os.urandom(16).hex(),
+            'network_id': os.urandom(16).hex(),
+            'peer_id': os.urandom(16).hex(),
+            'content': f'benchmark message {i} ' + 'x' * 120,
+            'created_at': 1_700_000_000_000 + i,
+        }
+        for i in range(count)
+    ]
+
+
+def _time(label, count, fn):
+    started = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - started
+    print(f"{label:<28} {elapsed / count * 1e6:10.2f} us/event {count / elapsed:14,.0f} events/s")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--events', type=int, default=10000, help='events per step')
+    args = parser.parse_args()
+    n = args.events
+
+    events = _events(n)
+    key = crypto.generate_secret()
+    private_key, public_key = crypto.generate_keypair()
+    signer = crypto.signing_key(private_key)
+
+    print(f"{n} events, PyNaCl XChaCha20-Poly1305 / Ed25519, {os.cpu_count()} CPUs")
+    encoded = _time('encode (512 bytes)', n, lambda: [encode_event(e) for e in events])
+    _time('decode', n, lambda: [decode_event(b) for b in encoded])
+    sealed = _time('encrypt', n, lambda: [crypto.encrypt(b, key) for b in encoded])
+    _time('decrypt', n, lambda: [crypto.decrypt(c, key, nonce) for c, nonce in sealed])
+    _time('decrypt_batch (one key)', n, lambda: crypto.decrypt_batch(sealed, key))
+    transit_key_id = os.urandom(32).hex()
+    keyring = transit.TransitKeyring()
+    keyring.add(transit_key_id, key, 'bench')
+    packets = _time('transit seal', n, lambda: [
+        bytes.fromhex(transit_key_id) + transit.seal_payload(
+            transit_key_id, key, {'event_ciphertext': nonce + c, 'key_ref': {'kind': 'key', 'id': 'k'}})
+        for c, nonce in sealed])
+    _time('transit open (batched)', n, lambda: transit.open_packets(packets, keyring))
+    canonical = [canonicalize_event(e) for e in events]
+    signatures = _time('sign', n, lambda: [signer.sign(c).signature for c in canonical])
+    _time('verify', n, lambda: [crypto.verify(c, s, public_key) for c, s in zip(canonical, signatures)])
+    _time('verify_batch', n, lambda: crypto.verify_batch(
+        [(c, s, public_key) for c, s in zip(canonical, signatures)]))
+
+
+if __name__ == '__main__':
+    main()